@@ -5,7 +5,6 @@ import json
 import os
 from typing import Optional, List, Any, Dict
 
-from database.session import SessionLocal
 from fastapi import (
     APIRouter,
     File,
@@ -16,14 +15,12 @@ from fastapi import (
     Path,
     status,
     UploadFile,
-    BackgroundTasks,
 )
 from sqlalchemy.orm import Session
 from sqlalchemy import delete as sa_delete
 
 from core import config
 from core.deps import get_db, get_current_user
-from core.pricing import tokens_for_texts
 
 from models.user.account import AppUser
 from models.user.document import DocumentPage
@@ -56,11 +53,14 @@ from schemas.user.document import (
 )
 
 from service.user.upload_pipeline import UploadPipeline
+from service.user.text_extract import ExtractionError
+from service.user.document_jobs import enqueue_document_ingest
 from service.user.activity import track_event, track_feature
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from service.user.document_chunking import (
     build_splitter,
+    build_token_length_function,
     split_segments,
     clean_texts,
 )
@@ -120,16 +120,6 @@ def _validate_scope(scope: str) -> None:
         )
 
 
-def _estimate_tokens(text: str, *, model: str) -> int:
-    # preview에서만 쓰는 토큰 추정(실제로는 tiktoken 기반일 가능성이 높아서 정확)
-    try:
-        return int(tokens_for_texts(model, [text]))
-    except Exception:
-        # 안전망(대략치)
-        return max(1, len(text) // 4)
-
-
-
 def _decorate_parent(seg_idx: int, parent_text: str) -> str:
     return f"{_PARENT_PREFIX} seg={seg_idx}\n{parent_text.strip()}".strip()
 
@@ -142,22 +132,6 @@ def _decorate_chunk(global_idx: int, chunk_text: str) -> str:
     return f"{_CHUNK_PREFIX} global={global_idx}\n{chunk_text.strip()}".strip()
 
 
-def run_document_pipeline_background(user_id: int, knowledge_id: int) -> None:
-    """
-    BackgroundTasks에서 호출할 실제 작업 함수.
-    통일안:
-    - 엔드포인트는 파이프라인 세부 로직을 직접 수행하지 않고
-      UploadPipeline.process_document()에 위임한다.
-    """
-    db = SessionLocal()
-    try:
-        pipeline = UploadPipeline(db, user_id=user_id)
-        pipeline.process_document(knowledge_id)
-        # process_document 내부에서 status/progress/pages/chunks/cost까지 처리 및 commit
-    finally:
-        db.close()
-
-
 # =========================================================
 # Document (내 문서)
 # =========================================================
@@ -297,7 +271,6 @@ def create_document(
     ),
 )
 def upload_document(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     scope: str = Form("knowledge_base"),
     db: Session = Depends(get_db),
@@ -327,10 +300,10 @@ def upload_document(
     )
     track_feature(db, user_id=me.user_id, class_id=None, feature_type="file_attached")
 
+    enqueue_document_ingest(db, user_id=me.user_id, knowledge_id=doc.knowledge_id)
+
     db.commit()
     db.refresh(doc)
-
-    background_tasks.add_task(run_document_pipeline_background, me.user_id, doc.knowledge_id)
     return DocumentResponse.model_validate(doc)
 
 
@@ -355,7 +328,6 @@ def upload_document(
     ),
 )
 def upload_document_advanced(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     scope: str = Form("knowledge_base"),
     ingestion_settings: Optional[str] = Form(None),
@@ -396,10 +368,10 @@ def upload_document_advanced(
     )
     track_feature(db, user_id=me.user_id, class_id=None, feature_type="file_attached")
 
+    enqueue_document_ingest(db, user_id=me.user_id, knowledge_id=doc.knowledge_id)
+
     db.commit()
     db.refresh(doc)
-
-    background_tasks.add_task(run_document_pipeline_background, me.user_id, doc.knowledge_id)
     return DocumentResponse.model_validate(doc)
 
 
@@ -475,7 +447,7 @@ def delete_document(
     response_model=DocumentIngestionSettingResponse,
     operation_id="get_document_ingestion_settings",
     summary="임베딩설정",
-    description="문서 임베딩/청킹 설정 조회. 설정이 없으면 기본값으로 자동 생성. 스키마: user.document_ingestion_settings",
+    description="문서 임베딩/청킹 설정 조회. 설정이 없을 때만 기본값으로 생성 (있으면 읽기만). 스키마: user.document_ingestion_settings",
 )
 def get_document_ingestion_settings(
     knowledge_id: int = Path(..., ge=1),
@@ -484,15 +456,17 @@ def get_document_ingestion_settings(
 ):
     _ensure_my_document(db, knowledge_id=knowledge_id, me=me)
 
-    defaults = dict(getattr(config, "DEFAULT_INGESTION"))
-    defaults["embedding_dim"] = _EMBEDDING_DIM_FIXED
-
-    setting = document_ingestion_setting_crud.ensure_default(
-        db,
-        knowledge_id=knowledge_id,
-        defaults=defaults,
-    )
-    db.commit()
+    setting = document_ingestion_setting_crud.get(db, knowledge_id)
+    if setting is None:
+        # 업로드 전에 만들어진 문서 등 설정 행이 없을 때만 생성
+        defaults = dict(getattr(config, "DEFAULT_INGESTION"))
+        defaults["embedding_dim"] = int(defaults.get("embedding_dim") or _EMBEDDING_DIM_FIXED)
+        setting = document_ingestion_setting_crud.ensure_default(
+            db,
+            knowledge_id=knowledge_id,
+            defaults=defaults,
+        )
+        db.commit()
     return DocumentIngestionSettingResponse.model_validate(setting)
 
 
@@ -509,7 +483,9 @@ def get_document_ingestion_settings(
         "- chunk_strategy: 'recursive'만 지원 (MVP)\n"
         "- chunk_overlap < chunk_size 필수\n"
         "- parent_child 모드: segment_separator, parent_chunk_size, parent_chunk_overlap 사용\n"
-        "- general 모드: parent 관련 필드 자동 null 처리"
+        "- general 모드: parent 관련 필드 자동 null 처리\n"
+        "- embedding_dim: 512 | 768 | 1536 (text-embedding-3 dimensions 축소, reindex 전까지는 이전 차원으로 저장된 청크가 검색 안 됨)\n"
+        "- embedding_provider: 'openai' | 'local' (local은 서버의 LOCAL_EMBEDDING_MODEL만, provider를 바꿀 때 model/dim 생략하면 새 provider 기본값)"
     ),
 )
 def patch_document_ingestion_settings(
@@ -521,14 +497,18 @@ def patch_document_ingestion_settings(
     _ensure_my_document(db, knowledge_id=knowledge_id, me=me)
 
     defaults = dict(getattr(config, "DEFAULT_INGESTION"))
-    defaults["embedding_dim"] = _EMBEDDING_DIM_FIXED
+    defaults["embedding_dim"] = int(defaults.get("embedding_dim") or _EMBEDDING_DIM_FIXED)
     document_ingestion_setting_crud.ensure_default(db, knowledge_id=knowledge_id, defaults=defaults)
 
-    updated = document_ingestion_setting_crud.update_by_knowledge_id(
-        db,
-        knowledge_id=knowledge_id,
-        data=data,
-    )
+    try:
+        updated = document_ingestion_setting_crud.update_by_knowledge_id(
+            db,
+            knowledge_id=knowledge_id,
+            data=data,
+        )
+    except ValueError as e:  # 저장된 설정과 합친 embedding provider/model/dim 조합 오류
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
     db.commit()
     return DocumentIngestionSettingResponse.model_validate(updated)
 
@@ -563,18 +543,25 @@ def preview_document_chunks(
 
     file_path = _resolve_document_file_path(doc=doc, user_id=me.user_id)
     pipeline = UploadPipeline(db, user_id=me.user_id)
-    text, _ = pipeline.extract_text(file_path)
+    try:
+        # 추출 텍스트 아티팩트 재사용 (없을 때만 추출 프로세스 풀에서 파싱)
+        text = pipeline.load_extracted(doc, file_path).text
+    except ExtractionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e),
+        )
+    db.commit()  # 예전 문서면 file_sha256이 여기서 채워짐
 
-    # embed model은 현재 문서 ingestion setting 기준(없으면 default)
-    ing = document_ingestion_setting_crud.get(db, knowledge_id)
+    # embed model은 현재 문서 ingestion setting 기준(없으면 default) - 읽기 캐시
+    ing = document_ingestion_setting_crud.get_cached(db, knowledge_id)
     embed_model = (
         getattr(ing, "embedding_model", None)
         or getattr(config, "DEFAULT_EMBEDDING_MODEL", "text-embedding-3-small")
     )
 
-    # preview에서만 쓰는 length_function
-    def _tok_len(s: str) -> int:
-        return _estimate_tokens(s or "", model=embed_model)
+    # length_function은 ingest와 동일한 토큰 엔진 사용(문서 1회 인코딩)
+    _tok_len = build_token_length_function(embed_model, text or "")
 
     # splitter는 ingest와 동일하게 build_splitter 사용
     child_splitter = build_splitter(
@@ -595,7 +582,7 @@ def preview_document_chunks(
     def _push(idx: int, t: str):
         nonlocal total_chars, total_tokens
         cc = len(t)
-        tk = _estimate_tokens(t, model=embed_model)
+        tk = _tok_len(t)
         total_chars += cc
         total_tokens += tk
         items.append(
@@ -706,7 +693,7 @@ def preview_document_chunks(
     response_model=DocumentSearchSettingResponse,
     operation_id="get_document_search_settings",
     summary="검색설정조회",
-    description="문서 검색 설정 조회. 설정이 없으면 기본값으로 자동 생성. 스키마: user.document_search_settings",
+    description="문서 검색 설정 조회. 설정이 없을 때만 기본값으로 생성 (있으면 읽기만). 스키마: user.document_search_settings",
 )
 def get_document_search_settings(
     knowledge_id: int = Path(..., ge=1),
@@ -715,15 +702,17 @@ def get_document_search_settings(
 ):
     _ensure_my_document(db, knowledge_id=knowledge_id, me=me)
 
-    defaults = dict(getattr(config, "DEFAULT_SEARCH"))
-    defaults["score_type"] = _SCORE_TYPE_FIXED
-
-    setting = document_search_setting_crud.ensure_default(
-        db,
-        knowledge_id=knowledge_id,
-        defaults=defaults,
-    )
-    db.commit()
+    setting = document_search_setting_crud.get(db, knowledge_id)
+    if setting is None:
+        # 업로드 전에 만들어진 문서 등 설정 행이 없을 때만 생성
+        defaults = dict(getattr(config, "DEFAULT_SEARCH"))
+        defaults["score_type"] = _SCORE_TYPE_FIXED
+        setting = document_search_setting_crud.ensure_default(
+            db,
+            knowledge_id=knowledge_id,
+            defaults=defaults,
+        )
+        db.commit()
     return DocumentSearchSettingResponse.model_validate(setting)
 
 
@@ -738,7 +727,11 @@ def get_document_search_settings(
         "- 스키마: user.document_search_settings\n"
         "- score_type: 'cosine_similarity' (고정)\n"
         "- min_score: 0.0 ~ 1.0 (Decimal)\n"
-        "- reranker_top_n <= top_k 필수"
+        "- reranker_top_n <= top_k 필수\n"
+        "- search_mode: 'vector' | 'hybrid' (벡터 + 키워드 검색을 RRF로 합침, API 이름/에러 코드/조항 번호 검색에 유리)\n"
+        "- expand_to_parent: true면 매칭된 child 대신 parent 본문을 컨텍스트로 (parent_child 인제스트 문서)\n"
+        "- hnsw_ef_search: 1 ~ 1000 (벡터 인덱스 탐색 폭, 클수록 정확/느림, null이면 서버 기본값)\n"
+        "- ivfflat_probes: ivfflat 인덱스 사용 환경에서만 의미 있음"
     ),
 )
 def patch_document_search_settings(
@@ -779,7 +772,6 @@ def patch_document_search_settings(
     ),
 )
 def reindex_document(
-    background_tasks: BackgroundTasks,
     knowledge_id: int = Path(..., ge=1),
     db: Session = Depends(get_db),
     me: AppUser = Depends(get_current_user),
@@ -799,7 +791,6 @@ def reindex_document(
             error_message=None,
         ),
     )
+    enqueue_document_ingest(db, user_id=me.user_id, knowledge_id=knowledge_id)
     db.commit()
-
-    background_tasks.add_task(run_document_pipeline_background, me.user_id, knowledge_id)
     return None
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.encoders import jsonable_encoder
@@ -13,12 +13,14 @@ from sqlalchemy.orm import Session
 from core.deps import get_current_user_ws, get_db
 from database.session import SessionLocal
 from crud.user.document import document_crud
+from service.user.document_events import document_status_hub
 from models.user.account import AppUser
 from schemas.user.practice import (
     PracticeTurnRequestExistingSession,
     PracticeTurnRequestNewSession,
 )
 from service.user.practice.orchestrator import prepare_practice_turn_for_session
+from service.user.practice.retrieval import make_retrieve_fn_for_practice
 from service.user.practice.turn_runner import iter_practice_model_stream_events
 
 from service.user.fewshot import validate_my_few_shot_example_ids
@@ -29,7 +31,8 @@ router = APIRouter()
 WS_SEND_MAX_RETRIES = 2
 WS_SEND_RETRY_BACKOFF_S = 0.2
 
-DOC_POLL_INTERVAL_S = 1.5
+DOC_POLL_INTERVAL_S = 1.5   # used only while the LISTEN connection is down
+DOC_FALLBACK_POLL_S = 10.0  # safety-net poll while NOTIFY events are flowing
 DOC_POLL_TIMEOUT_S = 120.0
 
 
@@ -45,30 +48,72 @@ def _get_unready_knowledge_ids(db: Session, knowledge_ids: list[int]) -> list[in
     return unready
 
 
+async def _send_doc_status(
+    websocket: WebSocket,
+    *,
+    session_id: int,
+    knowledge_id: int,
+    status: Optional[str],
+    progress: Optional[int],
+    chunk_count: Optional[int],
+    error: Optional[str],
+) -> bool:
+    """Send one ``doc_status`` event. Returns True when the document is ready.
+
+    Raises:
+        HTTPException: if the document failed.
+    """
+    status_payload = {
+        "event": "doc_status",
+        "session_id": session_id,
+        "knowledge_id": knowledge_id,
+        "status": status,
+        "progress": progress or 0,
+    }
+    if status == "ready":
+        status_payload["chunks"] = chunk_count or 0
+    elif status == "failed":
+        status_payload["error"] = error or "document processing failed"
+
+    await _send_json(websocket, status_payload)
+
+    if status == "failed":
+        raise HTTPException(status_code=422, detail="document_processing_failed")
+    return status == "ready"
+
+
 async def _await_documents_ready(
     websocket: WebSocket,
     knowledge_ids: list[int],
     session_id: int,
     timeout_s: float = DOC_POLL_TIMEOUT_S,
     poll_interval_s: float = DOC_POLL_INTERVAL_S,
+    fallback_poll_s: float = DOC_FALLBACK_POLL_S,
 ) -> None:
-    """Poll document status until all *knowledge_ids* are ready.
+    """Wait until all *knowledge_ids* are ready.
 
-    Sends ``doc_status`` events to the client on every poll.
-    Uses a separate DB session so background-task commits are visible.
+    Status changes arrive as Postgres NOTIFY events (``document_status_hub``)
+    and are forwarded as ``doc_status`` events immediately. The DB is read
+    once up front and then only every *fallback_poll_s* (every
+    *poll_interval_s* while the listener is disconnected).
+    Uses a separate DB session so worker commits are visible.
 
     Raises:
         HTTPException: on not-found / failed / timeout.
         WebSocketDisconnect: if the client disconnects while waiting.
     """
-    loop = asyncio.get_event_loop()
+    loop = asyncio.get_running_loop()
     deadline = loop.time() + timeout_s
     pending = set(knowledge_ids)
 
+    # subscribe before the first DB read so no transition is missed in between
+    sub = document_status_hub.subscribe(pending)
     poll_db = SessionLocal()
     try:
+        next_poll = loop.time()
         while pending:
-            if loop.time() >= deadline:
+            now = loop.time()
+            if now >= deadline:
                 for kid in pending:
                     await _send_json(websocket, {
                         "event": "doc_status",
@@ -80,48 +125,55 @@ async def _await_documents_ready(
                     })
                 raise HTTPException(status_code=408, detail="document_processing_timeout")
 
-            poll_db.expire_all()
-            done_this_round: list[int] = []
-
-            for kid in pending:
-                doc = document_crud.get(poll_db, kid)
-
-                if doc is None:
-                    await _send_json(websocket, {
-                        "event": "doc_status",
-                        "session_id": session_id,
-                        "knowledge_id": kid,
-                        "status": "not_found",
-                        "progress": 0,
-                        "error": "document not found",
-                    })
-                    raise HTTPException(status_code=404, detail="document_not_found")
-
-                status_payload = {
-                    "event": "doc_status",
-                    "session_id": session_id,
-                    "knowledge_id": kid,
-                    "status": doc.status,
-                    "progress": doc.progress or 0,
-                }
-
-                if doc.status == "ready":
-                    status_payload["chunks"] = doc.chunk_count or 0
-                    done_this_round.append(kid)
-                elif doc.status == "failed":
-                    status_payload["error"] = doc.error_message or "document processing failed"
-
-                await _send_json(websocket, status_payload)
-
-                if doc.status == "failed":
-                    raise HTTPException(status_code=422, detail="document_processing_failed")
+            if now >= next_poll:
+                poll_db.expire_all()
+                for kid in list(pending):
+                    doc = document_crud.get(poll_db, kid)
+
+                    if doc is None:
+                        await _send_json(websocket, {
+                            "event": "doc_status",
+                            "session_id": session_id,
+                            "knowledge_id": kid,
+                            "status": "not_found",
+                            "progress": 0,
+                            "error": "document not found",
+                        })
+                        raise HTTPException(status_code=404, detail="document_not_found")
+
+                    if await _send_doc_status(
+                        websocket,
+                        session_id=session_id,
+                        knowledge_id=kid,
+                        status=doc.status,
+                        progress=doc.progress,
+                        chunk_count=doc.chunk_count,
+                        error=doc.error_message,
+                    ):
+                        pending.discard(kid)
+
+                interval = fallback_poll_s if document_status_hub.connected else poll_interval_s
+                next_poll = loop.time() + interval
+                continue
 
-            for kid in done_this_round:
+            event = await sub.get(min(next_poll, deadline) - now)
+            if event is None:
+                continue
+            kid = int(event["knowledge_id"])
+            if kid not in pending:
+                continue
+            if await _send_doc_status(
+                websocket,
+                session_id=session_id,
+                knowledge_id=kid,
+                status=event.get("status"),
+                progress=event.get("progress"),
+                chunk_count=event.get("chunk_count"),
+                error=event.get("error"),
+            ):
                 pending.discard(kid)
-
-            if pending:
-                await asyncio.sleep(poll_interval_s)
     finally:
+        sub.close()
         poll_db.close()
 
 
@@ -170,6 +222,8 @@ async def _run_practice_turn(
     loop = asyncio.get_running_loop()
     queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue()
     executor = ThreadPoolExecutor(max_workers=len(models))
+    # one retrieval pass per turn, shared by every model stream
+    retrieve_fn = make_retrieve_fn_for_practice(None, user)
 
     def _run_model_stream(model) -> None:
         try:
@@ -185,6 +239,7 @@ async def _run_practice_turn(
                 requested_generation_params=requested_generation_params,
                 requested_style_preset=requested_style_preset,
                 requested_style_params=requested_style_params,
+                retrieve_fn=retrieve_fn,
             ):
                 loop.call_soon_threadsafe(queue.put_nowait, event)
         except Exception as exc:
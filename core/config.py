@@ -64,8 +64,23 @@ CHROMA_PERSIST_DIRECTORY = os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_db")
 EMBEDDING_MODEL_DIMS = {
     "text-embedding-3-small": 1536,
     "text-embedding-3-large": 3072,
+    # provider="local" (sentence-transformers)
+    "intfloat/multilingual-e5-base": 768,
+    "intfloat/multilingual-e5-small": 384,
+    "intfloat/multilingual-e5-large": 1024,
 }
 
+# 임베딩 배치 스케줄러 (texts_to_vectors)
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "100000"))  # 요청당 토큰 예산 (OpenAI 한도 300k)
+EMBEDDING_BATCH_MAX_ITEMS = int(os.getenv("EMBEDDING_BATCH_MAX_ITEMS", "512"))        # 요청당 최대 텍스트 수 (OpenAI 한도 2048)
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "6"))                  # 429 재시도 횟수
+EMBEDDING_BACKOFF_BASE_S = float(os.getenv("EMBEDDING_BACKOFF_BASE_S", "1.0"))
+EMBEDDING_BACKOFF_MAX_S = float(os.getenv("EMBEDDING_BACKOFF_MAX_S", "30.0"))
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))      # 질문 임베딩 LRU 크기 (프로세스당)
+QUERY_EMBEDDING_CACHE_TTL_S = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL_S", "3600"))  # 0이면 만료 없음
+QUERY_EMBEDDING_CACHE_DB = os.getenv("QUERY_EMBEDDING_CACHE_DB", "false").lower() == "true"  # user.embedding_cache를 2차 캐시로 (워커 간 공유)
+
 # 8) 모델 카탈로그
 OPENAI_MODELS = os.getenv("OPENAI_MODELS", "gpt-4o-mini,gpt-5-mini,gpt-3.5-turbo")
 CLAUDE_MODELS = os.getenv("CLAUDE_MODELS", "")
@@ -225,6 +240,8 @@ RESPONSE_LENGTH_PRESETS = {
 
 # 정합성 고정값 (운영 중 바꾸면 사고나는 것들은 고정)
 EMBEDDING_DIM_FIXED = 1536
+EMBEDDING_DIMS_ALLOWED = (512, 768, 1536)  # ingestion embedding_dim 허용값 (document_chunks 차원별 벡터 컬럼과 같아야 함)
+EMBEDDING_DIMENSIONS_MODELS = ("text-embedding-3-small", "text-embedding-3-large")  # dimensions 파라미터(Matryoshka 축소) 지원 모델
 KB_SCORE_TYPE_FIXED = "cosine_similarity"
 
 # 튜닝 가능한 기본값(운영 중 변경 가능)
@@ -243,6 +260,7 @@ DEFAULT_INGESTION = {
     # embedding
     "embedding_provider": "openai",
     "embedding_model": "text-embedding-3-small",
+    "embedding_dim": 1536,              # 512 | 768 | 1536 (작을수록 인덱스/ANN 빠름, recall 확인 후 사용)
     # 기타
     "extra": {},
 }
@@ -254,4 +272,79 @@ DEFAULT_SEARCH = {
     "reranker_enabled": False,
     "reranker_model": None,
     "reranker_top_n": 5,                # <= top_k
+    "search_mode": "vector",            # vector | hybrid (벡터 + 키워드 RRF)
+    "expand_to_parent": False,          # small-to-big (child 매칭 -> parent 본문)
+}
+
+# 16) 문서 인제스트 워커 (script/document_worker.py)
+DOCUMENT_WORKER_CONCURRENCY = int(os.getenv("DOCUMENT_WORKER_CONCURRENCY", "2"))      # 워커 프로세스당 동시 작업 수
+DOCUMENT_WORKER_PER_USER_LIMIT = int(os.getenv("DOCUMENT_WORKER_PER_USER_LIMIT", "1"))  # 사용자별 동시 running 제한
+DOCUMENT_WORKER_POLL_S = float(os.getenv("DOCUMENT_WORKER_POLL_S", "2.0"))
+DOCUMENT_JOB_MAX_ATTEMPTS = int(os.getenv("DOCUMENT_JOB_MAX_ATTEMPTS", "3"))
+DOCUMENT_JOB_BACKOFF_BASE_S = float(os.getenv("DOCUMENT_JOB_BACKOFF_BASE_S", "10"))
+DOCUMENT_JOB_LEASE_S = float(os.getenv("DOCUMENT_JOB_LEASE_S", "900"))  # running heartbeat 만료 -> 재큐잉
+DOCUMENT_INGEST_STREAMING = os.getenv("DOCUMENT_INGEST_STREAMING", "true").lower() == "true"  # 페이지 스트리밍 인제스트 (false면 단계별 체크포인트)
+DOCUMENT_STREAM_EMBED_BATCH = int(os.getenv("DOCUMENT_STREAM_EMBED_BATCH", "128"))  # 스트리밍 시 임베딩 batch당 child 수
+DOCUMENT_INGEST_WORK_DIR = os.getenv("DOCUMENT_INGEST_WORK_DIR", str(BASE_DIR / "file" / "ingest_work"))  # 단계별 체크포인트
+DOCUMENT_EXTRACT_WORKERS = int(os.getenv("DOCUMENT_EXTRACT_WORKERS", "2"))  # PDF/DOCX 추출 프로세스 수 (0이면 현재 프로세스에서 추출)
+DOCUMENT_EXTRACT_TIMEOUT_S = float(os.getenv("DOCUMENT_EXTRACT_TIMEOUT_S", "300"))  # 추출 작업(PDF 페이지 batch / DOCX 1개)당 제한 시간, 작업 시작 시점부터
+DOCUMENT_EXTRACT_MEMORY_MB = int(os.getenv("DOCUMENT_EXTRACT_MEMORY_MB", "1024"))  # 추출 프로세스 메모리 상한 (0이면 제한 없음)
+DOCUMENT_EXTRACT_PAGE_BATCH = int(os.getenv("DOCUMENT_EXTRACT_PAGE_BATCH", "16"))  # PDF 추출 작업 1개당 페이지 수
+DOCUMENT_EXTRACT_MAX_TASKS_PER_CHILD = int(os.getenv("DOCUMENT_EXTRACT_MAX_TASKS_PER_CHILD", "50"))  # 추출 프로세스 재시작 주기
+DOCUMENT_TEXT_ARTIFACT_DIR = os.getenv("DOCUMENT_TEXT_ARTIFACT_DIR", str(BASE_DIR / "file" / "extracted_text"))  # 추출 텍스트 아티팩트 (파일 sha256 키)
+DOCUMENT_STATUS_CHANNEL = os.getenv("DOCUMENT_STATUS_CHANNEL", "document_status")  # 문서 상태 NOTIFY 채널 (WebSocket doc_status push)
+
+# 17) 벡터 검색 (pgvector ANN, document_search_settings 값이 없을 때 기본값)
+VECTOR_HNSW_EF_SEARCH = int(os.getenv("VECTOR_HNSW_EF_SEARCH", "64"))  # HNSW 탐색 후보 수 (클수록 recall↑ latency↑, 최소 top_k로 보정)
+VECTOR_IVFFLAT_PROBES = int(os.getenv("VECTOR_IVFFLAT_PROBES", "10"))  # ivfflat 인덱스가 남아있는 환경용 probe 수
+VECTOR_ITERATIVE_SCAN = os.getenv("VECTOR_ITERATIVE_SCAN", "relaxed_order")  # 필터 검색 iterative scan (off | relaxed_order | strict_order, pgvector<0.8이면 off로 동작)
+VECTOR_MAX_SCAN_TUPLES = int(os.getenv("VECTOR_MAX_SCAN_TUPLES", "20000"))  # iterative scan 최대 탐색 튜플 수
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))  # RRF 상수 k (score = sum 1/(k + rank))
+HYBRID_CANDIDATE_MULTIPLIER = int(os.getenv("HYBRID_CANDIDATE_MULTIPLIER", "3"))  # hybrid 각 arm이 가져오는 후보 수 = top_k * 이 값
+PARENT_CONTEXT_TOKEN_BUDGET = int(os.getenv("PARENT_CONTEXT_TOKEN_BUDGET", "3000"))  # small-to-big parent 본문 합계 토큰 상한
+VECTOR_STORAGE_MODE = os.getenv("VECTOR_STORAGE_MODE", "full")  # ANN 인덱스: full | halfvec | binary (database/vector_index.py, 인덱스는 script/vector_storage_mode.py로 생성)
+VECTOR_RESCORE_MULTIPLIER = int(os.getenv("VECTOR_RESCORE_MULTIPLIER", "4"))  # halfvec/binary: 후보 top_k * 이 값을 원본 float32로 다시 채점
+
+# 18) 리랭커 (service/user/rerank.py)
+RERANK_BACKEND = os.getenv("RERANK_BACKEND", "torch")  # torch | onnx (CPU, ONNX Runtime)
+RERANK_ONNX_FILE = os.getenv("RERANK_ONNX_FILE", "")  # onnx 파일 경로 (예: onnx/model_qint8_avx512_vnni.onnx -> int8)
+RERANK_PRELOAD_MODELS = os.getenv("RERANK_PRELOAD_MODELS", "")  # 서버 시작 시 로드+warm-up 할 모델 (콤마 구분)
+RERANK_MICRO_BATCH = os.getenv("RERANK_MICRO_BATCH", "true").lower() == "true"  # 동시 요청 pair를 모아서 한 번에 predict
+RERANK_MAX_WAIT_MS = float(os.getenv("RERANK_MAX_WAIT_MS", "5"))  # 배치 모으는 최대 대기
+RERANK_MAX_BATCH_PAIRS = int(os.getenv("RERANK_MAX_BATCH_PAIRS", "64"))  # 이만큼 모이면 바로 실행
+RERANK_TIMEOUT_S = float(os.getenv("RERANK_TIMEOUT_S", "30"))
+RERANK_SCORE_CACHE_SIZE = int(os.getenv("RERANK_SCORE_CACHE_SIZE", "50000"))  # (model, 질문, chunk) 점수 캐시 항목 수 (0이면 끔)
+
+# 19) 컨텍스트 패킹 (langchain_service/chain/context_pack.py)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))  # 검색 발췌 합계 토큰 상한 (모델별 값 없을 때)
+CONTEXT_TOKEN_BUDGETS = {
+    # 모델별 상한 (컨텍스트 창/단가 기준). 없는 모델은 CONTEXT_TOKEN_BUDGET
+    "gpt-4o-mini": 4000,
+    "gpt-5-mini": 6000,
+    "gpt-3.5-turbo": 2500,
+    "claude-3-haiku-20240307": 4000,
+    "gemini-2.5-flash": 6000,
 }
+CONTEXT_OVERLAP_MIN_CHARS = int(os.getenv("CONTEXT_OVERLAP_MIN_CHARS", "20"))  # 인접 chunk 겹침 제거 최소 길이 (짧은 우연 일치 무시)
+
+# 20) 문서 설정 캐시 (document_search_settings / document_ingestion_settings 읽기 캐시)
+DOCUMENT_SETTINGS_CACHE_SIZE = int(os.getenv("DOCUMENT_SETTINGS_CACHE_SIZE", "4096"))  # knowledge_id 항목 수 (프로세스당)
+DOCUMENT_SETTINGS_CACHE_TTL_S = float(os.getenv("DOCUMENT_SETTINGS_CACHE_TTL_S", "30"))  # 다른 프로세스의 변경 반영 지연 상한 (0이면 만료 없음)
+
+# 21) 인메모리 벡터 캐시 (service/user/vector_cache.py, 작은 문서는 DB 대신 NumPy exact cosine)
+VECTOR_CACHE_ENABLED = os.getenv("VECTOR_CACHE_ENABLED", "true").lower() == "true"
+VECTOR_CACHE_MAX_CHUNKS = int(os.getenv("VECTOR_CACHE_MAX_CHUNKS", "200"))  # chunk_count가 이 이하인 문서만 적재 (큰 문서는 pgvector)
+VECTOR_CACHE_MAX_MB = float(os.getenv("VECTOR_CACHE_MAX_MB", "256"))  # 프로세스당 행렬 메모리 상한 (LRU, 1536차원 200개 = 약 1.2MB)
+VECTOR_CACHE_TTL_S = float(os.getenv("VECTOR_CACHE_TTL_S", "600"))  # 적재 후 이 시간이 지나면 다시 적재 (0이면 만료 없음)
+
+# 22) 로컬 임베딩 (provider="local", langchain_service/embedding/local_embedder.py, sentence-transformers CPU)
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "intfloat/multilingual-e5-base")  # ingestion embedding_model은 이 값만 허용 (차원은 EMBEDDING_MODEL_DIMS)
+LOCAL_EMBEDDING_PATH = os.getenv("LOCAL_EMBEDDING_PATH", "")  # 가중치 로드 경로 (export 디렉터리 등, 비우면 LOCAL_EMBEDDING_MODEL을 hub에서)
+LOCAL_EMBEDDING_DEVICE = os.getenv("LOCAL_EMBEDDING_DEVICE", "cpu")
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "32"))  # encode 내부 배치 (CPU는 16~64)
+LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", "0"))  # torch/onnxruntime intra-op 스레드 (0이면 라이브러리 기본 = 코어 수)
+LOCAL_EMBEDDING_BACKEND = os.getenv("LOCAL_EMBEDDING_BACKEND", "torch")  # torch | onnx (ONNX Runtime)
+LOCAL_EMBEDDING_ONNX_FILE = os.getenv("LOCAL_EMBEDDING_ONNX_FILE", "")  # onnx 파일 경로 (script/export_local_embedding_onnx.py 산출물, 예: onnx/model_qint8_avx512_vnni.onnx)
+LOCAL_EMBEDDING_QUERY_PREFIX = os.getenv("LOCAL_EMBEDDING_QUERY_PREFIX", "query: ")  # e5 계열 입력 접두어 (다른 모델이면 빈 값)
+LOCAL_EMBEDDING_DOCUMENT_PREFIX = os.getenv("LOCAL_EMBEDDING_DOCUMENT_PREFIX", "passage: ")
+LOCAL_EMBEDDING_PRELOAD = os.getenv("LOCAL_EMBEDDING_PRELOAD", "false").lower() == "true"  # 서버 시작 시 로드 + warm-up
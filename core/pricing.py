@@ -3,9 +3,11 @@ from dataclasses import dataclass
 from datetime import datetime
 from decimal import Decimal, ROUND_HALF_UP
 from math import ceil
-from typing import List, Optional, Iterable
+from typing import Any, Dict, List, Optional, Iterable
 
+import time
 import logging
+import threading
 
 from core import config
 
@@ -35,10 +37,16 @@ def _require_price(product: str, model: str, key: str) -> Decimal:
 
 
 # ===== tiktoken 토큰 계산 유틸 =====
-def _get_encoder_for_model(model: str):
-    if not _HAS_TIKTOKEN:
-        log.debug("tiktoken not installed. falling back to char-count for model=%s", model)
-        return None
+# encoder는 프로세스 전역 캐시(모델명 단위). 청킹 length_function처럼
+# 수천 번 호출되는 경로에서 encoding_for_model 재해석 비용을 없앰.
+# 로드 실패(BPE 파일 다운로드 실패 등)는 캐시하지 않음 -> _ENCODER_RETRY_S 후 다시 시도
+_ENCODER_RETRY_S = 60.0
+_encoders: Dict[str, Any] = {}
+_encoder_failed_at: Dict[str, float] = {}
+_encoder_lock = threading.Lock()
+
+
+def _load_encoder(model: str):
     try:
         return tiktoken.encoding_for_model(model)
     except Exception:
@@ -49,6 +57,33 @@ def _get_encoder_for_model(model: str):
             return None
 
 
+def _get_encoder_for_model(model: str):
+    if not _HAS_TIKTOKEN:
+        log.debug("tiktoken not installed. falling back to char-count for model=%s", model)
+        return None
+    enc = _encoders.get(model)
+    if enc is not None:
+        return enc
+    failed_at = _encoder_failed_at.get(model)
+    if failed_at is not None and time.monotonic() - failed_at < _ENCODER_RETRY_S:
+        return None
+    with _encoder_lock:
+        enc = _encoders.get(model)
+        if enc is None:
+            enc = _load_encoder(model)
+            if enc is None:
+                _encoder_failed_at[model] = time.monotonic()
+            else:
+                _encoders[model] = enc
+                _encoder_failed_at.pop(model, None)
+    return enc
+
+
+def get_token_encoder(model: str):
+    """모델별 tiktoken encoder (캐시됨). tiktoken 없으면 None (char-count 폴백)."""
+    return _get_encoder_for_model(model)
+
+
 def tokens_for_text(model: str, text: str) -> int:
     """단일 문자열의 토큰 수 추정."""
     if not text:
@@ -172,14 +172,23 @@ def add_event(
     user_id: Optional[int] = None,
     status: str = "success",
     response_time_ms: Optional[int] = None,
+    cache_hits: Optional[int] = None,
+    cache_misses: Optional[int] = None,
 ) -> Optional[ApiUsage]:
     """
     UploadPipeline 등에서 쓰는 간단 로깅 헬퍼.
 
+    - cache_hits/cache_misses: 임베딩 캐시 통계 (api_cost 로그로만 남김, tokens는 miss 기준)
     - ENABLE_API_USAGE_LOG 가 False 이면 아무 것도 안 함
     - organization_id 가 None 이면 config.DEFAULT_ORGANIZATION_ID 사용 시도
     - org_id 를 끝까지 못 정하면 조용히 스킵 (None 반환)
     """
+    if cache_hits is not None or cache_misses is not None:
+        log.info(
+            "api-cost: product=%s model=%s embedding_tokens=%s cache_hits=%s cache_misses=%s",
+            product, model, embedding_tokens, cache_hits, cache_misses,
+        )
+
     if not getattr(config, "ENABLE_API_USAGE_LOG", False):
         return None
 
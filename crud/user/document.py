@@ -1,17 +1,37 @@
 # crud/user/document.py
 from __future__ import annotations
 
-from typing import Optional, Sequence, Tuple, List, Any, Dict
+import io
+import re
+import json
+import struct
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import timedelta
+from typing import Optional, Sequence, Tuple, List, Any, Dict, Iterator
+
+import numpy as np
 
 from sqlalchemy.orm import Session
-from sqlalchemy import select, update, delete, func, case
+from sqlalchemy import event
+from sqlalchemy import select, update, delete, func, case, cast, any_, BigInteger, bindparam as sa_bindparam, text as sa_text
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.dialects.postgresql import insert as pg_insert
+from pgvector.sqlalchemy import BIT, HALFVEC, VECTOR
 
+from core import config
 from models.user.document import (
+    EMBEDDING_DIM_FIXED,
+    EMBEDDING_VECTOR_COLUMNS,
     Document,
     DocumentUsage,
     DocumentPage,
     DocumentChunk,
+    DocumentIngestJob,
+    EmbeddingCache,
     DocumentIngestionSetting,
     DocumentSearchSetting,
     SessionDocument,
@@ -25,13 +45,44 @@ from schemas.user.document import (
     DocumentChunkCreate,
     DocumentIngestionSettingCreate,
     DocumentIngestionSettingUpdate,
+    DocumentIngestionSettingResponse,
     DocumentSearchSettingCreate,
     DocumentSearchSettingUpdate,
+    DocumentSearchSettingResponse,
+    check_embedding_setting,
+    embedding_provider_defaults,
 )
 
+log = logging.getLogger(__name__)
+
 # =========================================================
 # Documents CRUD
 # =========================================================
+_STATUS_FIELDS = {"status", "progress", "chunk_count", "error_message"}
+
+
+def notify_document_status(db: Session, doc: Document) -> None:
+    """
+    문서 상태/진행률 변경 이벤트 (Postgres NOTIFY).
+    - 트랜잭션 commit 시점에 전달 (rollback 되면 안 감) -> 모든 API 노드의 listener가 수신
+    - payload 8000 byte 제한 -> error는 잘라서 보냄
+    """
+    payload = {
+        "knowledge_id": int(doc.knowledge_id),
+        "status": doc.status,
+        "progress": int(doc.progress or 0),
+        "chunk_count": int(doc.chunk_count or 0),
+        "error": (doc.error_message or "")[:500] or None,
+    }
+    db.execute(
+        sa_text("SELECT pg_notify(:channel, :payload)"),
+        {
+            "channel": getattr(config, "DOCUMENT_STATUS_CHANNEL", "document_status"),
+            "payload": json.dumps(payload, ensure_ascii=False),
+        },
+    )
+
+
 class DocumentCRUD:
     def create(self, db: Session, data: DocumentCreate) -> Document:
         obj = Document(
@@ -40,6 +91,7 @@ class DocumentCRUD:
             file_format=data.file_format,
             file_size_bytes=data.file_size_bytes,
             folder_path=data.folder_path,
+            file_sha256=getattr(data, "file_sha256", None),
             status=data.status or "uploading",
             chunk_count=data.chunk_count or 0,
             progress=data.progress or 0,
@@ -98,26 +150,123 @@ class DocumentCRUD:
             .values(**values)
         )
         db.flush()
-        return self.get(db, knowledge_id)
+        obj = self.get(db, knowledge_id)
+        if obj is not None and _STATUS_FIELDS & values.keys():
+            notify_document_status(db, obj)
+        return obj
+
+    def list_ready_by_hash(
+        self,
+        db: Session,
+        file_sha256: str,
+        *,
+        ingest_fingerprint: Optional[str] = None,
+        exclude_knowledge_id: Optional[int] = None,
+        limit: int = 5,
+    ) -> Sequence[Document]:
+        """같은 파일(sha256)로 이미 인제스트가 끝난 문서 (최신순, dedup 원본 후보)"""
+        stmt = select(Document).where(
+            Document.file_sha256 == file_sha256,
+            Document.status == "ready",
+            Document.chunk_count > 0,
+        )
+        if ingest_fingerprint is not None:
+            stmt = stmt.where(Document.ingest_fingerprint == ingest_fingerprint)
+        if exclude_knowledge_id is not None:
+            stmt = stmt.where(Document.knowledge_id != int(exclude_knowledge_id))
+        return db.scalars(stmt.order_by(Document.updated_at.desc()).limit(int(limit))).all()
 
     def delete(self, db: Session, *, knowledge_id: int) -> None:
         db.execute(delete(Document).where(Document.knowledge_id == int(knowledge_id)))
         db.flush()
+        # 다른 API 노드의 문서별 캐시(인메모리 벡터 등)도 비우도록 삭제 이벤트
+        db.execute(
+            sa_text("SELECT pg_notify(:channel, :payload)"),
+            {
+                "channel": getattr(config, "DOCUMENT_STATUS_CHANNEL", "document_status"),
+                "payload": json.dumps({"knowledge_id": int(knowledge_id), "status": "deleted"}),
+            },
+        )
 
 
 document_crud = DocumentCRUD()
 
+# =========================================================
+# Settings read-through cache (knowledge_id -> 읽기 전용 스냅샷)
+# =========================================================
+class SettingsCache:
+    """
+    document_*_settings 읽기 캐시 (프로세스 전역).
+    - 값은 ORM 객체 대신 Response 스키마 스냅샷 (세션과 무관, 스레드 간 공유 가능)
+    - update_by_knowledge_id / ensure_default(insert) 시 invalidate (commit 후 한 번 더)
+    - 다른 프로세스에서 바뀐 값은 ttl_s 안에 반영
+    """
+
+    def __init__(self, *, max_size: Optional[int] = None, ttl_s: Optional[float] = None):
+        self.max_size = max(1, int(max_size or getattr(config, "DOCUMENT_SETTINGS_CACHE_SIZE", 4096)))
+        self.ttl_s = float(ttl_s if ttl_s is not None else getattr(config, "DOCUMENT_SETTINGS_CACHE_TTL_S", 30.0))
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[int, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, knowledge_id: int) -> Optional[Any]:
+        key = int(knowledge_id)
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            stored_at, value = item
+            if self.ttl_s > 0 and time.monotonic() - stored_at > self.ttl_s:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, knowledge_id: int, value: Any) -> None:
+        with self._lock:
+            self._data[int(knowledge_id)] = (time.monotonic(), value)
+            self._data.move_to_end(int(knowledge_id))
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, knowledge_id: int) -> None:
+        with self._lock:
+            self._data.pop(int(knowledge_id), None)
+
+    def invalidate_on_commit(self, db: Session, knowledge_id: int) -> None:
+        """지금 + commit 직후 (commit 전에 다른 요청이 옛 값을 다시 채우는 경우 대비)"""
+        self.invalidate(knowledge_id)
+        event.listen(db, "after_commit", lambda _s: self.invalidate(knowledge_id), once=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
 # =========================================================
 # Document Ingestion Settings CRUD
 # - schema Create를 통해 defaults를 정규화/검증 후 저장
 # - extra: patch merge (None이면 {}로 clear)
 # =========================================================
 class DocumentIngestionSettingCRUD:
+    def __init__(self) -> None:
+        self.cache = SettingsCache()
+
     def get(self, db: Session, knowledge_id: int) -> Optional[DocumentIngestionSetting]:
         return db.scalar(
             select(DocumentIngestionSetting).where(DocumentIngestionSetting.knowledge_id == int(knowledge_id))
         )
 
+    def get_cached(self, db: Session, knowledge_id: int) -> Optional[DocumentIngestionSettingResponse]:
+        """읽기 전용 스냅샷 (캐시 miss면 SELECT 1번). 행이 없으면 None (생성 안 함)"""
+        snap = self.cache.get(knowledge_id)
+        if snap is None:
+            obj = self.get(db, knowledge_id)
+            if obj is None:
+                return None
+            snap = DocumentIngestionSettingResponse.model_validate(obj)
+            self.cache.put(knowledge_id, snap)
+        return snap
+
     def ensure_default(
         self,
         db: Session,
@@ -126,31 +275,17 @@ class DocumentIngestionSettingCRUD:
         defaults: Dict[str, Any],
     ) -> DocumentIngestionSetting:
         # 스키마로 정규화/검증/기본값 주입
+        # 이미 있으면 그대로 둠 (저장된 설정을 기본값으로 덮지 않음)
         normalized = DocumentIngestionSettingCreate(knowledge_id=int(knowledge_id), **(defaults or {}))
         values = normalized.model_dump()
 
         stmt = (
             pg_insert(DocumentIngestionSetting)
             .values(**values)
-            .on_conflict_do_update(
-                index_elements=["knowledge_id"],
-                set_={
-                    "chunk_size": values["chunk_size"],
-                    "chunk_overlap": values["chunk_overlap"],
-                    "max_chunks": values["max_chunks"],
-                    "chunk_strategy": values["chunk_strategy"],
-                    "chunking_mode": values["chunking_mode"],
-                    "segment_separator": values["segment_separator"],
-                    "parent_chunk_size": values["parent_chunk_size"],
-                    "parent_chunk_overlap": values["parent_chunk_overlap"],
-                    "embedding_provider": values["embedding_provider"],
-                    "embedding_model": values["embedding_model"],
-                    "embedding_dim": values["embedding_dim"],
-                    "extra": values["extra"],
-                },
-            )
+            .on_conflict_do_nothing(index_elements=["knowledge_id"])
         )
-        db.execute(stmt)
+        if db.execute(stmt).rowcount:
+            self.cache.invalidate_on_commit(db, knowledge_id)
         db.flush()
 
         obj = self.get(db, knowledge_id)
@@ -166,13 +301,29 @@ class DocumentIngestionSettingCRUD:
         data: DocumentIngestionSettingUpdate,
     ) -> DocumentIngestionSetting:
         values = data.model_dump(exclude_unset=True)
+        cur = self.get(db, knowledge_id)
+
+        # provider 전환 (저장된 provider와 다를 때만): 안 보낸 model / dim은 새 provider 기본값
+        # (같은 provider면 저장된 값 유지 -> 512/768 차원 설정이 PATCH로 초기화되지 않음)
+        provider = values.get("embedding_provider")
+        if provider is not None and (cur is None or provider != cur.embedding_provider):
+            model, dim = embedding_provider_defaults(provider)
+            if values.get("embedding_model") is None:
+                values["embedding_model"] = model
+            if values.get("embedding_dim") is None and dim is not None:
+                values["embedding_dim"] = int(dim)
+        if {"embedding_provider", "embedding_model", "embedding_dim"} & values.keys():
+            check_embedding_setting(
+                values.get("embedding_provider", getattr(cur, "embedding_provider", None)),
+                values.get("embedding_model", getattr(cur, "embedding_model", None)),
+                values.get("embedding_dim", getattr(cur, "embedding_dim", None)),
+            )
 
         # extra patch merge / clear
         if "extra" in values:
             if values["extra"] is None:
                 values["extra"] = {}  # clear
             elif isinstance(values["extra"], dict):
-                cur = self.get(db, knowledge_id)
                 cur_extra = (getattr(cur, "extra", None) or {}) if cur is not None else {}
                 if not isinstance(cur_extra, dict):
                     cur_extra = {}
@@ -185,6 +336,7 @@ class DocumentIngestionSettingCRUD:
                 .values(**values)
             )
             db.flush()
+            self.cache.invalidate_on_commit(db, knowledge_id)
 
         obj = self.get(db, knowledge_id)
         if obj is None:
@@ -199,11 +351,25 @@ document_ingestion_setting_crud = DocumentIngestionSettingCRUD()
 # - schema Create로 Decimal/min_score, reranker_top_n<=top_k 검증
 # =========================================================
 class DocumentSearchSettingCRUD:
+    def __init__(self) -> None:
+        self.cache = SettingsCache()
+
     def get(self, db: Session, knowledge_id: int) -> Optional[DocumentSearchSetting]:
         return db.scalar(
             select(DocumentSearchSetting).where(DocumentSearchSetting.knowledge_id == int(knowledge_id))
         )
 
+    def get_cached(self, db: Session, knowledge_id: int) -> Optional[DocumentSearchSettingResponse]:
+        """검색 경로용 읽기 전용 스냅샷 (캐시 miss면 SELECT 1번, write 없음). 행이 없으면 None"""
+        snap = self.cache.get(knowledge_id)
+        if snap is None:
+            obj = self.get(db, knowledge_id)
+            if obj is None:
+                return None
+            snap = DocumentSearchSettingResponse.model_validate(obj)
+            self.cache.put(knowledge_id, snap)
+        return snap
+
     def ensure_default(
         self,
         db: Session,
@@ -211,25 +377,17 @@ class DocumentSearchSettingCRUD:
         knowledge_id: int,
         defaults: Dict[str, Any],
     ) -> DocumentSearchSetting:
+        # 이미 있으면 그대로 둠 (저장된 설정을 기본값으로 덮지 않음)
         normalized = DocumentSearchSettingCreate(knowledge_id=int(knowledge_id), **(defaults or {}))
         values = normalized.model_dump()
 
         stmt = (
             pg_insert(DocumentSearchSetting)
             .values(**values)
-            .on_conflict_do_update(
-                index_elements=["knowledge_id"],
-                set_={
-                    "top_k": values["top_k"],
-                    "min_score": values["min_score"],        # Decimal 유지
-                    "score_type": values["score_type"],      # 고정값
-                    "reranker_enabled": values["reranker_enabled"],
-                    "reranker_model": values["reranker_model"],
-                    "reranker_top_n": values["reranker_top_n"],
-                },
-            )
+            .on_conflict_do_nothing(index_elements=["knowledge_id"])
         )
-        db.execute(stmt)
+        if db.execute(stmt).rowcount:
+            self.cache.invalidate_on_commit(db, knowledge_id)
         db.flush()
 
         obj = self.get(db, knowledge_id)
@@ -252,6 +410,7 @@ class DocumentSearchSettingCRUD:
                 .values(**values)
             )
             db.flush()
+            self.cache.invalidate_on_commit(db, knowledge_id)
 
         obj = self.get(db, knowledge_id)
         if obj is None:
@@ -350,12 +509,193 @@ class DocumentPageCRUD:
             .order_by(DocumentPage.page_no.asc().nullsfirst())
         ).all()
 
+    def clone_from_document(self, db: Session, *, src_knowledge_id: int, dst_knowledge_id: int) -> int:
+        """src 문서의 page row를 dst로 복제 (INSERT ... SELECT, DB 안에서 처리)"""
+        res = db.execute(
+            sa_text(
+                'INSERT INTO "user".document_pages (knowledge_id, page_no, image_url) '
+                'SELECT :dst, page_no, image_url FROM "user".document_pages '
+                "WHERE knowledge_id = :src ORDER BY page_no"
+            ),
+            {"src": int(src_knowledge_id), "dst": int(dst_knowledge_id)},
+        )
+        db.flush()
+        return int(res.rowcount or 0)
+
 
 document_page_crud = DocumentPageCRUD()
 
 # =========================================================
 # Document Chunks CRUD (parent-child aware)
 # =========================================================
+# ---------------------------------------------------------
+# COPY (binary) helpers
+# - PGCOPY 바이너리 포맷: header + (int16 필드수, [int32 길이 + 값]...) + trailer
+# - vector: pgvector vector_send 포맷 (int16 dim, int16 0, float4[dim] big-endian)
+# ---------------------------------------------------------
+_PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_PGCOPY_TRAILER = struct.pack(">h", -1)
+_PGCOPY_NULL = struct.pack(">i", -1)
+
+_CHUNK_COPY_COLUMNS = (
+    "chunk_id",
+    "knowledge_id",
+    "page_id",
+    "chunk_level",
+    "parent_chunk_id",
+    "segment_index",
+    "chunk_index_in_segment",
+    "chunk_index",
+    "chunk_text",
+)  # + 차원별 벡터 컬럼 1개 (vector_memory / vector_memory_768 / vector_memory_512)
+_CHUNK_COPY_BATCH_ROWS = 500  # COPY 스트림에 한 번에 넘기는 row 수
+
+
+def _pg_int8(v: Optional[int]) -> bytes:
+    return _PGCOPY_NULL if v is None else struct.pack(">iq", 8, int(v))
+
+
+def _pg_int4(v: Optional[int]) -> bytes:
+    return _PGCOPY_NULL if v is None else struct.pack(">ii", 4, int(v))
+
+
+def _pg_text(v: Optional[str]) -> bytes:
+    if v is None:
+        return _PGCOPY_NULL
+    raw = v.encode("utf-8")
+    return struct.pack(">i", len(raw)) + raw
+
+
+def _pg_vector(v: Optional[Sequence[float]]) -> bytes:
+    if v is None:
+        return _PGCOPY_NULL
+    arr = np.asarray(v, dtype=">f4")
+    body = struct.pack(">HH", arr.shape[0], 0) + arr.tobytes()
+    return struct.pack(">i", len(body)) + body
+
+
+class _IterStream(io.RawIOBase):
+    """bytes generator -> file-like (copy_expert가 read(size)로 당겨감)"""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._it = chunks
+        self._buf = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buf:
+            try:
+                self._buf = next(self._it)
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+
+def chunk_vector_column_name(dim: int) -> str:
+    """임베딩 차원 -> document_chunks 벡터 컬럼명"""
+    name = EMBEDDING_VECTOR_COLUMNS.get(int(dim))
+    if name is None:
+        raise ValueError(f"unsupported embedding dim: {dim} (expected one of {sorted(EMBEDDING_VECTOR_COLUMNS)})")
+    return name
+
+
+def chunk_vector_column(dim: int):
+    return getattr(DocumentChunk, chunk_vector_column_name(dim))
+
+
+def _vector_values(vector: Optional[Sequence[float]]) -> Dict[str, Any]:
+    """ORM 생성용 {벡터 컬럼: 값} (차원으로 컬럼 선택, None이면 비움)"""
+    if vector is None:
+        return {}
+    return {chunk_vector_column_name(len(vector)): list(vector)}
+
+
+@dataclass(frozen=True)
+class ChunkSearchHit:
+    """벡터 검색 결과 1건 (ORM row 대신, vector_memory 없이)"""
+
+    chunk_id: int
+    knowledge_id: int
+    page_id: Optional[int]
+    parent_chunk_id: Optional[int]
+    segment_index: Optional[int]
+    chunk_index: Optional[int]
+    chunk_text: str
+    score: float  # cosine similarity (1 - cosine distance)
+    rrf_score: Optional[float] = None  # hybrid 검색일 때만 (RRF 합산 점수)
+
+
+# ---------------------------------------------------------
+# 키워드 검색 (hybrid의 lexical arm)
+# - idx_document_chunks_text_tsv와 같은 식 to_tsvector('simple'::regconfig, chunk_text)
+# - 질문 토큰 OR + prefix(:*) -> 본문 쪽 조사("제3조의")도 매칭, 질문 쪽 조사는 떼고 검색
+# ---------------------------------------------------------
+_TS_CONFIG = "'simple'::regconfig"
+_LEXICAL_TOKEN = re.compile(r"[0-9A-Za-z가-힣]+")
+_KO_PARTICLES = tuple(
+    sorted(
+        ("은", "는", "이", "가", "을", "를", "의", "에", "에서", "으로", "로", "와", "과", "도", "만",
+         "에게", "까지", "부터", "이란", "란", "이라", "라고", "이나", "하고"),
+        key=len,
+        reverse=True,
+    )
+)
+_LEXICAL_MAX_TERMS = 32
+
+
+def lexical_tsquery(text: str) -> Optional[str]:
+    """질문 -> to_tsquery('simple') 문자열 ('a:* | b:*'), 쓸 토큰이 없으면 None"""
+    terms: List[str] = []
+    for tok in _LEXICAL_TOKEN.findall(text or ""):
+        tok = tok.lower()
+        if "가" <= tok[-1] <= "힣":
+            for p in _KO_PARTICLES:
+                if tok.endswith(p) and len(tok) - len(p) >= 2:
+                    tok = tok[: -len(p)]
+                    break
+        if len(tok) >= 2:
+            terms.append(tok)
+    terms = list(dict.fromkeys(terms))[:_LEXICAL_MAX_TERMS]
+    return " | ".join(f"{t}:*" for t in terms) or None
+
+
+def rrf_fuse(*ranked: Sequence[ChunkSearchHit], top_k: int, k: Optional[int] = None) -> List[ChunkSearchHit]:
+    """Reciprocal Rank Fusion: chunk별 sum(1 / (k + rank)), 동점이면 cosine 점수 순"""
+    rrf_k = int(k or getattr(config, "HYBRID_RRF_K", 60))
+    scores: Dict[int, float] = {}
+    first: Dict[int, ChunkSearchHit] = {}
+    for hits in ranked:
+        for rank, hit in enumerate(hits, start=1):
+            scores[hit.chunk_id] = scores.get(hit.chunk_id, 0.0) + 1.0 / (rrf_k + rank)
+            first.setdefault(hit.chunk_id, hit)
+    order = sorted(scores, key=lambda cid: (scores[cid], first[cid].score), reverse=True)
+    return [replace(first[cid], rrf_score=scores[cid]) for cid in order[: int(top_k)]]
+
+
+# pgvector 확장 버전 (프로세스당 1번 조회)
+# - hnsw.iterative_scan 등은 0.8부터 있는 설정 -> 이전 버전에서 set_config 하면 쿼리 에러
+_pgvector_version: Optional[Tuple[int, ...]] = None
+
+
+def _supports_iterative_scan(db: Session) -> bool:
+    global _pgvector_version
+    if _pgvector_version is None:
+        raw = db.execute(sa_text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+        version = tuple(int(p) for p in re.findall(r"\d+", str(raw or "0"))[:3])
+        if version < (0, 8):
+            log.warning(
+                "pgvector %s < 0.8: VECTOR_ITERATIVE_SCAN=%s ignored (iterative scan off)",
+                raw, getattr(config, "VECTOR_ITERATIVE_SCAN", None),
+            )
+        _pgvector_version = version
+    return _pgvector_version >= (0, 8)
+
+
 class DocumentChunkCRUD:
     def get(self, db: Session, chunk_id: int) -> Optional[DocumentChunk]:
         return db.scalar(select(DocumentChunk).where(DocumentChunk.chunk_id == int(chunk_id)))
@@ -376,7 +716,7 @@ class DocumentChunkCRUD:
             chunk_index_in_segment=data.chunk_index_in_segment,
             chunk_index=data.chunk_index,
             chunk_text=data.chunk_text,
-            vector_memory=list(vector) if vector is not None else None,
+            **_vector_values(vector),
         )
         db.add(obj)
         db.flush()
@@ -401,12 +741,134 @@ class DocumentChunkCRUD:
                     chunk_index_in_segment=data.chunk_index_in_segment,
                     chunk_index=data.chunk_index,
                     chunk_text=data.chunk_text,
-                    vector_memory=list(vector) if vector is not None else None,
+                    **_vector_values(vector),
                 )
             )
         db.add_all(objs)
         db.flush()
 
+    def allocate_ids(self, db: Session, n: int) -> List[int]:
+        """chunk_id 시퀀스 값 n개를 한 번에 선점"""
+        if n <= 0:
+            return []
+        rows = db.execute(
+            sa_text(
+                "SELECT nextval(pg_get_serial_sequence('\"user\".document_chunks', 'chunk_id')) "
+                "FROM generate_series(1, :n)"
+            ),
+            {"n": int(n)},
+        ).scalars().all()
+        return [int(r) for r in rows]
+
+    def bulk_copy(
+        self,
+        db: Session,
+        *,
+        parents: Sequence[DocumentChunkCreate] = (),
+        children: Sequence[Tuple[DocumentChunkCreate, Optional[Sequence[float]], Optional[int]]] = (),
+    ) -> List[int]:
+        """
+        parent + child를 COPY (binary) 한 번으로 저장.
+        - chunk_id는 allocate_ids로 미리 받음 (1 round-trip) -> parent id를 child에 바로 연결
+        - children: (data, vector, parents 인덱스). 인덱스가 None이면 data.parent_chunk_id 사용
+        - 벡터 컬럼은 벡터 차원으로 선택 (한 번의 호출 안에서는 같은 차원)
+        - ORM 세션을 거치지 않음 (identity map에 안 올라감)
+        반환: parents 순서의 chunk_id 목록
+        """
+        total = len(parents) + len(children)
+        if total == 0:
+            return []
+
+        dims = {len(vec) for _, vec, _ in children if vec is not None}
+        if len(dims) > 1:
+            raise ValueError(f"mixed embedding dims in one COPY: {sorted(dims)}")
+        columns = _CHUNK_COPY_COLUMNS + (chunk_vector_column_name(dims.pop() if dims else EMBEDDING_DIM_FIXED),)
+
+        db.flush()  # 앞선 ORM 변경(삭제 등)을 먼저 반영
+        ids = self.allocate_ids(db, total)
+        parent_ids = ids[: len(parents)]
+        child_ids = ids[len(parents) :]
+        n_fields = struct.pack(">h", len(columns))
+
+        def _row(chunk_id: int, data: DocumentChunkCreate, parent_chunk_id: Optional[int], vec) -> bytes:
+            return b"".join(
+                (
+                    n_fields,
+                    _pg_int8(chunk_id),
+                    _pg_int8(data.knowledge_id),
+                    _pg_int8(getattr(data, "page_id", None)),
+                    _pg_text(data.chunk_level),
+                    _pg_int8(parent_chunk_id),
+                    _pg_int4(data.segment_index),
+                    _pg_int4(data.chunk_index_in_segment),
+                    _pg_int4(data.chunk_index),
+                    _pg_text(data.chunk_text),
+                    _pg_vector(vec),
+                )
+            )
+
+        def _stream() -> Iterator[bytes]:
+            yield _PGCOPY_HEADER
+            buf: List[bytes] = []
+            for cid, data in zip(parent_ids, parents):
+                buf.append(_row(cid, data, None, None))
+            for cid, (data, vec, parent_idx) in zip(child_ids, children):
+                pid = parent_ids[parent_idx] if parent_idx is not None else data.parent_chunk_id
+                buf.append(_row(cid, data, pid, vec))
+                if len(buf) >= _CHUNK_COPY_BATCH_ROWS:
+                    yield b"".join(buf)
+                    buf = []
+            if buf:
+                yield b"".join(buf)
+            yield _PGCOPY_TRAILER
+
+        sql = (
+            'COPY "user".document_chunks ('
+            + ", ".join(columns)
+            + ") FROM STDIN WITH (FORMAT binary)"
+        )
+        raw = db.connection().connection  # 같은 트랜잭션의 DBAPI(psycopg2) 커넥션
+        with raw.cursor() as cur:
+            cur.copy_expert(sql, _IterStream(_stream()), size=1024 * 1024)
+        return parent_ids
+
+    def clone_from_document(self, db: Session, *, src_knowledge_id: int, dst_knowledge_id: int) -> int:
+        """
+        src 문서의 chunk(+vector)를 dst로 복제 (업로드 dedup, 재임베딩 없음).
+        - 새 chunk_id를 CTE에서 시퀀스로 받고 parent_chunk_id를 새 id로 매핑
+        - page_id는 page_no 기준으로 dst 페이지에 매핑 (dst 페이지를 먼저 복제해 둘 것)
+        - 벡터는 DB 밖으로 나오지 않음
+        반환: 복제된 row 수 (parent + child)
+        """
+        res = db.execute(
+            sa_text(
+                """
+                WITH src AS MATERIALIZED (
+                    SELECT c.*, nextval(pg_get_serial_sequence('"user".document_chunks', 'chunk_id')) AS new_id
+                    FROM "user".document_chunks c
+                    WHERE c.knowledge_id = :src
+                )
+                INSERT INTO "user".document_chunks (
+                    chunk_id, knowledge_id, page_id, chunk_level, parent_chunk_id,
+                    segment_index, chunk_index_in_segment, chunk_index, chunk_text,
+                    vector_memory, vector_memory_768, vector_memory_512
+                )
+                SELECT
+                    s.new_id, :dst, dp.page_id, s.chunk_level, sp.new_id,
+                    s.segment_index, s.chunk_index_in_segment, s.chunk_index, s.chunk_text,
+                    s.vector_memory, s.vector_memory_768, s.vector_memory_512
+                FROM src s
+                LEFT JOIN src sp ON sp.chunk_id = s.parent_chunk_id
+                LEFT JOIN "user".document_pages op ON op.page_id = s.page_id
+                LEFT JOIN "user".document_pages dp ON dp.knowledge_id = :dst AND dp.page_no = op.page_no
+                ORDER BY s.chunk_id
+                """
+            ),
+            {"src": int(src_knowledge_id), "dst": int(dst_knowledge_id)},
+        )
+        db.flush()
+        return int(res.rowcount or 0)
+
     def delete_by_document(self, db: Session, knowledge_id: int) -> int:
         res = db.execute(delete(DocumentChunk).where(DocumentChunk.knowledge_id == int(knowledge_id)))
         db.flush()
@@ -440,6 +902,159 @@ class DocumentChunkCRUD:
             )
         ).all()
 
+    def get_parent_texts(self, db: Session, parent_ids: Sequence[int]) -> Dict[int, str]:
+        """parent chunk_id 목록 -> 본문 (쿼리 1번, small-to-big 확장용)"""
+        ids = [int(i) for i in dict.fromkeys(parent_ids) if i is not None]
+        if not ids:
+            return {}
+        rows = db.execute(
+            select(DocumentChunk.chunk_id, DocumentChunk.chunk_text).where(
+                DocumentChunk.chunk_id == any_(sa_bindparam("parent_ids", ids, type_=ARRAY(BigInteger))),
+                DocumentChunk.chunk_level == "parent",
+            )
+        ).all()
+        return {int(cid): text for cid, text in rows}
+
+    def list_child_vectors(
+        self,
+        db: Session,
+        *,
+        knowledge_ids: Sequence[int],
+        owner_id: int,
+        max_chunks: int,
+        dim: int = EMBEDDING_DIM_FIXED,
+    ) -> List[Tuple[Any, ...]]:
+        """
+        작은 문서의 child 벡터 전체 (인메모리 벡터 캐시 적재용, 쿼리 1번)
+        - 소유권 + status='ready' + chunk_count <= max_chunks 인 문서만
+        - dim 차원 컬럼에 벡터가 있는 chunk만 (다른 차원으로 저장된 문서는 행 없음)
+        - 행: (chunk_id, knowledge_id, page_id, parent_chunk_id, segment_index, chunk_index, chunk_text, vector)
+        """
+        kids = [int(k) for k in dict.fromkeys(knowledge_ids)]
+        if not kids:
+            return []
+        col = chunk_vector_column(dim)
+        stmt = (
+            select(
+                DocumentChunk.chunk_id,
+                DocumentChunk.knowledge_id,
+                DocumentChunk.page_id,
+                DocumentChunk.parent_chunk_id,
+                DocumentChunk.segment_index,
+                DocumentChunk.chunk_index,
+                DocumentChunk.chunk_text,
+                col,
+            )
+            .where(
+                DocumentChunk.chunk_level == "child",
+                col.is_not(None),
+                Document.status == "ready",
+                Document.chunk_count <= int(max_chunks),
+            )
+            .order_by(DocumentChunk.knowledge_id, DocumentChunk.chunk_id)
+        )
+        stmt = self._where_owned(stmt, kids, owner_id)
+        return list(db.execute(stmt).all())
+
+    def _search_stmt(self, query_vector: Sequence[float], min_score: Optional[float]):
+        """
+        검색 결과용 경량 select (벡터 컬럼은 안 가져옴, 점수는 pgvector가 계산)
+        - 질문 벡터 차원으로 컬럼 선택 -> 다른 차원으로 저장된 문서의 chunk는 결과에서 빠짐
+        """
+        col = chunk_vector_column(len(query_vector))
+        dist = col.cosine_distance(query_vector)  # type: ignore
+        stmt = select(
+            DocumentChunk.chunk_id,
+            DocumentChunk.knowledge_id,
+            DocumentChunk.page_id,
+            DocumentChunk.parent_chunk_id,
+            DocumentChunk.segment_index,
+            DocumentChunk.chunk_index,
+            DocumentChunk.chunk_text,
+            (1.0 - dist).label("score"),
+        ).where(DocumentChunk.chunk_level == "child", col.is_not(None))
+        if min_score is not None:
+            stmt = stmt.where(dist <= (1.0 - float(min_score)))
+        return stmt, dist
+
+    def _apply_ann_params(
+        self,
+        db: Session,
+        *,
+        top_k: int,
+        ef_search: Optional[int],
+        probes: Optional[int],
+    ) -> bool:
+        """
+        이번 트랜잭션에만 ANN 파라미터 적용 (set_config(..., is_local=true) = SET LOCAL)
+        - ef_search < top_k면 결과가 모자라므로 top_k 이상으로 보정 (pgvector 상한 1000)
+        - iterative scan: knowledge_id/owner 필터로 후보가 걸러져도 top_k를 채울 때까지 더 탐색
+        반환: relaxed_order 여부 (True면 결과 순서를 점수로 다시 정렬해야 함)
+        """
+        ef = int(ef_search or getattr(config, "VECTOR_HNSW_EF_SEARCH", 64))
+        ef = min(max(ef, int(top_k), 1), 1000)
+        nprobe = max(1, int(probes or getattr(config, "VECTOR_IVFFLAT_PROBES", 10)))
+        params: Dict[str, str] = {"hnsw.ef_search": str(ef), "ivfflat.probes": str(nprobe)}
+
+        scan = str(getattr(config, "VECTOR_ITERATIVE_SCAN", "relaxed_order") or "off").lower()
+        if scan != "off" and not _supports_iterative_scan(db):
+            scan = "off"
+        if scan != "off":
+            max_tuples = str(int(getattr(config, "VECTOR_MAX_SCAN_TUPLES", 20000)))
+            params.update({
+                "hnsw.iterative_scan": scan,
+                "hnsw.max_scan_tuples": max_tuples,
+                "ivfflat.iterative_scan": "relaxed_order",  # ivfflat은 relaxed_order만 지원
+                "ivfflat.max_probes": str(max(nprobe, 100)),
+            })
+
+        binds: Dict[str, str] = {}
+        calls: List[str] = []
+        for i, (name, value) in enumerate(params.items()):
+            binds[f"n{i}"], binds[f"v{i}"] = name, value
+            calls.append(f"set_config(:n{i}, :v{i}, true)")
+        db.execute(sa_text("SELECT " + ", ".join(calls)), binds)  # 왕복 1번
+        return scan != "off"
+
+    def _ann_order(self, query_vector: Sequence[float]):
+        """
+        VECTOR_STORAGE_MODE가 halfvec/binary면 양자화 식 인덱스를 타는 정렬 식, full이면 None.
+        식은 database/vector_index.py의 인덱스 식과 같아야 planner가 인덱스를 씀.
+        양자화 인덱스는 vector_memory(기본 차원)에만 있음 -> 축소 차원 컬럼은 항상 full.
+        """
+        mode = getattr(config, "VECTOR_STORAGE_MODE", "full")
+        dim = int(getattr(config, "EMBEDDING_DIM_FIXED", 1536))
+        if len(query_vector) != dim:
+            return None
+        if mode == "halfvec":
+            return cast(DocumentChunk.vector_memory, HALFVEC(dim)).cosine_distance(
+                cast(sa_bindparam("q_half", list(query_vector), type_=HALFVEC(dim)), HALFVEC(dim))
+            )
+        if mode == "binary":
+            q = cast(sa_bindparam("q_full", list(query_vector), type_=VECTOR(dim)), VECTOR(dim))
+            return cast(func.binary_quantize(DocumentChunk.vector_memory), BIT(dim)).hamming_distance(
+                func.binary_quantize(q)
+            )
+        return None
+
+    def _run_search(
+        self, db: Session, stmt, dist, *, top_k: int, ef_search, probes, ann=None
+    ) -> List[ChunkSearchHit]:
+        if ann is not None:
+            # 양자화 인덱스로 후보 top-N -> score(원본 float32 cosine)로 다시 정렬
+            n = max(int(top_k), int(top_k) * int(getattr(config, "VECTOR_RESCORE_MULTIPLIER", 4)))
+            self._apply_ann_params(db, top_k=n, ef_search=ef_search, probes=probes)
+            cand = stmt.order_by(ann).limit(n).subquery()
+            rows = db.execute(select(cand).order_by(cand.c.score.desc()).limit(int(top_k))).all()
+            return [ChunkSearchHit(*row) for row in rows]
+
+        relaxed = self._apply_ann_params(db, top_k=top_k, ef_search=ef_search, probes=probes)
+        rows = db.execute(stmt.order_by(dist).limit(int(top_k))).all()
+        hits = [ChunkSearchHit(*row) for row in rows]
+        if relaxed:
+            hits.sort(key=lambda h: h.score, reverse=True)
+        return hits
+
     def search_by_vector(
         self,
         db: Session,
@@ -449,24 +1064,206 @@ class DocumentChunkCRUD:
         top_k: int = 8,
         min_score: Optional[float] = None,
         score_type: str = "cosine_similarity",
-    ) -> List[DocumentChunk]:
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> List[ChunkSearchHit]:
         if score_type != "cosine_similarity":
             raise ValueError("Only cosine_similarity is supported")
 
-        stmt = select(DocumentChunk).where(DocumentChunk.chunk_level == "child")
+        stmt, dist = self._search_stmt(query_vector, min_score)
         if knowledge_id is not None:
             stmt = stmt.where(DocumentChunk.knowledge_id == int(knowledge_id))
 
-        dist = DocumentChunk.vector_memory.cosine_distance(query_vector)  # type: ignore
+        return self._run_search(
+            db, stmt, dist, top_k=top_k, ef_search=ef_search, probes=probes, ann=self._ann_order(query_vector)
+        )
 
-        if min_score is not None:
-            stmt = stmt.where(dist <= (1.0 - float(min_score)))
+    def search_by_vector_multi(
+        self,
+        db: Session,
+        *,
+        query_vector: Sequence[float],
+        knowledge_ids: Sequence[int],
+        owner_id: int,
+        top_k: int = 8,
+        min_score: Optional[float] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> List[ChunkSearchHit]:
+        """
+        여러 문서를 쿼리 1번으로 검색 (전체 top_k, 점수 내림차순)
+        - 소유권: documents.owner_id join (남의 문서 id는 결과에서 빠짐)
+        - knowledge_id = ANY(:ids) -> 문서 수와 무관하게 같은 쿼리/플랜
+        """
+        kids = [int(k) for k in dict.fromkeys(knowledge_ids)]
+        if not kids:
+            return []
+
+        stmt, dist = self._search_stmt(query_vector, min_score)
+        stmt = self._where_owned(stmt, kids, owner_id)
+
+        return self._run_search(
+            db, stmt, dist, top_k=top_k, ef_search=ef_search, probes=probes, ann=self._ann_order(query_vector)
+        )
+
+    def _where_owned(self, stmt, kids: List[int], owner_id: int):
+        """소유권(documents.owner_id join) + knowledge_id = ANY(:kids)"""
+        return stmt.join(Document, Document.knowledge_id == DocumentChunk.knowledge_id).where(
+            Document.owner_id == int(owner_id),
+            DocumentChunk.knowledge_id == any_(sa_bindparam("kids", kids, type_=ARRAY(BigInteger))),
+        )
 
-        return list(db.scalars(stmt.order_by(dist).limit(int(top_k))).all())
+    def search_by_text(
+        self,
+        db: Session,
+        *,
+        query_text: str,
+        query_vector: Sequence[float],
+        knowledge_id: Optional[int] = None,
+        knowledge_ids: Optional[Sequence[int]] = None,
+        owner_id: Optional[int] = None,
+        top_k: int = 8,
+    ) -> List[ChunkSearchHit]:
+        """
+        키워드 top-k (ts_rank_cd 순). score는 벡터 검색과 같은 cosine similarity
+        - knowledge_ids(+owner_id)면 여러 문서, 아니면 knowledge_id 단일
+        """
+        tsq_text = lexical_tsquery(query_text)
+        if tsq_text is None:
+            return []
+
+        cfg = sa_text(_TS_CONFIG)
+        tsv = func.to_tsvector(cfg, DocumentChunk.chunk_text)
+        tsq = func.to_tsquery(cfg, tsq_text)
+        stmt, _ = self._search_stmt(query_vector, None)
+        stmt = stmt.where(tsv.bool_op("@@")(tsq))
+
+        if knowledge_ids is not None:
+            kids = [int(k) for k in dict.fromkeys(knowledge_ids)]
+            if not kids or owner_id is None:
+                return []
+            stmt = self._where_owned(stmt, kids, owner_id)
+        elif knowledge_id is not None:
+            stmt = stmt.where(DocumentChunk.knowledge_id == int(knowledge_id))
+
+        rows = db.execute(stmt.order_by(func.ts_rank_cd(tsv, tsq).desc()).limit(int(top_k))).all()
+        return [ChunkSearchHit(*row) for row in rows]
+
+    def search_hybrid(
+        self,
+        db: Session,
+        *,
+        query_text: str,
+        query_vector: Sequence[float],
+        knowledge_id: Optional[int] = None,
+        knowledge_ids: Optional[Sequence[int]] = None,
+        owner_id: Optional[int] = None,
+        top_k: int = 8,
+        candidate_k: Optional[int] = None,
+        min_score: Optional[float] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        rrf_k: Optional[int] = None,
+    ) -> List[ChunkSearchHit]:
+        """
+        벡터 top-n + 키워드 top-n -> RRF로 top_k (rrf_score 내림차순)
+        - min_score는 벡터 arm에만 적용 (키워드 arm은 용어 일치 자체가 근거)
+        - n = candidate_k (기본 top_k * HYBRID_CANDIDATE_MULTIPLIER)
+        """
+        n = int(candidate_k or int(top_k) * int(getattr(config, "HYBRID_CANDIDATE_MULTIPLIER", 3)))
+        n = max(n, int(top_k))
+
+        if knowledge_ids is not None:
+            vec_hits = self.search_by_vector_multi(
+                db,
+                query_vector=query_vector,
+                knowledge_ids=knowledge_ids,
+                owner_id=int(owner_id),
+                top_k=n,
+                min_score=min_score,
+                ef_search=ef_search,
+                probes=probes,
+            )
+        else:
+            vec_hits = self.search_by_vector(
+                db,
+                query_vector=query_vector,
+                knowledge_id=knowledge_id,
+                top_k=n,
+                min_score=min_score,
+                ef_search=ef_search,
+                probes=probes,
+            )
+        lex_hits = self.search_by_text(
+            db,
+            query_text=query_text,
+            query_vector=query_vector,
+            knowledge_id=knowledge_id,
+            knowledge_ids=knowledge_ids,
+            owner_id=owner_id,
+            top_k=n,
+        )
+        return rrf_fuse(vec_hits, lex_hits, top_k=top_k, k=rrf_k)
 
 
 document_chunk_crud = DocumentChunkCRUD()
 
+# =========================================================
+# Embedding Cache CRUD
+# - (embedding_model, text_hash) -> vector
+# =========================================================
+_EMBEDDING_CACHE_LOOKUP_CHUNK = 1000
+
+
+class EmbeddingCacheCRUD:
+    def get_many(
+        self,
+        db: Session,
+        *,
+        embedding_model: str,
+        text_hashes: Sequence[str],
+    ) -> Dict[str, List[float]]:
+        """hash 목록 bulk 조회 (IN 절은 chunk 단위로 분할)"""
+        uniq = list(dict.fromkeys(text_hashes))
+        found: Dict[str, List[float]] = {}
+        for start in range(0, len(uniq), _EMBEDDING_CACHE_LOOKUP_CHUNK):
+            part = uniq[start : start + _EMBEDDING_CACHE_LOOKUP_CHUNK]
+            rows = db.execute(
+                select(EmbeddingCache.text_hash, EmbeddingCache.vector_memory).where(
+                    EmbeddingCache.embedding_model == embedding_model,
+                    EmbeddingCache.text_hash.in_(part),
+                )
+            ).all()
+            for h, vec in rows:
+                found[h] = [float(v) for v in vec]
+        return found
+
+    def put_many(
+        self,
+        db: Session,
+        *,
+        embedding_model: str,
+        items: Sequence[Tuple[str, Sequence[float]]],
+    ) -> None:
+        """(hash, vector) 저장. 이미 있으면 무시 (동시 인제스트 경합 허용)"""
+        if not items:
+            return
+        values = [
+            {"embedding_model": embedding_model, "text_hash": h, "vector_memory": list(vec)}
+            for h, vec in dict(items).items()
+        ]
+        for start in range(0, len(values), _EMBEDDING_CACHE_LOOKUP_CHUNK):
+            stmt = (
+                pg_insert(EmbeddingCache)
+                .values(values[start : start + _EMBEDDING_CACHE_LOOKUP_CHUNK])
+                .on_conflict_do_nothing(index_elements=["embedding_model", "text_hash"])
+            )
+            db.execute(stmt)
+        db.flush()
+
+
+embedding_cache_crud = EmbeddingCacheCRUD()
+
 # =========================================================
 # Session Documents CRUD (junction table)
 # =========================================================
@@ -506,6 +1303,238 @@ class SessionDocumentCRUD:
 
 session_document_crud = SessionDocumentCRUD()
 
+# =========================================================
+# Document Ingest Jobs CRUD (작업 큐)
+# - claim: FOR UPDATE SKIP LOCKED 로 워커 간 중복 실행 방지
+# - 사용자별 running 수 제한 + running 수 적은 사용자 우선 (공정성)
+# - claim마다 고유 lease(locked_by) -> 실행 중 기록(mark_stage/complete/fail)은
+#   status='running' AND locked_by=lease 일 때만 (재큐잉/재enqueue된 뒤의 옛 실행은 무시)
+# =========================================================
+_CLAIM_JOB_SQL = sa_text("""
+WITH running AS (
+    SELECT user_id, COUNT(*) AS n
+    FROM "user".document_ingest_jobs
+    WHERE status = 'running'
+    GROUP BY user_id
+)
+SELECT j.knowledge_id
+FROM "user".document_ingest_jobs j
+LEFT JOIN running r ON r.user_id = j.user_id
+WHERE j.status = 'queued'
+  AND j.next_run_at <= now()
+  AND COALESCE(r.n, 0) < :per_user_limit
+ORDER BY COALESCE(r.n, 0) ASC, j.next_run_at ASC
+LIMIT 1
+FOR UPDATE OF j SKIP LOCKED
+""")
+
+
+class DocumentIngestJobCRUD:
+    def get(self, db: Session, knowledge_id: int) -> Optional[DocumentIngestJob]:
+        return db.scalar(
+            select(DocumentIngestJob).where(DocumentIngestJob.knowledge_id == int(knowledge_id))
+        )
+
+    def enqueue(
+        self,
+        db: Session,
+        *,
+        knowledge_id: int,
+        user_id: int,
+        max_attempts: int = 3,
+    ) -> DocumentIngestJob:
+        """문서 인제스트 작업 등록 (이미 있으면 처음 단계부터 다시 queued)"""
+        values = {
+            "knowledge_id": int(knowledge_id),
+            "user_id": int(user_id),
+            "status": "queued",
+            "stage": None,
+            "attempts": 0,
+            "max_attempts": int(max_attempts),
+            "next_run_at": func.now(),
+            "locked_by": None,
+            "locked_at": None,
+            "last_error": None,
+        }
+        stmt = (
+            pg_insert(DocumentIngestJob)
+            .values(**values)
+            .on_conflict_do_update(
+                index_elements=["knowledge_id"],
+                set_={**{k: v for k, v in values.items() if k != "knowledge_id"}, "updated_at": func.now()},
+            )
+        )
+        db.execute(stmt)
+        db.flush()
+
+        obj = self.get(db, knowledge_id)
+        if obj is None:
+            raise RuntimeError("DocumentIngestJob enqueue failed")
+        return obj
+
+    def claim_next(
+        self,
+        db: Session,
+        *,
+        worker_id: str,
+        per_user_limit: int = 1,
+    ) -> Optional[DocumentIngestJob]:
+        """
+        실행 가능한 작업 1개를 잠그고 running으로 전환 (호출자가 commit)
+        - worker_id: 이번 claim의 lease (locked_by). 이후 기록은 같은 값으로 호출해야 반영됨
+        """
+        kid = db.execute(_CLAIM_JOB_SQL, {"per_user_limit": int(per_user_limit)}).scalar()
+        if kid is None:
+            return None
+
+        db.execute(
+            update(DocumentIngestJob)
+            .where(DocumentIngestJob.knowledge_id == int(kid))
+            .values(
+                status="running",
+                attempts=DocumentIngestJob.attempts + 1,
+                locked_by=worker_id,
+                locked_at=func.now(),
+                updated_at=func.now(),
+            )
+        )
+        db.flush()
+        return self.get(db, kid)
+
+    @staticmethod
+    def _leased(knowledge_id: int, locked_by: str):
+        return (
+            DocumentIngestJob.knowledge_id == int(knowledge_id),
+            DocumentIngestJob.status == "running",
+            DocumentIngestJob.locked_by == locked_by,
+        )
+
+    def mark_stage(self, db: Session, *, knowledge_id: int, stage: str, locked_by: str) -> bool:
+        """
+        단계 완료 기록 (lease heartbeat 겸용)
+        반환: False면 lease를 잃음 (재enqueue / 재큐잉되어 다른 실행이 가져감) -> 호출자는 중단
+        """
+        res = db.execute(
+            update(DocumentIngestJob)
+            .where(*self._leased(knowledge_id, locked_by))
+            .values(stage=stage, locked_at=func.now(), updated_at=func.now())
+        )
+        db.flush()
+        return bool(res.rowcount)
+
+    def heartbeat(self, db: Session, *, knowledge_id: int, locked_by: str) -> bool:
+        """lease 연장만 (stage 그대로). 반환: False면 lease를 잃음"""
+        res = db.execute(
+            update(DocumentIngestJob)
+            .where(*self._leased(knowledge_id, locked_by))
+            .values(locked_at=func.now(), updated_at=func.now())
+        )
+        db.flush()
+        return bool(res.rowcount)
+
+    def complete(self, db: Session, *, knowledge_id: int, locked_by: str) -> bool:
+        """반환: False면 lease를 잃어서 아무것도 안 함"""
+        res = db.execute(
+            update(DocumentIngestJob)
+            .where(*self._leased(knowledge_id, locked_by))
+            .values(
+                status="succeeded",
+                locked_by=None,
+                locked_at=None,
+                last_error=None,
+                updated_at=func.now(),
+            )
+        )
+        db.flush()
+        return bool(res.rowcount)
+
+    def fail(
+        self,
+        db: Session,
+        *,
+        knowledge_id: int,
+        locked_by: str,
+        error: str,
+        backoff_base_s: float = 10.0,
+    ) -> bool:
+        """
+        실패 기록.
+        - attempts < max_attempts: 지수 백오프 후 재시도(queued, stage 유지)
+        - 그 외: failed (최종)
+        - lease를 잃었으면(다른 실행이 가져감) 아무것도 안 함
+        반환: 최종 실패 여부
+        """
+        job = db.scalar(select(DocumentIngestJob).where(*self._leased(knowledge_id, locked_by)))
+        if job is None:
+            return False
+
+        final = int(job.attempts or 0) >= int(job.max_attempts or 1)
+        values: Dict[str, Any] = {
+            "last_error": (error or "")[:2000],
+            "locked_by": None,
+            "locked_at": None,
+            "updated_at": func.now(),
+        }
+        if final:
+            values["status"] = "failed"
+        else:
+            delay_s = float(backoff_base_s) * (2 ** max(int(job.attempts or 1) - 1, 0))
+            values["status"] = "queued"
+            values["next_run_at"] = func.now() + timedelta(seconds=delay_s)
+
+        res = db.execute(
+            update(DocumentIngestJob)
+            .where(*self._leased(knowledge_id, locked_by))
+            .values(**values)
+        )
+        db.flush()
+        return final and bool(res.rowcount)
+
+    def requeue_stale(self, db: Session, *, lease_s: float) -> Tuple[int, List[int]]:
+        """
+        lease 만료된 running 작업(죽은 워커)을 queued로 되돌림 (stage 유지 -> 이어서 실행)
+        - attempts >= max_attempts면 failed + 문서도 failed (워커를 죽이는 문서가 무한 재시도되지 않게)
+        반환: (재큐잉 수, 최종 실패 처리한 knowledge_id 목록)
+        """
+        stale = (
+            DocumentIngestJob.status == "running",
+            DocumentIngestJob.locked_at < func.now() - timedelta(seconds=float(lease_s)),
+        )
+        error = "문서 처리 중 워커가 비정상 종료되었습니다 (재시도 횟수 초과)"
+        failed = list(
+            db.execute(
+                update(DocumentIngestJob)
+                .where(*stale, DocumentIngestJob.attempts >= DocumentIngestJob.max_attempts)
+                .values(
+                    status="failed",
+                    locked_by=None,
+                    locked_at=None,
+                    last_error=error,
+                    updated_at=func.now(),
+                )
+                .returning(DocumentIngestJob.knowledge_id)
+            ).scalars()
+        )
+        for kid in failed:
+            document_crud.update(db, knowledge_id=int(kid), data=DocumentUpdate(status="failed", error_message=error))
+
+        res = db.execute(
+            update(DocumentIngestJob)
+            .where(*stale)
+            .values(
+                status="queued",
+                locked_by=None,
+                locked_at=None,
+                next_run_at=func.now(),
+                updated_at=func.now(),
+            )
+        )
+        db.flush()
+        return int(res.rowcount or 0), [int(k) for k in failed]
+
+
+document_ingest_job_crud = DocumentIngestJobCRUD()
+
 # =========================================================
 # Shortcut
 # =========================================================
@@ -517,7 +1546,9 @@ def search_chunks_by_vector(
     top_k: int = 8,
     min_score: Optional[float] = None,
     score_type: str = "cosine_similarity",
-) -> List[DocumentChunk]:
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+) -> List[ChunkSearchHit]:
     return document_chunk_crud.search_by_vector(
         db=db,
         query_vector=query_vector,
@@ -525,4 +1556,29 @@ def search_chunks_by_vector(
         top_k=top_k,
         min_score=min_score,
         score_type=score_type,
+        ef_search=ef_search,
+        probes=probes,
+    )
+
+
+def search_chunks_hybrid(
+    db: Session,
+    *,
+    query_text: str,
+    query_vector: Sequence[float],
+    knowledge_id: Optional[int] = None,
+    top_k: int = 8,
+    min_score: Optional[float] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+) -> List[ChunkSearchHit]:
+    return document_chunk_crud.search_hybrid(
+        db=db,
+        query_text=query_text,
+        query_vector=query_vector,
+        knowledge_id=knowledge_id,
+        top_k=top_k,
+        min_score=min_score,
+        ef_search=ef_search,
+        probes=probes,
     )
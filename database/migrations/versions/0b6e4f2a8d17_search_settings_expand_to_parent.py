@@ -0,0 +1,30 @@
+"""document_search_settings.expand_to_parent (small-to-big retrieval)
+
+Revision ID: 0b6e4f2a8d17
+Revises: f5a0c3d7b914
+Create Date: 2026-03-02 16:48:03.215774
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0b6e4f2a8d17"
+down_revision: Union[str, Sequence[str], None] = "f5a0c3d7b914"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "document_search_settings",
+        sa.Column("expand_to_parent", sa.Boolean(), server_default=sa.text("false"), nullable=False),
+        schema="user",
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("document_search_settings", "expand_to_parent", schema="user")
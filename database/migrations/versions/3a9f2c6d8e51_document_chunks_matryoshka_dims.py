@@ -0,0 +1,98 @@
+"""document_chunks reduced-dimension vectors (text-embedding-3 dimensions 768 / 512)
+
+Revision ID: 3a9f2c6d8e51
+Revises: 7c1d5e9b2a40
+Create Date: 2026-03-05 11:20:47.503318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+from database.vector_index import create_index_sql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3a9f2c6d8e51"
+down_revision: Union[str, Sequence[str], None] = "7c1d5e9b2a40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# dim -> (column, HNSW index)
+_REDUCED = {
+    768: ("vector_memory_768", "idx_document_chunks_vec768_hnsw"),
+    512: ("vector_memory_512", "idx_document_chunks_vec512_hnsw"),
+}
+_VECTORS = "vector_memory, vector_memory_768, vector_memory_512"
+
+
+def upgrade() -> None:
+    for dim, (column, _) in _REDUCED.items():
+        op.add_column("document_chunks", sa.Column(column, Vector(dim), nullable=True), schema="user")
+
+    # child는 차원별 벡터 중 정확히 하나 (NOT VALID로 추가 -> VALIDATE는 쓰기 막지 않음)
+    op.drop_constraint("chk_document_chunks_vector_by_level", "document_chunks", schema="user", type_="check")
+    op.execute(
+        'ALTER TABLE "user".document_chunks ADD CONSTRAINT chk_document_chunks_vector_by_level CHECK ('
+        f"(chunk_level = 'child' AND num_nonnulls({_VECTORS}) = 1) "
+        f"OR (chunk_level = 'parent' AND num_nonnulls({_VECTORS}) = 0)) NOT VALID"
+    )
+    op.execute('ALTER TABLE "user".document_chunks VALIDATE CONSTRAINT chk_document_chunks_vector_by_level')
+
+    op.drop_constraint(
+        "chk_doc_ingest_embedding_dim_fixed_1536", "document_ingestion_settings", schema="user", type_="check"
+    )
+    op.create_check_constraint(
+        "chk_doc_ingest_embedding_dim_allowed",
+        "document_ingestion_settings",
+        "embedding_dim IN (512, 768, 1536)",
+        schema="user",
+    )
+
+    # 임베딩 캐시: 차원 제한 해제 (key가 "모델@dim"으로 구분, 벡터 인덱스 없음)
+    op.execute('ALTER TABLE "user".embedding_cache ALTER COLUMN vector_memory TYPE vector')
+
+    # 새 컬럼은 전부 NULL이지만 테이블 스캔은 함 -> CONCURRENTLY
+    with op.get_context().autocommit_block():
+        for dim, (column, name) in _REDUCED.items():
+            op.execute(create_index_sql("full", dim=dim, column=column, name=name))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    reduced = bind.execute(
+        sa.text('SELECT count(*) FROM "user".document_ingestion_settings WHERE embedding_dim <> 1536')
+    ).scalar()
+    if reduced:
+        raise RuntimeError(
+            f"{reduced} documents use embedding_dim < 1536; set embedding_dim=1536 and reindex them before downgrading"
+        )
+
+    with op.get_context().autocommit_block():
+        for _, name in _REDUCED.values():
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "user".{name}')
+
+    op.execute('DELETE FROM "user".embedding_cache WHERE vector_dims(vector_memory) <> 1536')
+    op.execute('ALTER TABLE "user".embedding_cache ALTER COLUMN vector_memory TYPE vector(1536)')
+
+    op.drop_constraint(
+        "chk_doc_ingest_embedding_dim_allowed", "document_ingestion_settings", schema="user", type_="check"
+    )
+    op.create_check_constraint(
+        "chk_doc_ingest_embedding_dim_fixed_1536",
+        "document_ingestion_settings",
+        "embedding_dim = 1536",
+        schema="user",
+    )
+
+    op.drop_constraint("chk_document_chunks_vector_by_level", "document_chunks", schema="user", type_="check")
+    for column, _ in _REDUCED.values():
+        op.drop_column("document_chunks", column, schema="user")
+    op.create_check_constraint(
+        "chk_document_chunks_vector_by_level",
+        "document_chunks",
+        "(chunk_level = 'child' AND vector_memory IS NOT NULL) OR (chunk_level = 'parent' AND vector_memory IS NULL)",
+        schema="user",
+    )
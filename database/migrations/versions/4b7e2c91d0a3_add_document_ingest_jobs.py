@@ -0,0 +1,70 @@
+"""add document_ingest_jobs
+
+Revision ID: 4b7e2c91d0a3
+Revises: 2715e3598f1a
+Create Date: 2026-02-10 10:12:31.204118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4b7e2c91d0a3"
+down_revision: Union[str, Sequence[str], None] = "2715e3598f1a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "document_ingest_jobs",
+        sa.Column("knowledge_id", sa.BigInteger(), nullable=False),
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.Column("status", sa.Text(), server_default=sa.text("'queued'"), nullable=False),
+        sa.Column("stage", sa.Text(), nullable=True),
+        sa.Column("attempts", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), server_default=sa.text("3"), nullable=False),
+        sa.Column("next_run_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("locked_by", sa.Text(), nullable=True),
+        sa.Column("locked_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.CheckConstraint(
+            "status IN ('queued', 'running', 'succeeded', 'failed')",
+            name="chk_document_ingest_jobs_status_enum",
+        ),
+        sa.CheckConstraint(
+            "stage IS NULL OR stage IN ('extract', 'pages', 'chunk', 'embed', 'store')",
+            name="chk_document_ingest_jobs_stage_enum",
+        ),
+        sa.CheckConstraint("attempts >= 0", name="chk_document_ingest_jobs_attempts_nonneg"),
+        sa.CheckConstraint("max_attempts >= 1", name="chk_document_ingest_jobs_max_attempts_ge_1"),
+        sa.ForeignKeyConstraint(
+            ["knowledge_id"], ["user.documents.knowledge_id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["user.users.user_id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("knowledge_id"),
+        schema="user",
+    )
+    op.create_index(
+        "idx_document_ingest_jobs_status_next",
+        "document_ingest_jobs",
+        ["status", "next_run_at"],
+        schema="user",
+    )
+    op.create_index(
+        "idx_document_ingest_jobs_user_status",
+        "document_ingest_jobs",
+        ["user_id", "status"],
+        schema="user",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_document_ingest_jobs_user_status", table_name="document_ingest_jobs", schema="user")
+    op.drop_index("idx_document_ingest_jobs_status_next", table_name="document_ingest_jobs", schema="user")
+    op.drop_table("document_ingest_jobs", schema="user")
@@ -0,0 +1,27 @@
+"""add documents.ingest_fingerprint
+
+Revision ID: 5d2e8b4f7a13
+Revises: 3a9f2c6d8e51
+Create Date: 2026-03-09 10:41:18.730256
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5d2e8b4f7a13"
+down_revision: Union[str, Sequence[str], None] = "3a9f2c6d8e51"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 기존 문서는 NULL -> 재인덱스 전까지 dedup 원본 후보에서 빠짐
+    op.add_column("documents", sa.Column("ingest_fingerprint", sa.Text(), nullable=True), schema="user")
+
+
+def downgrade() -> None:
+    op.drop_column("documents", "ingest_fingerprint", schema="user")
@@ -0,0 +1,41 @@
+"""document_chunks quantized ann index (halfvec / binary expression index)
+
+Revision ID: 7c1d5e9b2a40
+Revises: 0b6e4f2a8d17
+Create Date: 2026-02-27 10:42:31.118204
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+
+from database.vector_index import apply_vector_storage_mode, drop_index_sql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7c1d5e9b2a40"
+down_revision: Union[str, Sequence[str], None] = "0b6e4f2a8d17"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_DIM = 1536
+
+
+def upgrade() -> None:
+    # 배포별 저장 모드 (core.config.VECTOR_STORAGE_MODE와 같은 env)
+    # - full이면 변경 없음
+    # - halfvec/binary: 식 인덱스만 추가 (컬럼/백필 없음). 기존 float32 인덱스는 남겨둠
+    #   -> 앱 전환 후 `python -m script.vector_storage_mode --mode <mode> --drop-others`로 정리
+    mode = os.getenv("VECTOR_STORAGE_MODE", "full")
+    if mode == "full":
+        return
+    with op.get_context().autocommit_block():
+        apply_vector_storage_mode(op.execute, mode, dim=_DIM)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        apply_vector_storage_mode(op.execute, "full", dim=_DIM)
+        op.execute(drop_index_sql("halfvec"))
+        op.execute(drop_index_sql("binary"))
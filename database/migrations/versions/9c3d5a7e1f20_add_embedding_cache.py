@@ -0,0 +1,36 @@
+"""add embedding_cache
+
+Revision ID: 9c3d5a7e1f20
+Revises: 4b7e2c91d0a3
+Create Date: 2026-02-11 09:41:05.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9c3d5a7e1f20"
+down_revision: Union[str, Sequence[str], None] = "4b7e2c91d0a3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "embedding_cache",
+        sa.Column("embedding_model", sa.Text(), nullable=False),
+        sa.Column("text_hash", sa.Text(), nullable=False),
+        sa.Column("vector_memory", Vector(1536), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.CheckConstraint("length(text_hash) = 64", name="chk_embedding_cache_hash_len"),
+        sa.PrimaryKeyConstraint("embedding_model", "text_hash"),
+        schema="user",
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("embedding_cache", schema="user")
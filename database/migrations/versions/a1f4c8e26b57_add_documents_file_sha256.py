@@ -0,0 +1,26 @@
+"""add documents.file_sha256
+
+Revision ID: a1f4c8e26b57
+Revises: 9c3d5a7e1f20
+Create Date: 2026-02-16 14:12:37.204418
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a1f4c8e26b57"
+down_revision: Union[str, Sequence[str], None] = "9c3d5a7e1f20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("documents", sa.Column("file_sha256", sa.Text(), nullable=True), schema="user")
+
+
+def downgrade() -> None:
+    op.drop_column("documents", "file_sha256", schema="user")
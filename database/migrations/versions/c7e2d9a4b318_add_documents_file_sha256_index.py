@@ -0,0 +1,25 @@
+"""add documents.file_sha256 index (upload dedup)
+
+Revision ID: c7e2d9a4b318
+Revises: a1f4c8e26b57
+Create Date: 2026-02-18 10:27:51.883104
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c7e2d9a4b318"
+down_revision: Union[str, Sequence[str], None] = "a1f4c8e26b57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("idx_documents_file_sha256", "documents", ["file_sha256"], unique=False, schema="user")
+
+
+def downgrade() -> None:
+    op.drop_index("idx_documents_file_sha256", table_name="documents", schema="user")
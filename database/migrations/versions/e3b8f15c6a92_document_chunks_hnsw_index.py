@@ -0,0 +1,69 @@
+"""document_chunks hnsw index + per-knowledge ann params
+
+Revision ID: e3b8f15c6a92
+Revises: c7e2d9a4b318
+Create Date: 2026-02-23 14:05:12.407319
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e3b8f15c6a92"
+down_revision: Union[str, Sequence[str], None] = "c7e2d9a4b318"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("document_search_settings", sa.Column("hnsw_ef_search", sa.Integer(), nullable=True), schema="user")
+    op.add_column("document_search_settings", sa.Column("ivfflat_probes", sa.Integer(), nullable=True), schema="user")
+
+    # 검색 쿼리는 항상 chunk_level='child' -> partial index (parent 행은 벡터도 없음)
+    # CONCURRENTLY: 인덱스 빌드 중에도 인제스트 INSERT를 막지 않음 (트랜잭션 밖에서 실행)
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_document_chunks_vec_hnsw",
+            "document_chunks",
+            ["vector_memory"],
+            unique=False,
+            schema="user",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"vector_memory": "vector_cosine_ops"},
+            postgresql_where=sa.text("chunk_level = 'child'"),
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "idx_document_chunks_vec_ivfflat",
+            table_name="document_chunks",
+            schema="user",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_document_chunks_vec_ivfflat",
+            "document_chunks",
+            ["vector_memory"],
+            unique=False,
+            schema="user",
+            postgresql_using="ivfflat",
+            postgresql_with={"lists": 100},
+            postgresql_ops={"vector_memory": "vector_cosine_ops"},
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "idx_document_chunks_vec_hnsw",
+            table_name="document_chunks",
+            schema="user",
+            postgresql_concurrently=True,
+        )
+
+    op.drop_column("document_search_settings", "ivfflat_probes", schema="user")
+    op.drop_column("document_search_settings", "hnsw_ef_search", schema="user")
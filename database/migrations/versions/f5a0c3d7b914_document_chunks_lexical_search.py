@@ -0,0 +1,58 @@
+"""document_chunks lexical index + search_mode (hybrid retrieval)
+
+Revision ID: f5a0c3d7b914
+Revises: e3b8f15c6a92
+Create Date: 2026-02-26 11:12:40.930157
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f5a0c3d7b914"
+down_revision: Union[str, Sequence[str], None] = "e3b8f15c6a92"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "document_search_settings",
+        sa.Column("search_mode", sa.Text(), server_default=sa.text("'vector'"), nullable=False),
+        schema="user",
+    )
+    op.create_check_constraint(
+        "chk_doc_search_mode",
+        "document_search_settings",
+        "search_mode IN ('vector', 'hybrid')",
+        schema="user",
+    )
+
+    # 'simple' 설정 (형태소 분석 없음) -> API 이름/에러 코드/조항 번호 같은 원문 토큰 그대로 색인
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_document_chunks_text_tsv",
+            "document_chunks",
+            [sa.text("to_tsvector('simple'::regconfig, chunk_text)")],
+            unique=False,
+            schema="user",
+            postgresql_using="gin",
+            postgresql_where=sa.text("chunk_level = 'child'"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "idx_document_chunks_text_tsv",
+            table_name="document_chunks",
+            schema="user",
+            postgresql_concurrently=True,
+        )
+
+    op.drop_constraint("chk_doc_search_mode", "document_search_settings", schema="user", type_="check")
+    op.drop_column("document_search_settings", "search_mode", schema="user")
@@ -0,0 +1,77 @@
+# database/vector_index.py
+from __future__ import annotations
+
+"""
+document_chunks ANN 인덱스 정의 (저장 모드별).
+
+- full   : vector_memory (float32) 그대로 HNSW
+- halfvec: (vector_memory::halfvec(dim)) 식 인덱스 -> 인덱스 크기 약 1/2
+- binary : (binary_quantize(vector_memory)::bit(dim)) 식 인덱스 -> 약 1/32, hamming 거리
+
+원본 float32 컬럼은 그대로 두고 인덱스만 줄임 (검색은 후보 top-N을 원본으로 다시 채점).
+식 인덱스라 별도 컬럼/백필이 없고 INSERT 시 Postgres가 알아서 계산.
+migration과 script/vector_storage_mode.py가 같이 사용.
+"""
+
+from typing import Callable, Dict, Optional, Tuple
+
+VECTOR_STORAGE_MODES: Tuple[str, ...] = ("full", "halfvec", "binary")
+
+_TABLE = '"user".document_chunks'
+
+# mode -> (index name, indexed expression, opclass)
+_INDEXES: Dict[str, Tuple[str, str, str]] = {
+    "full": ("idx_document_chunks_vec_hnsw", "{col}", "vector_cosine_ops"),
+    "halfvec": ("idx_document_chunks_vec_hnsw_half", "({col}::halfvec({dim}))", "halfvec_cosine_ops"),
+    "binary": ("idx_document_chunks_vec_hnsw_bit", "(binary_quantize({col})::bit({dim}))", "bit_hamming_ops"),
+}
+
+
+def index_name(mode: str) -> str:
+    if mode not in _INDEXES:
+        raise ValueError(f"unknown vector storage mode: {mode} (expected one of {VECTOR_STORAGE_MODES})")
+    return _INDEXES[mode][0]
+
+
+def create_index_sql(
+    mode: str,
+    *,
+    dim: int,
+    table: str = _TABLE,
+    column: str = "vector_memory",
+    name: Optional[str] = None,
+    where: Optional[str] = "chunk_level = 'child'",
+    m: int = 16,
+    ef_construction: int = 64,
+) -> str:
+    """CONCURRENTLY -> 트랜잭션 밖(autocommit)에서 실행해야 함"""
+    _, expr, opclass = _INDEXES[mode]
+    sql = (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name or index_name(mode)} ON {table} "
+        f"USING hnsw ({expr.format(col=column, dim=int(dim))} {opclass}) "
+        f"WITH (m = {int(m)}, ef_construction = {int(ef_construction)})"
+    )
+    return f"{sql} WHERE {where}" if where else sql
+
+
+def drop_index_sql(mode: str, *, schema: str = '"user"') -> str:
+    return f"DROP INDEX CONCURRENTLY IF EXISTS {schema}.{index_name(mode)}"
+
+
+def apply_vector_storage_mode(
+    execute: Callable[[str], None],
+    mode: str,
+    *,
+    dim: int,
+    drop_others: bool = False,
+) -> None:
+    """
+    mode 인덱스 생성 (이미 있으면 skip) -> drop_others면 다른 모드 인덱스 삭제.
+    순서: 새 인덱스 먼저 -> 앱 설정(VECTOR_STORAGE_MODE) 전환 -> 옛 인덱스 삭제.
+    """
+    index_name(mode)
+    execute(create_index_sql(mode, dim=dim))
+    if drop_others:
+        for other in VECTOR_STORAGE_MODES:
+            if other != mode:
+                execute(drop_index_sql(other))
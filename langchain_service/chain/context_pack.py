@@ -0,0 +1,237 @@
+# langchain_service/chain/context_pack.py
+from __future__ import annotations
+
+"""
+Context packing (stage1 보조).
+
+검색 결과 chunk 목록 -> LLM 컨텍스트 문자열 1개.
+- 토큰 수는 대상 모델 encoder로 셈 (core.pricing, tiktoken 없으면 글자 수)
+- 점수 순으로 고르고, 모델별 토큰 예산(config.CONTEXT_TOKEN_BUDGETS)에서 멈춤
+- 출력은 문서 위치 순 (문서는 최고 점수 순, 문서 안에서는 chunk_index 순)
+- 같은 문서의 인접 chunk_index끼리는 chunk_overlap으로 겹친 앞부분을 잘라 이어 붙임
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from core import config
+from core.pricing import get_token_encoder
+
+
+@dataclass
+class PackedContext:
+    text: str
+    tokens: int  # text 전체 토큰 수 (대상 모델 encoder 기준)
+    chunks: List[Any] = field(default_factory=list)  # 포함된 chunk (출력 순서)
+    dropped: int = 0  # 예산 초과로 빠진 chunk 수
+    overlap_chars: int = 0  # 인접 chunk 겹침 제거로 줄인 글자 수
+
+
+@dataclass
+class _Item:
+    rank: int
+    obj: Any
+    text: str
+    score: float
+    knowledge_id: Optional[int]
+    chunk_index: Optional[int]
+
+
+def _get(obj: Any, *names: str) -> Any:
+    for name in names:
+        v = obj.get(name) if isinstance(obj, Mapping) else getattr(obj, name, None)
+        if v is not None:
+            return v
+    return None
+
+
+def _as_int(v: Any) -> Optional[int]:
+    try:
+        return int(v) if v is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def context_token_budget(model: Optional[str]) -> int:
+    """모델별 컨텍스트 토큰 예산 (없으면 CONTEXT_TOKEN_BUDGET)"""
+    budgets = getattr(config, "CONTEXT_TOKEN_BUDGETS", {}) or {}
+    if model and model in budgets:
+        return int(budgets[model])
+    return int(getattr(config, "CONTEXT_TOKEN_BUDGET", 3000))
+
+
+def _token_fns(model: str) -> Tuple[Callable[[str], int], Callable[[str, int], str]]:
+    """(count, truncate) - encoder 없으면 글자 수 기준"""
+    enc = get_token_encoder(model)
+    if enc is None:
+        return len, lambda s, n: s[:n]
+
+    def count(s: str) -> int:
+        return len(enc.encode(s)) if s else 0
+
+    def truncate(s: str, n: int) -> str:
+        return enc.decode(enc.encode(s)[:n])
+
+    return count, truncate
+
+
+def overlap_length(prev: str, nxt: str, *, min_chars: int = 0) -> int:
+    """
+    prev의 끝부분 == nxt의 앞부분인 가장 긴 길이 (글자 수).
+    KMP prefix function으로 O(len). min_chars 미만이면 0 (짧은 우연 일치 무시).
+    """
+    if not prev or not nxt:
+        return 0
+    tail = prev[-len(nxt):]
+    s = nxt + "\x00" + tail
+    pi = [0] * len(s)
+    for i in range(1, len(s)):
+        k = pi[i - 1]
+        while k and s[i] != s[k]:
+            k = pi[k - 1]
+        if s[i] == s[k]:
+            k += 1
+        pi[i] = k
+    n = pi[-1]
+    return n if n >= max(1, min_chars) else 0
+
+
+def _adjacent(a: _Item, b: _Item) -> bool:
+    return (
+        a.knowledge_id is not None
+        and a.knowledge_id == b.knowledge_id
+        and a.chunk_index is not None
+        and b.chunk_index is not None
+        and b.chunk_index == a.chunk_index + 1
+    )
+
+
+def _document_order(items: Sequence[_Item]) -> List[_Item]:
+    """문서는 최고 점수(rank) 순, 문서 안에서는 chunk_index 순"""
+    doc_rank: Dict[Any, int] = {}
+    for it in items:
+        key = it.knowledge_id if it.knowledge_id is not None else ("rank", it.rank)
+        doc_rank[key] = min(doc_rank.get(key, it.rank), it.rank)
+
+    def sort_key(it: _Item):
+        key = it.knowledge_id if it.knowledge_id is not None else ("rank", it.rank)
+        pos = it.chunk_index if it.chunk_index is not None else float("inf")
+        return (doc_rank[key], pos, it.rank)
+
+    return sorted(items, key=sort_key)
+
+
+def _join(items: Sequence[_Item], separator: str, min_overlap: int) -> Tuple[str, int]:
+    parts: List[str] = []
+    removed = 0
+    prev: Optional[_Item] = None
+    for it in items:
+        text = it.text
+        if prev is not None:
+            ov = overlap_length(prev.text, text, min_chars=min_overlap) if _adjacent(prev, it) else 0
+            if ov:
+                # 원문에서 이어지는 구간 -> 구분자 없이 겹친 부분만 빼고 이어 붙임
+                parts.append(text[ov:])
+                removed += ov
+            else:
+                parts.append(separator)
+                parts.append(text)
+        else:
+            parts.append(text)
+        prev = it
+    return "".join(parts), removed
+
+
+def pack_context(
+    chunks: Sequence[Any],
+    *,
+    model: Optional[str] = None,
+    token_budget: Optional[int] = None,
+    separator: str = "\n\n",
+) -> PackedContext:
+    """
+    chunks: ChunkSearchHit / QASource / dict (chunk_text|text, score, knowledge_id, chunk_index).
+    입력 순서 = 순위 (score 없으면 입력 순서대로, 있으면 score 내림차순).
+    예산을 넘는 chunk는 건너뛰고 다음(더 짧은) chunk를 시도. 첫 chunk만으로 넘치면 잘라서 넣음.
+    """
+    enc_model = model or getattr(config, "DEFAULT_CHAT_MODEL", "gpt-4o-mini")
+    budget = int(token_budget) if token_budget else context_token_budget(model)
+    min_overlap = int(getattr(config, "CONTEXT_OVERLAP_MIN_CHARS", 20))
+    count, truncate = _token_fns(enc_model)
+
+    items: List[_Item] = []
+    for rank, c in enumerate(chunks or []):
+        text = _get(c, "chunk_text", "text", "content")
+        if not text:
+            continue
+        score = _get(c, "score")
+        items.append(
+            _Item(
+                rank=rank,
+                obj=c,
+                text=str(text),
+                score=float(score) if score is not None else float("-inf"),
+                knowledge_id=_as_int(_get(c, "knowledge_id")),
+                chunk_index=_as_int(_get(c, "chunk_index")),
+            )
+        )
+    if not items:
+        return PackedContext(text="", tokens=0)
+
+    # score 내림차순 (동점/score 없음은 입력 순서)
+    items.sort(key=lambda it: (-it.score, it.rank))
+    for new_rank, it in enumerate(items):
+        it.rank = new_rank
+
+    by_pos: Dict[Tuple[int, int], _Item] = {
+        (it.knowledge_id, it.chunk_index): it
+        for it in items
+        if it.knowledge_id is not None and it.chunk_index is not None
+    }
+    sep_tokens = count(separator)
+
+    selected: List[_Item] = []
+    chosen: set = set()
+    used = 0
+    dropped = 0
+    for it in items:
+        # 이미 고른 이웃과 겹치는 부분은 비용에서 뺌 (최종 토큰 수는 아래에서 다시 셈)
+        start, end = 0, len(it.text)
+        if it.knowledge_id is not None and it.chunk_index is not None:
+            left = by_pos.get((it.knowledge_id, it.chunk_index - 1))
+            right = by_pos.get((it.knowledge_id, it.chunk_index + 1))
+            if left is not None and left.rank in chosen:
+                start = overlap_length(left.text, it.text, min_chars=min_overlap)
+            if right is not None and right.rank in chosen:
+                end -= overlap_length(it.text, right.text, min_chars=min_overlap)
+        cost = (count(it.text[start:end]) if start < end else 0) + (sep_tokens if selected else 0)
+
+        if used + cost > budget:
+            if not selected:
+                it.text = truncate(it.text, budget)
+                cost = count(it.text)
+            else:
+                dropped += 1
+                continue
+        used += cost
+        selected.append(it)
+        chosen.add(it.rank)
+
+    # 예산 보정: 경계 토큰 차이로 넘치면 점수 낮은 것부터 뺌
+    ordered = _document_order(selected)
+    text, removed = _join(ordered, separator, min_overlap)
+    tokens = count(text)
+    while tokens > budget and len(selected) > 1:
+        selected.pop()
+        dropped += 1
+        ordered = _document_order(selected)
+        text, removed = _join(ordered, separator, min_overlap)
+        tokens = count(text)
+
+    return PackedContext(
+        text=text,
+        tokens=tokens,
+        chunks=[it.obj for it in ordered],
+        dropped=dropped,
+        overlap_chars=removed,
+    )
@@ -87,6 +87,8 @@ GF_USED = "used"
 GF_RETRIEVED_COUNT = "retrieved_count"
 GF_TOP_K = "top_k"
 GF_THRESHOLD = "threshold"
+# optional: context packing 결과 토큰 수 (retrieve_fn이 chunks를 줘서 packing 했을 때만)
+GF_CONTEXT_TOKENS = "context_tokens"
 
 RETRIEVAL_KEYS: Tuple[str, ...] = (
     GF_USED,
@@ -141,6 +143,7 @@ class RetrievalDict(TypedDict):
     top_k: Optional[int]
     threshold: Optional[float]
     knowledge_ids: List[int]
+    context_tokens: NotRequired[int]
 
 
 class Stage0Out(TypedDict):
@@ -36,6 +36,7 @@ from langchain_service.chain.contracts import (
     GF_RETRIEVED_COUNT,
     GF_TOP_K,
     GF_THRESHOLD,
+    GF_CONTEXT_TOKENS,
 
     # validators / errors
     ContractError,
@@ -236,12 +237,14 @@ def make_qa_chain(
             dd["retrieve_fn"] = retrieve_fn
             out = stage_retrieve_context(dd)  # full dict(stage1)
             ctx = str(out.get(GF_CONTEXT) or "")
-            if max_ctx_chars and len(ctx) > max_ctx_chars:
+            retrieval = dict(out.get(GF_RETRIEVAL) or {})
+            # 토큰 예산으로 packing 된 context는 글자 수로 다시 자르지 않음
+            if max_ctx_chars and len(ctx) > max_ctx_chars and GF_CONTEXT_TOKENS not in retrieval:
                 ctx = ctx[:max_ctx_chars]
             return {
                 GF_CONTEXT: ctx,
                 GF_SOURCES: list(out.get(GF_SOURCES) or []),
-                GF_RETRIEVAL: dict(out.get(GF_RETRIEVAL) or {}),
+                GF_RETRIEVAL: retrieval,
             }
 
         # 2) fallback: context_text(외부 RAG) 사용
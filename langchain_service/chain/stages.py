@@ -31,6 +31,7 @@ from langchain_service.chain.contracts import (
     GF_RETRIEVED_COUNT,
     GF_TOP_K,
     GF_THRESHOLD,
+    GF_CONTEXT_TOKENS,
     # guards/validators
     ContractError,
     ensure_dict,
@@ -41,6 +42,7 @@ from langchain_service.chain.contracts import (
     validate_stage4,
     validate_final,
 )
+from langchain_service.chain.context_pack import pack_context
 
 # (선택) config 있으면 response_length_preset -> max_tokens 매핑에 활용
 try:
@@ -250,6 +252,44 @@ def normalize_input(inp: Any) -> Dict[str, Any]:
 # =========================================================
 # (1) retrieve_context
 # =========================================================
+def _pack_retrieved(
+    d: Mapping[str, Any],
+    res: Mapping[str, Any],
+    chunks: List[Any],
+    sources: List[Dict[str, Any]],
+    search_params: Any,
+) -> Tuple[str, List[Dict[str, Any]], int]:
+    """
+    retrieve_fn 결과의 chunks -> (context, sources, context_tokens)
+    - 토큰 예산: search_params.context_token_budget > 모델별 config 값
+    - context_prefix/context_suffix(안내 문구)는 packing 결과 앞뒤에 그대로 붙임 (예산 밖)
+    - sources는 실제로 context에 들어간 chunk만 남김
+    """
+    budget = None
+    if isinstance(search_params, Mapping):
+        try:
+            budget = int(search_params.get("context_token_budget") or 0) or None
+        except (TypeError, ValueError):
+            budget = None
+
+    packed = pack_context(chunks, model=_pick_model_name(d), token_budget=budget)
+    if not packed.text:
+        return "", [], 0
+
+    prefix = str(res.get("context_prefix") or "")
+    suffix = str(res.get("context_suffix") or "")
+    context = f"{prefix}{packed.text}{suffix}"
+
+    kept_ids = {
+        (c.get("chunk_id") if isinstance(c, Mapping) else getattr(c, "chunk_id", None))
+        for c in packed.chunks
+    }
+    kept_ids.discard(None)
+    if kept_ids:
+        sources = [s for s in sources if not isinstance(s, Mapping) or s.get("chunk_id") in kept_ids]
+    return context, sources, packed.tokens
+
+
 def retrieve_context(d: Mapping[str, Any]) -> Dict[str, Any]:
     """
     RAG branch:
@@ -320,6 +360,7 @@ def retrieve_context(d: Mapping[str, Any]) -> Dict[str, Any]:
         res = retrieve_fn(dd)
 
     # 결과 파싱 (dict/tuple/str 허용)
+    context_tokens: Optional[int] = None
     if isinstance(res, Mapping):
         context = str(res.get("context") or "")
         sources = list(res.get("sources") or [])
@@ -331,6 +372,11 @@ def retrieve_context(d: Mapping[str, Any]) -> Dict[str, Any]:
         else:
             retrieved_count = len(sources) if sources else 0
 
+        # chunks를 주면 여기서 모델 토큰 예산에 맞춰 packing (context 문자열 대신)
+        chunks = res.get("chunks")
+        if isinstance(chunks, list) and chunks:
+            context, sources, context_tokens = _pack_retrieved(dd, res, chunks, sources, search_params)
+
     elif isinstance(res, tuple) or isinstance(res, list):
         # (context, sources) or (context, sources, meta)
         context = str(res[0] or "") if len(res) >= 1 else ""
@@ -357,6 +403,8 @@ def retrieve_context(d: Mapping[str, Any]) -> Dict[str, Any]:
         GF_THRESHOLD: threshold,
         GF_KNOWLEDGE_IDS: list(knowledge_ids),
     }
+    if context_tokens is not None:
+        dd[GF_RETRIEVAL][GF_CONTEXT_TOKENS] = int(context_tokens)
 
     validate_stage1(dd)
     return dd
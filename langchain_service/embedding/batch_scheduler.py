@@ -0,0 +1,241 @@
+# langchain_service/embedding/batch_scheduler.py
+from __future__ import annotations
+
+import time
+import random
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.embeddings import Embeddings
+
+from core import config
+from core.pricing import get_token_encoder
+
+log = logging.getLogger(__name__)
+
+
+# =========================================================
+# 배치 패킹 (토큰 예산 기준)
+# =========================================================
+@dataclass
+class TextBatch:
+    indices: List[int] = field(default_factory=list)  # 원본 texts 인덱스 (순서 유지)
+    tokens: int = 0
+
+
+def count_text_tokens(model: str, texts: Sequence[str]) -> List[int]:
+    """텍스트별 토큰 수 (encoder 없으면 글자 수)"""
+    enc = get_token_encoder(model)
+    if enc is None:
+        return [len(t or "") for t in texts]
+    return [len(enc.encode(t or "")) for t in texts]
+
+
+def pack_batches_by_tokens(
+    token_counts: Sequence[int],
+    *,
+    max_tokens: int,
+    max_items: int,
+) -> List[TextBatch]:
+    """
+    순서대로 채우다가 토큰 예산(max_tokens) 또는 개수(max_items)를 넘으면 다음 배치.
+    - 단일 텍스트가 예산보다 크면 단독 배치
+    """
+    max_tokens = max(1, int(max_tokens))
+    max_items = max(1, int(max_items))
+
+    batches: List[TextBatch] = []
+    cur = TextBatch()
+    for i, n in enumerate(token_counts):
+        n = int(n)
+        if cur.indices and (cur.tokens + n > max_tokens or len(cur.indices) >= max_items):
+            batches.append(cur)
+            cur = TextBatch()
+        cur.indices.append(i)
+        cur.tokens += n
+    if cur.indices:
+        batches.append(cur)
+    return batches
+
+
+# =========================================================
+# 429 판별
+# =========================================================
+def _is_rate_limited(exc: BaseException) -> bool:
+    if getattr(exc, "status_code", None) == 429:
+        return True
+    resp = getattr(exc, "response", None)
+    if getattr(resp, "status_code", None) == 429:
+        return True
+    return type(exc).__name__ == "RateLimitError"
+
+
+def _retry_after_s(exc: BaseException) -> Optional[float]:
+    ra = getattr(exc, "retry_after", None)
+    if ra is None:
+        headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+        try:
+            ra = headers.get("retry-after")
+        except Exception:
+            ra = None
+    try:
+        return float(ra) if ra is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+# =========================================================
+# Scheduler
+# =========================================================
+@dataclass
+class EmbeddingBatchResult:
+    vectors: List[List[float]]
+    total_tokens: int
+    batch_count: int
+    rate_limited: int
+
+
+class EmbeddingBatchScheduler:
+    """
+    배치를 bounded concurrency로 동시 전송.
+    - 429 발생 시 retry-after(없으면 지수 백오프+jitter) 동안 "모든" 요청을 멈춤 (공유 cooldown)
+    - 429마다 동시 전송 한도를 절반으로 줄이고, 연속 성공하면 1씩 회복 (AIMD)
+    - 결과는 원본 texts 순서로 재조립
+    - 429 외 예외는 그대로 전파
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        *,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_base_s: Optional[float] = None,
+        backoff_max_s: Optional[float] = None,
+    ):
+        self.embeddings = embeddings
+        self.max_concurrency = max(1, int(max_concurrency or getattr(config, "EMBEDDING_MAX_CONCURRENCY", 4)))
+        self.max_retries = int(max_retries if max_retries is not None else getattr(config, "EMBEDDING_MAX_RETRIES", 6))
+        self.backoff_base_s = float(backoff_base_s if backoff_base_s is not None else getattr(config, "EMBEDDING_BACKOFF_BASE_S", 1.0))
+        self.backoff_max_s = float(backoff_max_s if backoff_max_s is not None else getattr(config, "EMBEDDING_BACKOFF_MAX_S", 30.0))
+
+        self._cond = threading.Condition()
+        self._limit = self.max_concurrency
+        self._inflight = 0
+        self._streak = 0
+        self._cooldown_until = 0.0
+        self._rate_limited = 0
+
+    def _acquire(self) -> None:
+        with self._cond:
+            while True:
+                wait = self._cooldown_until - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                if self._inflight < self._limit:
+                    self._inflight += 1
+                    return
+                self._cond.wait()
+
+    def _release(self, *, ok: bool) -> None:
+        with self._cond:
+            self._inflight -= 1
+            if ok:
+                self._streak += 1
+                if self._limit < self.max_concurrency and self._streak >= self._limit:
+                    self._limit += 1
+                    self._streak = 0
+            self._cond.notify_all()
+
+    def _on_rate_limited(self, exc: BaseException, attempt: int) -> None:
+        delay = _retry_after_s(exc)
+        if delay is None:
+            delay = min(self.backoff_max_s, self.backoff_base_s * (2 ** attempt))
+            delay *= 0.5 + random.random() * 0.5
+        with self._cond:
+            self._rate_limited += 1
+            self._streak = 0
+            self._limit = max(1, self._limit // 2)
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+            self._cond.notify_all()
+        log.warning("embedding rate limited (attempt=%s), backoff %.2fs, concurrency=%s", attempt + 1, delay, self._limit)
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            self._acquire()
+            try:
+                vecs = self.embeddings.embed_documents(texts)
+            except Exception as e:
+                self._release(ok=False)
+                if not _is_rate_limited(e) or attempt >= self.max_retries:
+                    raise
+                self._on_rate_limited(e, attempt)
+                attempt += 1
+                continue
+            self._release(ok=True)
+            return vecs
+
+    def run(self, texts: Sequence[str], batches: Sequence[TextBatch]) -> List[List[float]]:
+        out: List[Optional[List[float]]] = [None] * len(texts)
+
+        def _job(batch: TextBatch) -> None:
+            vecs = self.embed_batch([texts[i] for i in batch.indices])
+            if len(vecs) != len(batch.indices):
+                raise RuntimeError("embedding count does not match batch size")
+            for i, vec in zip(batch.indices, vecs):
+                out[i] = [float(v) for v in vec]
+
+        if len(batches) <= 1 or self.max_concurrency == 1:
+            for b in batches:
+                _job(b)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as pool:
+                futures = [pool.submit(_job, b) for b in batches]
+                try:
+                    for f in futures:
+                        f.result()
+                except BaseException:
+                    for f in futures:
+                        f.cancel()
+                    raise
+
+        return out  # type: ignore[return-value]
+
+    @property
+    def rate_limited(self) -> int:
+        return self._rate_limited
+
+
+def embed_texts_batched(
+    embeddings: Embeddings,
+    texts: Sequence[str],
+    *,
+    model: str,
+    max_batch_tokens: Optional[int] = None,
+    max_batch_items: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+) -> EmbeddingBatchResult:
+    """토큰 예산으로 배치를 묶고 동시 전송. 토큰 수는 비용 집계에 재사용."""
+    if not texts:
+        return EmbeddingBatchResult(vectors=[], total_tokens=0, batch_count=0, rate_limited=0)
+
+    token_counts = count_text_tokens(model, texts)
+    batches = pack_batches_by_tokens(
+        token_counts,
+        max_tokens=int(max_batch_tokens or getattr(config, "EMBEDDING_BATCH_MAX_TOKENS", 100_000)),
+        max_items=int(max_batch_items or getattr(config, "EMBEDDING_BATCH_MAX_ITEMS", 512)),
+    )
+
+    scheduler = EmbeddingBatchScheduler(embeddings, max_concurrency=max_concurrency)
+    vectors = scheduler.run(texts, batches)
+    return EmbeddingBatchResult(
+        vectors=vectors,
+        total_tokens=int(sum(token_counts)),
+        batch_count=len(batches),
+        rate_limited=scheduler.rate_limited,
+    )
@@ -8,6 +8,8 @@ from langchain_core.embeddings import Embeddings
 
 import core.config as config
 from langchain_service.embedding.openai_embedder import build_openai_embeddings
+from langchain_service.embedding.fake_embedder import FakeEmbeddings
+from langchain_service.embedding.local_embedder import get_local_embeddings
 from sklearn.metrics.pairwise import cosine_similarity  # 사용 중이면 유지, 아니면 삭제 가능
 
 # LangChain용 Upstage Embeddings 사용
@@ -18,7 +20,7 @@ except ImportError:  # 패키지 없으면 None 처리
 
 
 # 지원 provider 타입
-ProviderType = Literal["openai", "exaone", "upstage", "google"]
+ProviderType = Literal["openai", "local", "exaone", "upstage", "google", "fake"]
 
 # ==============================
 # 통합 factory
@@ -28,12 +30,18 @@ def get_embeddings(
     *,
     api_key: Optional[str] = None,
     model: Optional[str] = None,
+    dimensions: Optional[int] = None,
 ) -> Embeddings:
     """
     서비스 전체에서 임베딩 객체를 얻는 통합 엔트리.
     - 기본은 OpenAI 임베딩
     - exaone / upstage / google 은 필요 시 사용
+    - local 은 sentence-transformers CPU 임베더 (오프라인, 과금 없음)
+    - fake 는 네트워크 없는 로컬 임베더 (벤치마크용)
+    - dimensions: 출력 차원 축소 (openai text-embedding-3-* / local / fake만, 원본 차원이면 무시)
     """
+    if dimensions and provider not in ("openai", "local", "fake"):
+        raise ValueError(f"embedding provider {provider}는 dimensions를 지원하지 않습니다.")
 
     # ---------- OpenAI ----------
     if provider == "openai":
@@ -46,12 +54,29 @@ def get_embeddings(
         if not effective_model:
             raise RuntimeError("OpenAI Embedding 모델(EMBEDDING_MODEL)이 설정되지 않았습니다.")
 
-        # 여기서 build_openai_embeddings 는 (api_key, model) 기준 싱글톤/캐시를 사용
+        dims = int(dimensions) if dimensions else None
+        if dims == config.EMBEDDING_MODEL_DIMS.get(effective_model):
+            dims = None  # 원본 차원 -> 기존 인스턴스 공유
+        if dims is not None and effective_model not in getattr(config, "EMBEDDING_DIMENSIONS_MODELS", ()):
+            raise RuntimeError(f"{effective_model} 모델은 dimensions 축소를 지원하지 않습니다.")
+
+        # 여기서 build_openai_embeddings 는 (api_key, model, dimensions) 기준 싱글톤/캐시를 사용
         return build_openai_embeddings(
             api_key=effective_key,
             model=effective_model,
+            dimensions=dims,
         )
 
+    # ---------- Local (sentence-transformers) ----------
+    elif provider == "local":
+        effective_model = model or config.LOCAL_EMBEDDING_MODEL
+        dims = int(dimensions) if dimensions else None
+        if dims == config.EMBEDDING_MODEL_DIMS.get(effective_model):
+            dims = None  # 원본 차원 -> 기존 인스턴스 공유
+
+        # (model, dimensions) 기준 싱글톤 -> 가중치는 프로세스당 1번만 로드
+        return get_local_embeddings(effective_model, dims)
+
     # ---------- Exaone ----------
     elif provider == "exaone":
         api_url = config.EXAONE_ENDPOINT or config.EXAONE_URL
@@ -90,6 +115,12 @@ def get_embeddings(
 
         return GoogleEmbeddings(api_key=effective_key, model=model)
 
+    # ---------- Fake (오프라인 벤치마크/개발용) ----------
+    elif provider == "fake":
+        effective_model = model or config.EMBEDDING_MODEL
+        dim = int(dimensions or config.EMBEDDING_MODEL_DIMS.get(effective_model, 1536))
+        return FakeEmbeddings(dim=dim)
+
     # ---------- 기타 ----------
     else:
         raise ValueError(f"지원하지 않는 embedding provider: {provider}")
@@ -0,0 +1,82 @@
+# langchain_service/embedding/fake_embedder.py
+from __future__ import annotations
+
+import time
+import random
+import hashlib
+import threading
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class FakeRateLimitError(Exception):
+    """429 흉내 (배치 스케줄러 백오프 테스트용)"""
+
+    status_code = 429
+
+    def __init__(self, message: str = "fake rate limit (429)", retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    오프라인 벤치마크용 로컬 임베더 (네트워크/비용 없음).
+    - 텍스트 해시 기반 결정적 단위 벡터 (같은 텍스트 -> 같은 벡터)
+    - latency_s + per_text_s * len(batch) 만큼 sleep 해서 API 왕복 시간 흉내
+    - max_inflight 초과 동시 요청 또는 rate_limit_prob 확률로 FakeRateLimitError(429)
+    """
+
+    def __init__(
+        self,
+        *,
+        dim: int = 1536,
+        latency_s: float = 0.0,
+        per_text_s: float = 0.0,
+        rate_limit_prob: float = 0.0,
+        max_inflight: Optional[int] = None,
+        seed: int = 0,
+    ):
+        self.dim = int(dim)
+        self.latency_s = float(latency_s)
+        self.per_text_s = float(per_text_s)
+        self.rate_limit_prob = float(rate_limit_prob)
+        self.max_inflight = max_inflight
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._inflight = 0
+
+        # 벤치마크 집계
+        self.calls = 0
+        self.rate_limited = 0
+
+    def _vector(self, text: str) -> List[float]:
+        digest = hashlib.sha256((text or "").encode("utf-8")).digest()
+        rng = np.random.default_rng(int.from_bytes(digest[:8], "little"))
+        v = rng.standard_normal(self.dim).astype(np.float32)
+        v /= float(np.linalg.norm(v)) or 1.0
+        return v.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            self.calls += 1
+            over = self.max_inflight is not None and self._inflight >= int(self.max_inflight)
+            if over or (self.rate_limit_prob > 0 and self._rng.random() < self.rate_limit_prob):
+                self.rate_limited += 1
+                raise FakeRateLimitError(retry_after=self.latency_s or None)
+            self._inflight += 1
+
+        try:
+            delay = self.latency_s + self.per_text_s * len(texts)
+            if delay > 0:
+                time.sleep(delay)
+            return [self._vector(t) for t in texts]
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
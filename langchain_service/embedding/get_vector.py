@@ -6,7 +6,20 @@ from typing import Optional
 import numpy as np
 from langchain_core.embeddings import Embeddings
 
+import core.config as config
 from langchain_service.embedding.factory import get_embeddings, ProviderType
+from langchain_service.embedding.batch_scheduler import EmbeddingBatchResult, embed_texts_batched
+from langchain_service.embedding.query_cache import embedding_cache_model, get_query_embedding_cache
+
+
+def _default_model(provider: str, model: Optional[str]) -> str:
+    if model:
+        return model
+    if provider == "openai":
+        return config.EMBEDDING_MODEL
+    if provider == "local":
+        return config.LOCAL_EMBEDDING_MODEL
+    return ""
 
 
 def text_to_vector(
@@ -15,20 +28,32 @@ def text_to_vector(
     provider: ProviderType = "openai",
     model: Optional[str] = None,
     api_key: Optional[str] = None,
+    dimensions: Optional[int] = None,
 ) -> np.ndarray | None:
     """
     단일 텍스트를 임베딩 벡터(np.ndarray)로 변환.
     - 기본 provider는 'openai'
     - 필요 시 model, api_key 오버라이드 가능
-    - get_embeddings() 내부에서 (api_key, model) 단위 싱글톤/캐시를 사용
+    - dimensions: 문서 ingestion embedding_dim과 같은 차원으로 (None이면 모델 기본 차원)
+    - get_embeddings() 내부에서 (api_key, model, dimensions) 단위 싱글톤/캐시를 사용
+    - 결과는 프로세스 전역 LRU+TTL 캐시 (key: 모델(+차원) + 정규화 텍스트)
     """
     embeddings: Embeddings = get_embeddings(
         provider=provider,
         api_key=api_key,
         model=model,
+        dimensions=dimensions,
     )
+    # openai 외 provider는 "provider:모델#query" 키 (문서 청크 embedding_cache와 같은 규칙 + 질문 role)
+    cache_model = embedding_cache_model(_default_model(provider, model), dimensions, provider, role="query")
     try:
-        vector = embeddings.embed_query(text)
+        vector = get_query_embedding_cache().get_or_embed(
+            text,
+            model=cache_model,
+            embed=embeddings.embed_query,
+        )
+        if not vector:
+            return None
         return np.array(vector, dtype=float)
     except Exception as e:
         # TODO: logger 연동되면 print 대신 logger.error 사용
@@ -42,6 +67,7 @@ def _to_vector(
     provider: ProviderType = "openai",
     model: Optional[str] = None,
     api_key: Optional[str] = None,
+    dimensions: Optional[int] = None,
 ) -> list[float]:
     """
     임베딩 생성 + 변환 + 검증 래퍼 (APP/llm 및 runner에서 공통 사용).
@@ -52,6 +78,7 @@ def _to_vector(
         provider=provider,
         model=model,
         api_key=api_key,
+        dimensions=dimensions,
     )
     if vector is None:
         raise RuntimeError("임베딩 생성에 실패했습니다.")
@@ -63,42 +90,62 @@ def _to_vector(
     # 안전하게 float 변환
     return [float(v) for v in vector_list]
 
-# 다수 텍스트를 한 번에 embed_documents로 처리 (배치 분할 포함)
-def texts_to_vectors(
+# 다수 텍스트를 토큰 예산 배치 + 동시 전송으로 처리
+def embed_texts(
     texts: list[str],
     *,
     provider: ProviderType = "openai",
     model: Optional[str] = None,
     api_key: Optional[str] = None,
-    batch_size: int = 64,  # 한 번에 보낼 문서 수 (청크 개수)
-) -> list[list[float]]:
+    dimensions: Optional[int] = None,
+    max_batch_tokens: Optional[int] = None,
+    max_batch_items: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+) -> EmbeddingBatchResult:
     """
-    여러 텍스트를 한꺼번에 임베딩하는 유틸.
-    - DocumentIngestService / 업로드 파이프라인 등에서 bulk 임베딩할 때 사용.
-    - get_embeddings() 내부에서 (api_key, model) 단위 싱글톤/캐시를 사용.
-    - OpenAI small embedding 모델 기준:
-      - chunk_size ≈ 900 토큰, batch_size 64면
-        요청당 최대 ≈ 900 * 64 = 57,600 토큰 수준 -> 300,000 토큰 제한보다 한참 여유.
+    여러 텍스트를 임베딩하고 (벡터, 총 토큰 수, 배치 수, 429 횟수) 반환.
+    - 배치는 개수가 아니라 토큰 예산(EMBEDDING_BATCH_MAX_TOKENS) 기준으로 묶음
+    - 배치들은 EMBEDDING_MAX_CONCURRENCY 만큼 동시 전송, 429면 공유 백오프
+    - 반환 벡터 순서 == texts 순서
     """
     if not texts:
-        return []
+        return EmbeddingBatchResult(vectors=[], total_tokens=0, batch_count=0, rate_limited=0)
 
     embeddings: Embeddings = get_embeddings(
         provider=provider,
         api_key=api_key,
         model=model,  # 예: "text-embedding-3-small"
+        dimensions=dimensions,
+    )
+    return embed_texts_batched(
+        embeddings,
+        texts,
+        model=_default_model(provider, model) or config.EMBEDDING_MODEL,
+        max_batch_tokens=max_batch_tokens,
+        max_batch_items=max_batch_items,
+        max_concurrency=max_concurrency,
     )
 
-    all_vectors: list[list[float]] = []
-
-    # texts 를 batch_size 단위로 잘라서 여러 번 호출
-    for start in range(0, len(texts), batch_size):
-        batch = texts[start : start + batch_size]
-        batch_vectors = embeddings.embed_documents(batch)
-
-        # float 리스트 2차원 배열로 정규화
-        for vec in batch_vectors:
-            all_vectors.append([float(v) for v in vec])
-
-    return all_vectors
 
+def texts_to_vectors(
+    texts: list[str],
+    *,
+    provider: ProviderType = "openai",
+    model: Optional[str] = None,
+    api_key: Optional[str] = None,
+    dimensions: Optional[int] = None,
+    batch_size: Optional[int] = None,  # 한 번에 보낼 최대 문서 수 (None이면 EMBEDDING_BATCH_MAX_ITEMS)
+) -> list[list[float]]:
+    """
+    여러 텍스트를 한꺼번에 임베딩하는 유틸 (embed_texts 의 벡터만 반환).
+    - DocumentIngestService / 업로드 파이프라인 등에서 bulk 임베딩할 때 사용.
+    - get_embeddings() 내부에서 (api_key, model) 단위 싱글톤/캐시를 사용.
+    """
+    return embed_texts(
+        texts,
+        provider=provider,
+        model=model,
+        api_key=api_key,
+        dimensions=dimensions,
+        max_batch_items=batch_size,
+    ).vectors
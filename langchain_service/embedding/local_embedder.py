@@ -0,0 +1,182 @@
+# langchain_service/embedding/local_embedder.py
+from __future__ import annotations
+
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from core import config
+
+log = logging.getLogger(__name__)
+
+
+def _model_dim(model: Any) -> int:
+    # sentence-transformers 5.x 이후 get_embedding_dimension (이전 버전은 get_sentence_embedding_dimension)
+    getter = getattr(model, "get_embedding_dimension", None) or model.get_sentence_embedding_dimension
+    return int(getter())
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    로컬 CPU 임베더 (sentence-transformers, 네트워크/비용 없음).
+    - 모델은 첫 호출 때 로드 (preload_local_embeddings로 서버 시작 시 미리 로드 + warm-up)
+    - encode는 인스턴스당 한 번에 1개 (배치 스케줄러가 여러 스레드로 불러도 CPU 과점유 없음)
+      배치 안의 병렬화는 torch / onnxruntime intra-op 스레드 (LOCAL_EMBEDDING_THREADS)
+    - backend="onnx"면 ONNX Runtime (onnx_file 지정 시 해당 파일, 예: int8 양자화본)
+    - 출력은 L2 정규화 (cosine 검색 전제)
+    - query_prefix / document_prefix: e5 계열처럼 입력 접두어가 필요한 모델용
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        *,
+        model_path: Optional[str] = None,
+        device: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        num_threads: Optional[int] = None,
+        backend: Optional[str] = None,
+        onnx_file: Optional[str] = None,
+        truncate_dim: Optional[int] = None,
+        query_prefix: Optional[str] = None,
+        document_prefix: Optional[str] = None,
+    ):
+        self.model_name = model_name
+        self.model_path = model_path or model_name  # 로드 위치 (캐시 key / ingestion 설정은 model_name 기준)
+        self.device = device or getattr(config, "LOCAL_EMBEDDING_DEVICE", "cpu")
+        self.batch_size = max(1, int(batch_size or getattr(config, "LOCAL_EMBEDDING_BATCH_SIZE", 32)))
+        self.num_threads = int(num_threads if num_threads is not None else getattr(config, "LOCAL_EMBEDDING_THREADS", 0))
+        self.backend = str(backend or getattr(config, "LOCAL_EMBEDDING_BACKEND", "torch")).lower()
+        self.onnx_file = onnx_file if onnx_file is not None else (getattr(config, "LOCAL_EMBEDDING_ONNX_FILE", "") or None)
+        self.truncate_dim = int(truncate_dim) if truncate_dim else None
+        self.query_prefix = query_prefix if query_prefix is not None else getattr(config, "LOCAL_EMBEDDING_QUERY_PREFIX", "")
+        self.document_prefix = (
+            document_prefix if document_prefix is not None else getattr(config, "LOCAL_EMBEDDING_DOCUMENT_PREFIX", "")
+        )
+
+        self._model: Any = None
+        self._load_lock = threading.Lock()
+        self._encode_lock = threading.Lock()
+
+    # -----------------------------------------------------
+    # load
+    # -----------------------------------------------------
+    def _load(self):
+        try:
+            from sentence_transformers import SentenceTransformer  # type: ignore
+        except Exception as e:
+            raise RuntimeError(
+                "local embedding provider를 쓰려면 sentence-transformers가 필요 "
+                "pip install sentence-transformers (onnx backend면 sentence-transformers[onnx])"
+            ) from e
+
+        kwargs: Dict[str, Any] = {"device": self.device}
+        if self.truncate_dim:
+            kwargs["truncate_dim"] = self.truncate_dim
+        if self.backend == "onnx":
+            kwargs["backend"] = "onnx"
+            model_kwargs: Dict[str, Any] = {"provider": "CPUExecutionProvider"}
+            if self.onnx_file:
+                model_kwargs["file_name"] = self.onnx_file
+            if self.num_threads > 0:
+                import onnxruntime as ort  # type: ignore
+
+                so = ort.SessionOptions()
+                so.intra_op_num_threads = self.num_threads
+                model_kwargs["session_options"] = so
+            kwargs["model_kwargs"] = model_kwargs
+        elif self.num_threads > 0:
+            import torch  # type: ignore
+
+            torch.set_num_threads(self.num_threads)  # 프로세스 전역 (torch intra-op)
+
+        t0 = time.perf_counter()
+        model = SentenceTransformer(self.model_path, **kwargs)
+        log.info(
+            "local embedding model loaded: %s (backend=%s, dim=%s, %.1fs)",
+            self.model_name, self.backend, _model_dim(model), time.perf_counter() - t0,
+        )
+        return model
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    self._model = self._load()
+        return self._model
+
+    @property
+    def dimension(self) -> int:
+        return _model_dim(self.model)
+
+    # -----------------------------------------------------
+    # Embeddings
+    # -----------------------------------------------------
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        model = self.model
+        with self._encode_lock:
+            vecs = model.encode(
+                texts,
+                batch_size=self.batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+        return vecs.astype("float32").tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._encode([f"{self.document_prefix}{t}" for t in texts])
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([f"{self.query_prefix}{text}"])[0]
+
+    def warm_up(self) -> float:
+        """모델 로드 + 한 번 실행 (첫 요청의 cold start 제거). 걸린 시간(s) 반환"""
+        t0 = time.perf_counter()
+        self.embed_documents(["warm-up"])
+        return time.perf_counter() - t0
+
+
+# (model, truncate_dim) 조합별 싱글톤 (모델 가중치는 프로세스당 1번만 로드)
+_local_cache: Dict[Tuple[str, Optional[int]], LocalEmbeddings] = {}
+_local_lock = threading.Lock()
+
+
+def get_local_embeddings(model: Optional[str] = None, dimensions: Optional[int] = None) -> LocalEmbeddings:
+    """
+    로컬 임베더 싱글톤 getter.
+    - model 없으면 LOCAL_EMBEDDING_MODEL
+    - dimensions: Matryoshka 학습된 모델만 의미 있음 (sentence-transformers truncate_dim)
+    """
+    name = model or getattr(config, "LOCAL_EMBEDDING_MODEL", "intfloat/multilingual-e5-base")
+    key = (name, int(dimensions) if dimensions else None)
+    with _local_lock:
+        emb = _local_cache.get(key)
+        if emb is None:
+            # 설정된 로컬 모델만 LOCAL_EMBEDDING_PATH (export한 ONNX 디렉터리 등)에서 로드
+            path = getattr(config, "LOCAL_EMBEDDING_PATH", "") if name == config.LOCAL_EMBEDDING_MODEL else ""
+            emb = LocalEmbeddings(name, model_path=path or None, truncate_dim=key[1])
+            _local_cache[key] = emb
+    return emb
+
+
+def preload_local_embeddings() -> None:
+    """
+    서버/워커 시작 시 LOCAL_EMBEDDING_MODEL 로드 + warm-up (LOCAL_EMBEDDING_PRELOAD=true일 때만)
+    - 실패해도 서버는 뜸 (첫 요청 때 다시 로드 시도)
+    """
+    if not getattr(config, "LOCAL_EMBEDDING_PRELOAD", False):
+        return
+    name = getattr(config, "LOCAL_EMBEDDING_MODEL", "intfloat/multilingual-e5-base")
+    try:
+        took = get_local_embeddings(name).warm_up()
+    except Exception as e:
+        log.warning("local embedding preload failed (%s): %s", name, e)
+        return
+    log.info("local embedding preloaded: %s (%.1fs)", name, took)
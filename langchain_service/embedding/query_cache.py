@@ -0,0 +1,212 @@
+# langchain_service/embedding/query_cache.py
+from __future__ import annotations
+
+import re
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Protocol, Tuple
+
+from core import config
+
+log = logging.getLogger(__name__)
+
+_WS_RUN = re.compile(r"[ \t\u00a0]+")
+
+
+# =========================================================
+# 키 정규화 (문서 청크 임베딩 캐시와 같은 규칙 -> user.embedding_cache 공유)
+# =========================================================
+def normalize_embedding_text(text: str) -> str:
+    """캐시 키용 정규화: NFC + 개행 통일 + 가로 공백 축약 + strip"""
+    t = unicodedata.normalize("NFC", text or "")
+    t = t.replace("\r\n", "\n").replace("\r", "\n")
+    t = _WS_RUN.sub(" ", t)
+    return t.strip()
+
+
+def embedding_text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_embedding_text(text).encode("utf-8")).hexdigest()
+
+
+def embedding_cache_model(
+    model: str,
+    dim: Optional[int] = None,
+    provider: str = "openai",
+    role: str = "document",
+) -> str:
+    """
+    캐시 key용 모델명
+    - 원본 차원이면 모델명 그대로, dimensions 축소면 "모델@dim"
+    - openai 외 provider는 "provider:모델" (모델명이 겹쳐도 다른 벡터 공간)
+    - role="query"면 openai 외 provider는 "#query"를 붙임
+      (local e5 등은 질문/문서 접두어가 달라서 같은 텍스트라도 벡터가 다름, openai는 대칭이라 공유)
+    """
+    key = model if provider == "openai" else f"{provider}:{model}"
+    if dim and int(dim) != getattr(config, "EMBEDDING_MODEL_DIMS", {}).get(model):
+        key = f"{key}@{int(dim)}"
+    if role == "query" and provider != "openai":
+        key = f"{key}#query"
+    return key
+
+
+# =========================================================
+# 2차 저장소 (옵션, 워커 간 공유)
+# =========================================================
+class EmbeddingBackend(Protocol):
+    def get(self, model: str, text_hash: str) -> Optional[List[float]]: ...
+
+    def put(self, model: str, text_hash: str, vector: List[float]) -> None: ...
+
+
+class PostgresEmbeddingBackend:
+    """user.embedding_cache 테이블 (문서 인제스트 캐시와 같은 테이블/키)"""
+
+    def get(self, model: str, text_hash: str) -> Optional[List[float]]:
+        from database.session import SessionLocal
+        from crud.user.document import embedding_cache_crud
+
+        with SessionLocal() as db:
+            found = embedding_cache_crud.get_many(db, embedding_model=model, text_hashes=[text_hash])
+        return found.get(text_hash)
+
+    def put(self, model: str, text_hash: str, vector: List[float]) -> None:
+        from database.session import SessionLocal
+        from crud.user.document import embedding_cache_crud
+
+        with SessionLocal() as db:
+            embedding_cache_crud.put_many(db, embedding_model=model, items=[(text_hash, vector)])
+            db.commit()
+
+
+# =========================================================
+# LRU + TTL
+# =========================================================
+class QueryEmbeddingCache:
+    """
+    프로세스 전역 질문 임베딩 캐시.
+    - key: (embedding model, 정규화 텍스트 sha256)
+    - 용량 초과 시 LRU 제거, ttl_s 지나면 miss 처리
+    - backend가 있으면 L1 miss -> backend 조회 -> 그래도 없으면 임베딩 후 양쪽 저장
+    - 같은 key 동시 요청은 1번만 임베딩 (나머지는 대기)
+    """
+
+    def __init__(
+        self,
+        *,
+        max_size: Optional[int] = None,
+        ttl_s: Optional[float] = None,
+        backend: Optional[EmbeddingBackend] = None,
+    ):
+        self.max_size = max(1, int(max_size or getattr(config, "QUERY_EMBEDDING_CACHE_SIZE", 2048)))
+        self.ttl_s = float(ttl_s if ttl_s is not None else getattr(config, "QUERY_EMBEDDING_CACHE_TTL_S", 3600.0))
+        self.backend = backend
+
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Tuple[str, str], Tuple[float, List[float]]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], threading.Event] = {}
+
+        self.hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def _get_local(self, key: Tuple[str, str]) -> Optional[List[float]]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        stored_at, vec = item
+        if self.ttl_s > 0 and time.monotonic() - stored_at > self.ttl_s:
+            del self._data[key]
+            self.expired += 1
+            return None
+        self._data.move_to_end(key)
+        return vec
+
+    def _put_local(self, key: Tuple[str, str], vec: List[float]) -> None:
+        self._data[key] = (time.monotonic(), vec)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_embed(self, text: str, *, model: str, embed: Callable[[str], List[float]]) -> List[float]:
+        key = (model, embedding_text_hash(text))
+
+        while True:
+            with self._lock:
+                vec = self._get_local(key)
+                if vec is not None:
+                    self.hits += 1
+                    return vec
+                waiter = self._inflight.get(key)
+                if waiter is None:
+                    self._inflight[key] = threading.Event()
+                    break
+            waiter.wait()  # 다른 스레드가 임베딩 중 -> 끝나면 L1에서 다시 조회
+
+        try:
+            vec = None
+            if self.backend is not None:
+                try:
+                    vec = self.backend.get(key[0], key[1])
+                except Exception as e:
+                    log.warning("query embedding backend get failed: %s", e)
+
+            if vec is not None:
+                with self._lock:
+                    self.backend_hits += 1
+            else:
+                vec = [float(v) for v in embed(text)]
+                with self._lock:
+                    self.misses += 1
+                if self.backend is not None and vec:
+                    try:
+                        self.backend.put(key[0], key[1], vec)
+                    except Exception as e:
+                        log.warning("query embedding backend put failed: %s", e)
+
+            with self._lock:
+                if vec:
+                    self._put_local(key, vec)
+            return vec
+        finally:
+            with self._lock:
+                event = self._inflight.pop(key, None)
+            if event is not None:
+                event.set()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.backend_hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "backend_hits": self.backend_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "hit_rate": (self.hits + self.backend_hits) / total if total else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_cache: Optional[QueryEmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            backend = PostgresEmbeddingBackend() if getattr(config, "QUERY_EMBEDDING_CACHE_DB", False) else None
+            _cache = QueryEmbeddingCache(backend=backend)
+        return _cache
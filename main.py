@@ -1,5 +1,6 @@
 # main.py
 import os
+import asyncio
 
 from fastapi import FastAPI
 from fastapi.openapi.docs import get_swagger_ui_oauth2_redirect_html
@@ -52,6 +53,20 @@ app.add_middleware(
 register_routers(app)
 
 
+@app.on_event("startup")
+async def _preload_rerankers() -> None:
+    from service.user.rerank import preload_rerankers
+
+    await asyncio.to_thread(preload_rerankers)
+
+
+@app.on_event("startup")
+async def _preload_local_embeddings() -> None:
+    from langchain_service.embedding.local_embedder import preload_local_embeddings
+
+    await asyncio.to_thread(preload_local_embeddings)
+
+
 @app.get("/docs", include_in_schema=False)
 def custom_swagger_ui_html() -> HTMLResponse:
     method_order = ["get", "post", "patch", "put", "delete", "head", "options", "trace"]
@@ -20,7 +20,13 @@ from pgvector.sqlalchemy import Vector
 
 from models.base import Base
 
-EMBEDDING_DIM_FIXED = 1536  # postgreSQL 현재 1536만 됨 small model고정
+EMBEDDING_DIM_FIXED = 1536  # 기본(원본) 차원, vector_memory 컬럼
+# text-embedding-3 dimensions(Matryoshka) 축소 차원 -> 차원별 벡터 컬럼 (HNSW 인덱스도 차원별)
+EMBEDDING_VECTOR_COLUMNS = {
+    1536: "vector_memory",
+    768: "vector_memory_768",
+    512: "vector_memory_512",
+}
 KB_SCORE_TYPE_FIXED = "cosine_similarity"  # 유사도 기반으로 고정
 
 
@@ -68,6 +74,12 @@ class Document(Base):
     file_size_bytes = Column(BigInteger, nullable=False)
     folder_path = Column(Text, nullable=True)
 
+    # 원본 파일 sha256 (추출 텍스트 아티팩트 키)
+    file_sha256 = Column(Text, nullable=True)
+
+    # 마지막으로 성공한 인제스트의 청크/임베딩 설정 fingerprint (dedup 원본 판정용, 설정이 같아야 복제)
+    ingest_fingerprint = Column(Text, nullable=True)
+
     # status: uploading -> embedding(서버 처리 단계) -> ready / failed
     status = Column(
         Text,
@@ -146,6 +158,7 @@ class Document(Base):
         ),
         Index("idx_documents_owner_time", "owner_id", "uploaded_at"),
         Index("idx_documents_status_time", "status", "uploaded_at"),
+        Index("idx_documents_file_sha256", "file_sha256"),
         Index(
             "idx_documents_name_trgm",
             "name",
@@ -161,7 +174,7 @@ class DocumentIngestionSetting(Base):
     """
     문서당 1개 row 강제:
     - knowledge_id = PK + FK (CASCADE)
-    - embedding_dim은 1536만 허용(벡터 컬럼 차원과 정합성)
+    - embedding_dim은 EMBEDDING_VECTOR_COLUMNS 차원만 허용(벡터 컬럼 차원과 정합성)
     """
     __tablename__ = "document_ingestion_settings"
 
@@ -196,7 +209,7 @@ class DocumentIngestionSetting(Base):
     embedding_provider = Column(Text, nullable=False)
     embedding_model = Column(Text, nullable=False)
 
-    # 정합성 강제: 1536 차원 only
+    # 정합성 강제: 차원별 벡터 컬럼이 있는 값만 (1536 | 768 | 512)
     embedding_dim = Column(Integer, nullable=False, server_default=text(str(EMBEDDING_DIM_FIXED)))
 
     # 전처리 옵션/기타 확장
@@ -218,8 +231,8 @@ class DocumentIngestionSetting(Base):
         CheckConstraint("chunk_overlap < chunk_size", name="chk_doc_ingest_overlap_lt_size"),
         CheckConstraint("max_chunks >= 1", name="chk_doc_ingest_max_chunks_ge_1"),
         CheckConstraint(
-            f"embedding_dim = {EMBEDDING_DIM_FIXED}",
-            name="chk_doc_ingest_embedding_dim_fixed_1536",
+            "embedding_dim IN (512, 768, 1536)",
+            name="chk_doc_ingest_embedding_dim_allowed",
         ),
         CheckConstraint(
             "chunking_mode IN ('general', 'parent_child')",
@@ -267,6 +280,15 @@ class DocumentSearchSetting(Base):
     reranker_model = Column(Text, nullable=True)
     reranker_top_n = Column(Integer, nullable=False)
 
+    # vector: 벡터 top-k만 / hybrid: 벡터 + 키워드(tsvector) top-k를 RRF로 합침
+    search_mode = Column(Text, nullable=False, server_default=text("'vector'"))
+    # small-to-big: 매칭된 child 대신 parent 본문을 컨텍스트로 (parent_child 인제스트 문서만 의미 있음)
+    expand_to_parent = Column(Boolean, nullable=False, server_default=text("false"))
+
+    # ANN 탐색 폭 (NULL이면 config 기본값)
+    hnsw_ef_search = Column(Integer, nullable=True)
+    ivfflat_probes = Column(Integer, nullable=True)
+
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(
         DateTime(timezone=True),
@@ -286,6 +308,7 @@ class DocumentSearchSetting(Base):
             f"score_type = '{KB_SCORE_TYPE_FIXED}'",
             name="chk_doc_search_score_type_fixed_cos_sim",
         ),
+        CheckConstraint("search_mode IN ('vector', 'hybrid')", name="chk_doc_search_mode"),
         {"schema": "user"},
     )
 
@@ -385,6 +408,10 @@ class DocumentChunk(Base):
     # - child: NOT NULL
     # - parent: NULL (권장)
     vector_memory = Column(Vector(EMBEDDING_DIM_FIXED), nullable=True)
+    # 축소 차원 (ingestion embedding_dim이 768/512인 문서의 child만 채움)
+    # - child는 세 컬럼 중 정확히 하나만 NOT NULL
+    vector_memory_768 = Column(Vector(768), nullable=True)
+    vector_memory_512 = Column(Vector(512), nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
@@ -419,9 +446,10 @@ class DocumentChunk(Base):
             "OR (chunk_level = 'child' AND parent_chunk_id IS NULL)",  # 일반모드(child 단일) 허용
             name="chk_document_chunks_parent_ref_allowed",
         ),
-        # 벡터 정합성: child는 벡터 필수, parent는 벡터 비움(권장)
+        # 벡터 정합성: child는 차원별 벡터 중 정확히 하나, parent는 벡터 비움(권장)
         CheckConstraint(
-            "(chunk_level = 'child' AND vector_memory IS NOT NULL) OR (chunk_level = 'parent' AND vector_memory IS NULL)",
+            "(chunk_level = 'child' AND num_nonnulls(vector_memory, vector_memory_768, vector_memory_512) = 1) "
+            "OR (chunk_level = 'parent' AND num_nonnulls(vector_memory, vector_memory_768, vector_memory_512) = 0)",
             name="chk_document_chunks_vector_by_level",
         ),
         # 문서 내 글로벌 인덱스 unique (NULL 여러 개 허용 -> parent 여러 개 OK)
@@ -438,14 +466,120 @@ class DocumentChunk(Base):
         Index("idx_document_chunks_doc_parent", "knowledge_id", "parent_chunk_id"),
         Index("idx_document_chunks_doc_index", "knowledge_id", "chunk_index"),
         Index("idx_document_chunks_doc_page", "knowledge_id", "page_id"),
-        # NOTE: ivfflat 인덱스는 vector_memory NULL 허용이어도 생성 가능하지만,
-        #       쿼리는 child만 대상으로 걸도록(WHERE chunk_level='child') 구성 권장.
+        # HNSW (child만 partial). 검색 쿼리에도 WHERE chunk_level='child'가 있어야 이 인덱스를 탐
+        # - 쿼리별 hnsw.ef_search / iterative_scan은 crud 검색 시 SET LOCAL로 지정
         Index(
-            "idx_document_chunks_vec_ivfflat",
+            "idx_document_chunks_vec_hnsw",
             "vector_memory",
-            postgresql_using="ivfflat",
-            postgresql_with={"lists": 100},
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
             postgresql_ops={"vector_memory": "vector_cosine_ops"},
+            postgresql_where=text("chunk_level = 'child'"),
+        ),
+        Index(
+            "idx_document_chunks_vec768_hnsw",
+            "vector_memory_768",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"vector_memory_768": "vector_cosine_ops"},
+            postgresql_where=text("chunk_level = 'child'"),
+        ),
+        Index(
+            "idx_document_chunks_vec512_hnsw",
+            "vector_memory_512",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"vector_memory_512": "vector_cosine_ops"},
+            postgresql_where=text("chunk_level = 'child'"),
+        ),
+        # hybrid 검색의 키워드 arm (crud 쿼리도 같은 식 to_tsvector('simple'::regconfig, chunk_text) 사용)
+        Index(
+            "idx_document_chunks_text_tsv",
+            text("to_tsvector('simple'::regconfig, chunk_text)"),
+            postgresql_using="gin",
+            postgresql_where=text("chunk_level = 'child'"),
+        ),
+        {"schema": "user"},
+    )
+
+
+# ========== user.embedding_cache ==========
+class EmbeddingCache(Base):
+    """
+    청크 임베딩 캐시 (문서/사용자 무관, 내용 기준)
+    - key: (embedding_model, 정규화된 텍스트 sha256)
+      축소 차원은 embedding_model에 "@dim"을 붙여 구분 (query_cache.embedding_cache_model)
+      local 등 비대칭 모델의 질문 벡터는 "#query"를 붙여 청크 벡터와 분리
+    - reindex / 재청킹 시 같은 텍스트면 임베딩 API 호출 없이 재사용
+    """
+    __tablename__ = "embedding_cache"
+
+    embedding_model = Column(Text, primary_key=True)
+    text_hash = Column(Text, primary_key=True)  # sha256 hex
+    vector_memory = Column(Vector(), nullable=False)  # 차원 제한 없음 (모델/차원별 key, 인덱스 없음)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        CheckConstraint("length(text_hash) = 64", name="chk_embedding_cache_hash_len"),
+        {"schema": "user"},
+    )
+
+
+# ========== user.document_ingest_jobs ==========
+class DocumentIngestJob(Base):
+    """
+    문서 인제스트 작업 큐 (문서당 1개 row, reindex 시 재사용)
+    - status: queued -> running -> succeeded / failed (재시도 시 다시 queued)
+    - stage : 마지막으로 "완료된" 파이프라인 단계 (extract -> pages -> chunk -> embed -> store)
+              재시작 시 다음 단계부터 이어서 실행
+    - locked_by/locked_at: 워커 lease (locked_at이 오래되면 죽은 워커로 보고 재큐잉)
+    """
+    __tablename__ = "document_ingest_jobs"
+
+    knowledge_id = Column(
+        BigInteger,
+        ForeignKey("user.documents.knowledge_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    user_id = Column(
+        BigInteger,
+        ForeignKey("user.users.user_id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    status = Column(Text, nullable=False, server_default=text("'queued'"))
+    stage = Column(Text, nullable=True)
+
+    attempts = Column(Integer, nullable=False, server_default=text("0"))
+    max_attempts = Column(Integer, nullable=False, server_default=text("3"))
+    next_run_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    locked_by = Column(Text, nullable=True)
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+
+    __table_args__ = (
+        CheckConstraint(
+            "status IN ('queued', 'running', 'succeeded', 'failed')",
+            name="chk_document_ingest_jobs_status_enum",
+        ),
+        CheckConstraint(
+            "stage IS NULL OR stage IN ('extract', 'pages', 'chunk', 'embed', 'store')",
+            name="chk_document_ingest_jobs_stage_enum",
         ),
+        CheckConstraint("attempts >= 0", name="chk_document_ingest_jobs_attempts_nonneg"),
+        CheckConstraint("max_attempts >= 1", name="chk_document_ingest_jobs_max_attempts_ge_1"),
+        Index("idx_document_ingest_jobs_status_next", "status", "next_run_at"),
+        Index("idx_document_ingest_jobs_user_status", "user_id", "status"),
         {"schema": "user"},
     )
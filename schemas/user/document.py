@@ -29,14 +29,48 @@ def _ds(key: str, default: Any) -> Any:
 # =========================================================
 # Types (정합성 고정)
 # =========================================================
-EmbeddingDim = Literal[1536]
+EmbeddingDim = Literal[512, 768, 1536]  # config.EMBEDDING_DIMS_ALLOWED (text-embedding-3 dimensions 축소 / local 모델 차원)
+EmbeddingProvider = Literal["openai", "local"]
 ScoreType = Literal["cosine_similarity"]
+SearchMode = Literal["vector", "hybrid"]
 
 ChunkStrategy = Literal["recursive", "token", "semantic"]
 ChunkingMode = Literal["general", "parent_child"]
 ChunkLevel = Literal["child", "parent"]
 
 
+def _local_embedding_defaults() -> tuple[str, Optional[int]]:
+    """provider='local'일 때 허용 모델 (서버에 배포된 LOCAL_EMBEDDING_MODEL)과 그 출력 차원"""
+    model = str(getattr(config, "LOCAL_EMBEDDING_MODEL", "intfloat/multilingual-e5-base"))
+    return model, getattr(config, "EMBEDDING_MODEL_DIMS", {}).get(model)
+
+
+def embedding_provider_defaults(provider: str) -> tuple[str, Optional[int]]:
+    """provider 기본 (embedding_model, embedding_dim) - provider를 바꾸는 PATCH에서 안 보낸 값 채우기용"""
+    if provider == "local":
+        return _local_embedding_defaults()
+    return str(_di("embedding_model", "text-embedding-3-small")), int(getattr(config, "EMBEDDING_DIM_FIXED", 1536))
+
+
+def check_local_embedding(model: Optional[str], dim: Optional[int]) -> None:
+    """provider='local'이면 서버의 LOCAL_EMBEDDING_MODEL / 그 차원만 허용 (ValueError)"""
+    local_model, local_dim = _local_embedding_defaults()
+    if model is not None and model != local_model:
+        raise ValueError(f"embedding_provider 'local' requires embedding_model '{local_model}'")
+    if dim is not None and local_dim is not None and int(dim) != int(local_dim):
+        raise ValueError(f"embedding_dim must be {local_dim} for {local_model}")
+
+
+def check_embedding_setting(provider: Optional[str], model: Optional[str], dim: Optional[int]) -> None:
+    """(provider, model, dim) 조합 검증 (ValueError) - Create / PATCH 적용 후 설정에 같이 씀"""
+    if provider == "local":
+        check_local_embedding(model, dim)
+    elif dim is not None and int(dim) != int(getattr(config, "EMBEDDING_DIM_FIXED", 1536)) and (
+        model not in getattr(config, "EMBEDDING_DIMENSIONS_MODELS", ())
+    ):
+        raise ValueError("embedding_dim < 1536 requires a text-embedding-3 model (dimensions)")
+
+
 # =========================================================
 # json_schema_extra helpers (examples from config)
 # =========================================================
@@ -111,6 +145,7 @@ def _search_example() -> dict[str, Any]:
         "reranker_enabled": bool(_ds("reranker_enabled", False)),
         "reranker_model": _ds("reranker_model", None),
         "reranker_top_n": int(_ds("reranker_top_n", 5)),
+        "search_mode": str(_ds("search_mode", "vector")),
     }
 
 
@@ -169,6 +204,7 @@ class DocumentCreate(ORMBase):
     file_format: str
     file_size_bytes: int
     folder_path: Optional[str] = None
+    file_sha256: Optional[str] = None
 
     status: Optional[str] = None
     chunk_count: Optional[int] = None
@@ -189,6 +225,7 @@ class DocumentUpdate(ORMBase):
     chunk_count: Optional[int] = None
     progress: Optional[int] = None
     error_message: Optional[str] = None
+    ingest_fingerprint: Optional[str] = None
 
 
 class DocumentResponse(ORMBase):
@@ -239,9 +276,11 @@ class DocumentIngestionSettingCreate(ORMBase):
     parent_chunk_overlap: Optional[int] = Field(default=None, ge=0)
 
     # embedding
-    embedding_provider: str = Field(default=str(_di("embedding_provider", "openai")))
+    embedding_provider: EmbeddingProvider = Field(default=str(_di("embedding_provider", "openai")))
     embedding_model: str = Field(default=str(_di("embedding_model", "text-embedding-3-small")))
-    embedding_dim: EmbeddingDim = Field(default=int(getattr(config, "EMBEDDING_DIM_FIXED", 1536)))
+    embedding_dim: EmbeddingDim = Field(
+        default=int(_di("embedding_dim", getattr(config, "EMBEDDING_DIM_FIXED", 1536)))
+    )
 
     extra: dict[str, Any] = Field(default_factory=dict)
 
@@ -250,6 +289,8 @@ class DocumentIngestionSettingCreate(ORMBase):
         if self.chunk_strategy != "recursive":
             raise ValueError("unsupported chunk_strategy (MVP): only 'recursive' is allowed")
 
+        check_embedding_setting(self.embedding_provider, self.embedding_model, self.embedding_dim)
+
         if self.chunk_overlap >= self.chunk_size:
             raise ValueError("chunk_overlap must be < chunk_size")
 
@@ -296,7 +337,7 @@ class DocumentIngestionSettingUpdate(ORMBase):
     parent_chunk_size: Optional[int] = Field(default=None, ge=1)
     parent_chunk_overlap: Optional[int] = Field(default=None, ge=0)
 
-    embedding_provider: Optional[str] = None
+    embedding_provider: Optional[EmbeddingProvider] = None
     embedding_model: Optional[str] = None
     embedding_dim: Optional[EmbeddingDim] = None
     extra: Optional[dict[str, Any]] = None
@@ -306,6 +347,10 @@ class DocumentIngestionSettingUpdate(ORMBase):
         if self.chunk_strategy is not None and self.chunk_strategy != "recursive":
             raise ValueError("unsupported chunk_strategy (MVP): only 'recursive' is allowed")
 
+        # 보낸 값만 검증 (provider 전환 시 model / dim 기본값은 저장된 설정과 비교해서 CRUD에서 채움)
+        if self.embedding_provider == "local":
+            check_local_embedding(self.embedding_model, self.embedding_dim)
+
         if self.chunk_size is not None and self.chunk_overlap is not None:
             if self.chunk_overlap >= self.chunk_size:
                 raise ValueError("chunk_overlap must be < chunk_size")
@@ -386,6 +431,12 @@ class DocumentSearchSettingCreate(ORMBase):
     reranker_model: Optional[str] = Field(default=_ds("reranker_model", None))
     reranker_top_n: int = Field(default=int(_ds("reranker_top_n", 5)), ge=1)
 
+    search_mode: SearchMode = Field(default=str(_ds("search_mode", "vector")))
+    expand_to_parent: bool = Field(default=bool(_ds("expand_to_parent", False)))
+
+    hnsw_ef_search: Optional[int] = Field(default=_ds("hnsw_ef_search", None), ge=1, le=1000)
+    ivfflat_probes: Optional[int] = Field(default=_ds("ivfflat_probes", None), ge=1)
+
     @model_validator(mode="after")
     def _validate_reranker_top_n(self):
         if self.reranker_top_n > self.top_k:
@@ -408,6 +459,12 @@ class DocumentSearchSettingUpdate(ORMBase):
     reranker_model: Optional[str] = None
     reranker_top_n: Optional[int] = Field(default=None, ge=1)
 
+    search_mode: Optional[SearchMode] = None
+    expand_to_parent: Optional[bool] = None
+
+    hnsw_ef_search: Optional[int] = Field(default=None, ge=1, le=1000)
+    ivfflat_probes: Optional[int] = Field(default=None, ge=1)
+
     @model_validator(mode="after")
     def _validate_reranker_top_n(self):
         if self.top_k is not None and self.reranker_top_n is not None:
@@ -428,6 +485,12 @@ class DocumentSearchSettingResponse(ORMBase):
     reranker_model: Optional[str] = None
     reranker_top_n: int
 
+    search_mode: str = "vector"
+    expand_to_parent: bool = False
+
+    hnsw_ef_search: Optional[int] = None
+    ivfflat_probes: Optional[int] = None
+
     created_at: datetime
     updated_at: datetime
 
@@ -0,0 +1,124 @@
+"""
+Write-throughput benchmark for document chunk storage.
+
+Compares, for 200 / 2k / 20k chunks (about 1 parent per 4 children):
+  - orm : create() per parent + bulk_create() for children (old path)
+  - copy: bulk_copy() -> one binary COPY, parent ids pre-allocated in one query
+
+Needs a live Postgres with the app schema and an existing document
+(--knowledge-id). Every run is rolled back, nothing is persisted.
+
+Usage:
+    python -m script.bench_chunk_writer --knowledge-id 1 [--sizes 200,2000,20000]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from database.session import SessionLocal
+from crud.user.document import document_chunk_crud
+from schemas.user.document import DocumentChunkCreate
+
+_CHILDREN_PER_PARENT = 4
+
+
+def _make_rows(
+    knowledge_id: int, n: int, dim: int, seed: int
+) -> Tuple[List[DocumentChunkCreate], List[Tuple[DocumentChunkCreate, List[float], int]]]:
+    rng = np.random.default_rng(seed)
+    n_parents = max(1, n // (_CHILDREN_PER_PARENT + 1))
+    n_children = n - n_parents
+    text = "벤치마크 청크 텍스트 " * 40
+
+    parents = [
+        DocumentChunkCreate(
+            knowledge_id=knowledge_id,
+            chunk_level="parent",
+            parent_chunk_id=None,
+            segment_index=i,
+            chunk_index=None,
+            chunk_index_in_segment=None,
+            chunk_text=text,
+        )
+        for i in range(n_parents)
+    ]
+    vecs = rng.standard_normal((n_children, dim)).astype(np.float32)
+    children = []
+    for i in range(n_children):
+        p = min(i // _CHILDREN_PER_PARENT, n_parents - 1)
+        children.append(
+            (
+                DocumentChunkCreate(
+                    knowledge_id=knowledge_id,
+                    chunk_level="child",
+                    parent_chunk_id=None,
+                    segment_index=p,
+                    chunk_index_in_segment=i % _CHILDREN_PER_PARENT,
+                    chunk_index=i,
+                    chunk_text=text,
+                ),
+                vecs[i].tolist(),
+                p,
+            )
+        )
+    return parents, children
+
+
+def _bench_orm(db, parents: Sequence[DocumentChunkCreate], children) -> float:
+    t0 = time.perf_counter()
+    parent_ids: List[int] = []
+    for data in parents:
+        parent_ids.append(document_chunk_crud.create(db, data, vector=None).chunk_id)
+    rows: List[Tuple[DocumentChunkCreate, Optional[List[float]]]] = []
+    for data, vec, p in children:
+        rows.append((data.model_copy(update={"parent_chunk_id": parent_ids[p]}), vec))
+    document_chunk_crud.bulk_create(db, rows)
+    return time.perf_counter() - t0
+
+
+def _bench_copy(db, parents: Sequence[DocumentChunkCreate], children) -> float:
+    t0 = time.perf_counter()
+    document_chunk_crud.bulk_copy(db, parents=parents, children=children)
+    return time.perf_counter() - t0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="document chunk writer benchmark (rolled back)")
+    parser.add_argument("--knowledge-id", type=int, required=True, help="existing document to attach rows to")
+    parser.add_argument("--sizes", default="200,2000,20000")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    print(f"{'chunks':>8} {'orm s':>9} {'orm rows/s':>11} {'copy s':>9} {'copy rows/s':>12} {'speedup':>8}")
+    for n in sizes:
+        parents, children = _make_rows(args.knowledge_id, n, args.dim, args.seed)
+
+        db = SessionLocal()
+        try:
+            orm_s = _bench_orm(db, parents, children)
+        finally:
+            db.rollback()
+            db.close()
+
+        db = SessionLocal()
+        try:
+            copy_s = _bench_copy(db, parents, children)
+        finally:
+            db.rollback()
+            db.close()
+
+        print(
+            f"{n:>8} {orm_s:>9.3f} {n / orm_s:>11.0f} {copy_s:>9.3f} {n / copy_s:>12.0f} {orm_s / copy_s:>7.2f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Reranker throughput benchmark (CPU): direct scoring vs micro-batching.
+
+Simulates 1 / 8 / 32 concurrent turns. Each turn reranks --passages
+(question, chunk) pairs, --rounds times in a row:
+  - direct : every request calls the model on its own (old path)
+  - batched: requests go through RerankBatcher and share forward passes
+
+Reports pairs/s and p50/p95 per-request latency. Needs the model and its
+backend installed (sentence-transformers / FlagEmbedding / onnxruntime);
+no database is used.
+
+Usage:
+    python -m script.bench_reranker [--model cross-encoder/ms-marco-MiniLM-L6-v2]
+        [--concurrency 1,8,32] [--backend torch|onnx] [--onnx-file onnx/model_qint8_avx512_vnni.onnx]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import threading
+import time
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+from core import config
+from service.user import rerank
+
+_WORDS = (
+    "파이썬 함수 리스트 딕셔너리 반복문 조건문 예외 클래스 상속 모듈 패키지 API 요청 응답 "
+    "데이터베이스 인덱스 쿼리 트랜잭션 임베딩 벡터 검색 모델 학습 평가 프롬프트 토큰 "
+    "HTTP 404 에러 코드 제3조 조항 과제 제출 기한 점수 강의 실습"
+).split()
+
+
+def _text(rng: random.Random, n_words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n_words))
+
+
+def _requests(n: int, passages: int, seed: int) -> List[List[Tuple[str, str]]]:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        q = _text(rng, 8) + "?"
+        out.append([(q, _text(rng, 120)) for _ in range(passages)])
+    return out
+
+
+def _run(
+    score: Callable[[List[Tuple[str, str]]], List[float]],
+    *,
+    concurrency: int,
+    rounds: int,
+    passages: int,
+    seed: int,
+) -> Tuple[float, List[float]]:
+    reqs = _requests(concurrency * rounds, passages, seed)
+    latencies: List[float] = []
+    lock = threading.Lock()
+    start = threading.Barrier(concurrency + 1)
+
+    def worker(w: int) -> None:
+        start.wait()
+        for r in range(rounds):
+            t0 = time.perf_counter()
+            score(reqs[w * rounds + r])
+            took = time.perf_counter() - t0
+            with lock:
+                latencies.append(took)
+
+    threads = [threading.Thread(target=worker, args=(w,)) for w in range(concurrency)]
+    for t in threads:
+        t.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - t0, latencies
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="reranker direct vs micro-batch throughput")
+    parser.add_argument("--model", default="cross-encoder/ms-marco-MiniLM-L6-v2")
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--passages", type=int, default=20, help="pairs per request (rerank_top_n candidates)")
+    parser.add_argument("--rounds", type=int, default=5, help="requests per concurrent turn")
+    parser.add_argument("--backend", choices=("torch", "onnx"), default=None)
+    parser.add_argument("--onnx-file", default=None)
+    parser.add_argument("--max-wait-ms", type=float, default=None)
+    parser.add_argument("--max-batch-pairs", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.backend:
+        config.RERANK_BACKEND = args.backend
+    if args.onnx_file:
+        config.RERANK_ONNX_FILE = args.onnx_file
+
+    direct = lambda pairs: rerank.score_pairs(args.model, pairs)  # noqa: E731
+    batcher = rerank.RerankBatcher(
+        args.model,
+        max_wait_ms=args.max_wait_ms,
+        max_batch_pairs=args.max_batch_pairs,
+        score_fn=direct,
+    )
+
+    t0 = time.perf_counter()
+    direct([("warm-up", "warm-up")])
+    print(f"# model {args.model} backend={getattr(config, 'RERANK_BACKEND', 'torch')} load+warm-up {time.perf_counter() - t0:.1f}s")
+    print(f"{'turns':>6} {'mode':>8} {'pairs/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'batches':>8}")
+
+    for c in [int(s) for s in args.concurrency.split(",") if s.strip()]:
+        for mode, fn in (("direct", direct), ("batched", batcher.score)):
+            batches_before = batcher.batches
+            wall, lat = _run(fn, concurrency=c, rounds=args.rounds, passages=args.passages, seed=args.seed)
+            ms = np.asarray(lat) * 1000.0
+            pairs = c * args.rounds * args.passages
+            batches = batcher.batches - batches_before if mode == "batched" else c * args.rounds
+            print(
+                f"{c:>6} {mode:>8} {pairs / wall:>9.1f} {np.percentile(ms, 50):>8.1f} "
+                f"{np.percentile(ms, 95):>8.1f} {batches:>8}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
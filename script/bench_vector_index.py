@@ -0,0 +1,258 @@
+"""
+ANN benchmark for document chunk vector search (pgvector HNSW).
+
+For each size (10k / 100k / 1M rows) seeds an UNLOGGED scratch table
+("user".bench_vector_chunks) with clustered unit vectors, then for each
+storage mode (database/vector_index.py) builds the same HNSW index as
+document_chunks (m=16, ef_construction=64) and reports index size, build
+time, p50/p95 latency and recall@k against exact float32 search for:
+  - all   : no filter
+  - filter: knowledge_id = ANY(:ids) (a few documents), iterative scan off / on
+
+Storage modes:
+  - full   : vector(dim) cosine (today's schema)
+  - halfvec: (vec::halfvec(dim)) index, top_k * --rescore candidates re-scored in float32
+  - binary : (binary_quantize(vec)::bit(dim)) hamming index, same re-scoring
+
+Exact search = float32 query with index scans disabled (SET LOCAL).
+Needs a live Postgres with pgvector >= 0.8 (halfvec, iterative scan). The
+scratch table is dropped at the end unless --keep.
+
+Usage:
+    python -m script.bench_vector_index [--sizes 10000,100000,1000000] [--ef 40,64,128,256]
+        [--modes full,halfvec,binary] [--rescore 4]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from database.session import get_db_connection
+from database.vector_index import VECTOR_STORAGE_MODES, create_index_sql
+
+_TABLE = '"user".bench_vector_chunks'
+_SEED_BATCH = 20000
+
+
+def _vec_literal(v: np.ndarray) -> str:
+    return "[" + ",".join(f"{x:.7f}" for x in v) + "]"
+
+
+def _unit(a: np.ndarray) -> np.ndarray:
+    return a / np.linalg.norm(a, axis=1, keepdims=True)
+
+
+def _copy_batch(cur, kids: np.ndarray, vecs: np.ndarray) -> None:
+    """PGCOPY 바이너리 (knowledge_id int8, vec vector) -> numpy 구조체로 한 번에 직렬화"""
+    n, dim = vecs.shape
+    row = np.dtype(
+        [
+            ("nfields", ">i2"),
+            ("kid_len", ">i4"),
+            ("kid", ">i8"),
+            ("vec_len", ">i4"),
+            ("dim", ">u2"),
+            ("unused", ">u2"),
+            ("vec", ">f4", (dim,)),
+        ]
+    )
+    buf = np.empty(n, dtype=row)
+    buf["nfields"] = 2
+    buf["kid_len"] = 8
+    buf["kid"] = kids
+    buf["vec_len"] = 4 + 4 * dim
+    buf["dim"] = dim
+    buf["unused"] = 0
+    buf["vec"] = vecs
+    header = b"PGCOPY\n\xff\r\n\x00" + (0).to_bytes(4, "big") * 2
+    trailer = (-1).to_bytes(2, "big", signed=True)
+    data = io.BytesIO(header + buf.tobytes() + trailer)
+    cur.copy_expert(f"COPY {_TABLE} (knowledge_id, vec) FROM STDIN WITH (FORMAT binary)", data)
+
+
+def _seed(conn, *, n: int, dim: int, n_docs: int, centers: np.ndarray, rng: np.random.Generator) -> None:
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {_TABLE}")
+        cur.execute(
+            f"CREATE UNLOGGED TABLE {_TABLE} (id bigserial PRIMARY KEY, knowledge_id bigint NOT NULL, vec vector({dim}) NOT NULL)"
+        )
+        for start in range(0, n, _SEED_BATCH):
+            m = min(_SEED_BATCH, n - start)
+            idx = rng.integers(0, len(centers), m)
+            vecs = _unit(centers[idx] + 0.35 * rng.standard_normal((m, dim))).astype(np.float32)
+            _copy_batch(cur, rng.integers(0, n_docs, m), vecs)
+        cur.execute(f"CREATE INDEX ON {_TABLE} (knowledge_id)")
+    conn.commit()
+
+
+def _index_name(mode: str) -> str:
+    return f"bench_vector_chunks_{mode}"
+
+
+def _build_index(conn, maintenance_work_mem: str, *, mode: str, dim: int) -> Tuple[float, str]:
+    """이전 모드 인덱스를 지우고 mode 인덱스 생성 -> (빌드 시간, 인덱스 크기)"""
+    conn.autocommit = True  # CREATE INDEX CONCURRENTLY
+    try:
+        with conn.cursor() as cur:
+            for m in VECTOR_STORAGE_MODES:
+                cur.execute(f'DROP INDEX IF EXISTS "user".{_index_name(m)}')
+            cur.execute("SELECT set_config('maintenance_work_mem', %s, false)", (maintenance_work_mem,))
+            t0 = time.perf_counter()
+            cur.execute(
+                create_index_sql(mode, dim=dim, table=_TABLE, column="vec", name=_index_name(mode), where=None)
+            )
+            took = time.perf_counter() - t0
+            cur.execute(f"ANALYZE {_TABLE}")
+            cur.execute("SELECT pg_size_pretty(pg_relation_size(%s::regclass))", (f'"user".{_index_name(mode)}',))
+            size = cur.fetchone()[0]
+    finally:
+        conn.autocommit = False
+    return took, size
+
+
+def _search_sql(mode: str, *, dim: int, filtered: bool) -> str:
+    where = "WHERE knowledge_id = ANY(%(kids)s)" if filtered else ""
+    if mode == "full":
+        return f"SELECT id FROM {_TABLE} {where} ORDER BY vec <=> %(q)s::vector LIMIT %(k)s"
+    if mode == "halfvec":
+        ann = f"vec::halfvec({dim}) <=> %(q)s::halfvec({dim})"
+    else:
+        ann = f"binary_quantize(vec)::bit({dim}) <~> binary_quantize(%(q)s::vector({dim}))"
+    # 양자화 인덱스로 후보 n개 -> float32 cosine으로 다시 정렬 (crud _run_search와 같은 모양)
+    return (
+        f"SELECT id FROM (SELECT id, vec FROM {_TABLE} {where} ORDER BY {ann} LIMIT %(n)s) c "
+        f"ORDER BY vec <=> %(q)s::vector LIMIT %(k)s"
+    )
+
+
+def _query(
+    conn,
+    sql: str,
+    q: str,
+    *,
+    top_k: int,
+    n: int,
+    kids: Optional[List[int]],
+    settings: Dict[str, str],
+) -> Tuple[float, List[int]]:
+    with conn.cursor() as cur:
+        for name, value in settings.items():
+            cur.execute("SELECT set_config(%s, %s, true)", (name, value))
+        t0 = time.perf_counter()
+        cur.execute(sql, {"q": q, "k": top_k, "n": n, "kids": kids})
+        ids = [r[0] for r in cur.fetchall()]
+        took = time.perf_counter() - t0
+    conn.rollback()
+    return took, ids
+
+
+def _report(size: int, mode: str, label: str, times: Sequence[float], recalls: Sequence[float]) -> None:
+    ms = np.asarray(times) * 1000.0
+    recall = f"{np.mean(recalls):.3f}" if recalls else "-"
+    print(
+        f"{size:>8} {mode:>6} {label:>30} {np.percentile(ms, 50):>8.2f} {np.percentile(ms, 95):>8.2f} {recall:>9}"
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="pgvector HNSW latency / recall benchmark (scratch table)")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--ef", default="40,64,128,256", help="hnsw.ef_search values")
+    parser.add_argument("--chunks-per-doc", type=int, default=500, help="knowledge_id cardinality = size / this")
+    parser.add_argument("--filter-docs", type=int, default=3, help="documents per filtered query")
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--maintenance-work-mem", default="2GB")
+    parser.add_argument("--modes", default="full,halfvec,binary", help="index storage modes to compare")
+    parser.add_argument("--rescore", type=int, default=4, help="halfvec/binary: re-score top_k * this candidates")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch table after the last size")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    efs = [int(s) for s in args.ef.split(",") if s.strip()]
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    for m in modes:
+        if m not in VECTOR_STORAGE_MODES:
+            parser.error(f"unknown mode: {m}")
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((args.clusters, args.dim)).astype(np.float32)
+    n_cand = args.top_k * max(1, args.rescore)
+
+    conn = get_db_connection()
+    try:
+        for n in sizes:
+            n_docs = max(1, n // args.chunks_per_doc)
+            t0 = time.perf_counter()
+            _seed(conn, n=n, dim=args.dim, n_docs=n_docs, centers=centers, rng=rng)
+            seed_s = time.perf_counter() - t0
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_size_pretty(pg_table_size(%s::regclass))", (_TABLE,))
+                table_size = cur.fetchone()[0]
+            conn.rollback()
+            print(f"\n# {n} rows, {n_docs} docs: seed {seed_s:.1f}s, table {table_size}")
+
+            qidx = rng.integers(0, len(centers), args.queries)
+            qvecs = _unit(centers[qidx] + 0.35 * rng.standard_normal((args.queries, args.dim)))
+            queries = [_vec_literal(v) for v in qvecs]
+            filters = [
+                [int(k) for k in rng.choice(n_docs, size=min(args.filter_docs, n_docs), replace=False)]
+                for _ in queries
+            ]
+
+            # 정답: float32 exact (인덱스 없이)
+            exact: Dict[str, List[set]] = {}
+            exact_times: Dict[str, List[float]] = {}
+            for scope in ("all", "filter"):
+                sql = _search_sql("full", dim=args.dim, filtered=scope == "filter")
+                exact[scope], exact_times[scope] = [], []
+                for i, q in enumerate(queries):
+                    kids = filters[i] if scope == "filter" else None
+                    took, ids = _query(
+                        conn, sql, q, top_k=args.top_k, n=n_cand, kids=kids, settings={"enable_indexscan": "off"}
+                    )
+                    exact_times[scope].append(took)
+                    exact[scope].append(set(ids))
+
+            for mode in modes:
+                build_s, index_size = _build_index(conn, args.maintenance_work_mem, mode=mode, dim=args.dim)
+                print(f"\n## {mode}: index {index_size}, build {build_s:.1f}s")
+                print(f"{'rows':>8} {'scope':>6} {'config':>30} {'p50 ms':>8} {'p95 ms':>8} {'recall@k':>9}")
+                for scope in ("all", "filter"):
+                    _report(n, scope, "exact", exact_times[scope], [])
+                    sql = _search_sql(mode, dim=args.dim, filtered=scope == "filter")
+                    scans = ("off",) if scope == "all" else ("off", "relaxed_order")
+                    for ef in efs:
+                        for scan in scans:
+                            # 후보 n개를 뽑아야 하므로 ef_search >= n
+                            ef_eff = max(ef, n_cand) if mode != "full" else ef
+                            settings = {"hnsw.ef_search": str(ef_eff), "hnsw.iterative_scan": scan}
+                            times, recalls = [], []
+                            for i, q in enumerate(queries):
+                                kids = filters[i] if scope == "filter" else None
+                                took, ids = _query(
+                                    conn, sql, q, top_k=args.top_k, n=n_cand, kids=kids, settings=settings
+                                )
+                                times.append(took)
+                                if exact[scope][i]:
+                                    recalls.append(len(exact[scope][i] & set(ids)) / len(exact[scope][i]))
+                            _report(n, scope, f"ef={ef_eff} scan={scan}", times, recalls)
+    finally:
+        conn.rollback()
+        if not args.keep:
+            with conn.cursor() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS {_TABLE}")
+            conn.commit()
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Equivalence check for the chunking token length engine.
+
+TokenLengthEngine (service/user/document_chunking.py) answers the
+splitter's length calls from one encoding of the whole document whenever
+the piece starts and ends on a pre-token boundary. This script checks it
+against direct encoding (the length_function used before the engine):
+
+  - substrings: random token-aligned slices of each file, engine count vs
+    len(encode(slice)) (mismatches must be 0)
+  - splitter  : RecursiveCharacterTextSplitter output with the engine vs
+    with direct encoding, for a few chunk sizes (must be identical)
+
+Needs the tiktoken BPE file for --model (downloaded on first use).
+
+Usage:
+    python -m script.check_token_length_engine FILE [FILE ...]
+        [--model text-embedding-3-small] [--samples 20000] [--sizes 200:40,400:100,800:200]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from typing import List, Tuple
+
+from core.pricing import get_token_encoder
+from service.user.document_chunking import TokenLengthEngine, build_splitter
+
+
+def _token_starts(enc, text: str) -> List[int]:
+    """문서 인코딩의 토큰 시작 char offset (문자 중간에서 시작하는 토큰 제외)"""
+    starts: List[int] = []
+    pos = 0
+    char_at = {}
+    ci = 0
+    raw = text.encode("utf-8")
+    for bi, b in enumerate(raw):
+        if (b & 0xC0) != 0x80:
+            char_at[bi] = ci
+            ci += 1
+    for tok in enc.encode_ordinary(text):
+        c = char_at.get(pos)
+        if c is not None:
+            starts.append(c)
+        pos += len(enc.decode_single_token_bytes(tok))
+    starts.append(len(text))
+    return starts
+
+
+def _check_substrings(enc, engine: TokenLengthEngine, text: str, samples: int, seed: int) -> Tuple[int, int]:
+    rnd = random.Random(seed)
+    starts = _token_starts(enc, text)
+    fast = bad = 0
+    for _ in range(samples):
+        i = rnd.randrange(len(starts) - 1)
+        j = min(len(starts) - 1, i + rnd.randint(1, 600))
+        s = text[starts[i]:starts[j]]
+        engine._cursor = starts[i]
+        n = engine._count_by_offsets(s)
+        if n is None:
+            continue
+        fast += 1
+        if n != len(enc.encode_ordinary(s)):
+            bad += 1
+    return fast, bad
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="check TokenLengthEngine against direct encoding")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--model", default="text-embedding-3-small")
+    parser.add_argument("--samples", type=int, default=20000)
+    parser.add_argument("--sizes", default="200:40,400:100,800:200", help="chunk_size:chunk_overlap,...")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    enc = get_token_encoder(args.model)
+    if enc is None:
+        print(f"no tiktoken encoder for {args.model} (tiktoken missing or BPE download failed)", file=sys.stderr)
+        return 1
+    sizes = [tuple(int(x) for x in part.split(":")) for part in args.sizes.split(",") if part]
+
+    failed = False
+    for path in args.files:
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            text = f.read()
+        if not text:
+            continue
+
+        t0 = time.perf_counter()
+        engine = TokenLengthEngine(args.model).bind(text)
+        fast, bad = _check_substrings(enc, engine, text, args.samples, args.seed)
+        print(f"# {path} ({len(text)} chars, bind {time.perf_counter() - t0:.2f}s)")
+        print(f"  substrings: {fast} via offsets, {bad} mismatches")
+        failed |= bad > 0
+
+        for size, overlap in sizes:
+            new = build_splitter(
+                chunk_size=size,
+                chunk_overlap=overlap,
+                strategy="recursive",
+                length_function=TokenLengthEngine(args.model).bind(text),
+            ).split_text(text)
+            old = build_splitter(
+                chunk_size=size,
+                chunk_overlap=overlap,
+                strategy="recursive",
+                length_function=lambda s: len(enc.encode_ordinary(s)),
+            ).split_text(text)
+            same = new == old
+            failed |= not same
+            print(f"  split {size}/{overlap}: {len(new)} chunks, identical={same}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Document ingest worker.
+
+Polls user.document_ingest_jobs and runs UploadPipeline.process_document
+(extract -> pages -> chunk -> embed -> store) outside the API process.
+Crashed / timed-out jobs are requeued and resume from the last completed stage.
+
+Run one or more of these next to the API server.
+
+Usage:
+    python -m script.document_worker [--concurrency N] [--per-user-limit N]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import signal
+import sys
+
+from service.user.document_jobs import DocumentIngestWorker
+from langchain_service.embedding.local_embedder import preload_local_embeddings
+
+log = logging.getLogger(__name__)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="document ingest worker")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--per-user-limit", type=int, default=None)
+    parser.add_argument("--poll", type=float, default=None, help="poll interval seconds")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s %(message)s",
+    )
+
+    # provider="local" 문서용 모델 로드 + warm-up (LOCAL_EMBEDDING_PRELOAD=true일 때만)
+    preload_local_embeddings()
+
+    worker = DocumentIngestWorker(
+        concurrency=args.concurrency,
+        per_user_limit=args.per_user_limit,
+        poll_s=args.poll,
+    )
+
+    def _handle_signal(signum, _frame):
+        log.info("signal %s received, stopping after running jobs", signum)
+        worker.stop()
+
+    signal.signal(signal.SIGINT, _handle_signal)
+    signal.signal(signal.SIGTERM, _handle_signal)
+
+    worker.run_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
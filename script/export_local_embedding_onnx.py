@@ -0,0 +1,115 @@
+"""
+Export the local embedding model (provider="local") to ONNX for CPU inference.
+
+Writes a sentence-transformers directory with onnx/model.onnx and, with
+--quantize, an int8 dynamically quantized copy (onnx/model_qint8_<config>.onnx,
+model_quint8_avx2.onnx for avx2). With --check, the ONNX output is compared
+against the torch model on sample texts (min cosine, texts/s).
+
+The model id stays the same (LOCAL_EMBEDDING_MODEL, stored in ingestion
+settings and embedding_cache keys); only the load path and backend change.
+Quantized vectors differ slightly from the torch ones, so reindex documents
+(or clear their embedding_cache rows) when switching an existing deployment.
+
+Deploy with:
+    LOCAL_EMBEDDING_PATH=<out>  LOCAL_EMBEDDING_BACKEND=onnx
+    LOCAL_EMBEDDING_ONNX_FILE=onnx/model_qint8_avx512_vnni.onnx   (quantized only)
+
+Needs sentence-transformers[onnx] (onnxruntime + optimum).
+
+Usage:
+    python -m script.export_local_embedding_onnx --out models/e5-base-onnx
+        [--model intfloat/multilingual-e5-base] [--quantize avx512_vnni|avx2|arm64] [--check]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+import numpy as np
+
+from core import config
+
+_SAMPLES = [
+    "파이썬에서 리스트와 튜플의 차이는 무엇인가요?",
+    "데이터베이스 인덱스는 조회 속도를 높이지만 쓰기 비용이 늘어난다.",
+    "과제 제출 기한은 강의계획서 제3조를 따른다.",
+    "HTTP 404 에러는 요청한 리소스를 찾을 수 없다는 뜻이다.",
+] * 8
+
+
+def _encode(model, texts: List[str]) -> np.ndarray:
+    return model.encode(texts, batch_size=32, normalize_embeddings=True, convert_to_numpy=True)
+
+
+def _check(model_id: str, out: str, onnx_file: str) -> None:
+    from sentence_transformers import SentenceTransformer
+
+    prefix = getattr(config, "LOCAL_EMBEDDING_DOCUMENT_PREFIX", "")
+    texts = [f"{prefix}{t}" for t in _SAMPLES]
+
+    ref = SentenceTransformer(model_id, device="cpu")
+    onnx = SentenceTransformer(out, backend="onnx", device="cpu", model_kwargs={"file_name": onnx_file})
+
+    timings = {}
+    vecs = {}
+    for name, m in (("torch", ref), (onnx_file, onnx)):
+        _encode(m, texts[:2])  # warm-up
+        t0 = time.perf_counter()
+        vecs[name] = _encode(m, texts)
+        timings[name] = len(texts) / (time.perf_counter() - t0)
+
+    cos = np.sum(vecs["torch"] * vecs[onnx_file], axis=1)
+    print(f"# check ({len(texts)} texts, dim={vecs['torch'].shape[1]})")
+    for name, tps in timings.items():
+        print(f"  {name:<40} {tps:8.1f} texts/s")
+    print(f"  min cosine(torch, onnx) = {cos.min():.5f}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="export the local embedding model to ONNX")
+    parser.add_argument("--model", default=getattr(config, "LOCAL_EMBEDDING_MODEL", "intfloat/multilingual-e5-base"))
+    parser.add_argument("--out", required=True, help="output directory (LOCAL_EMBEDDING_PATH)")
+    parser.add_argument("--quantize", choices=("avx512_vnni", "avx512", "avx2", "arm64"), default=None)
+    parser.add_argument("--check", action="store_true", help="compare against the torch model")
+    args = parser.parse_args(argv)
+
+    try:
+        from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+    except Exception as e:
+        print(f"sentence-transformers[onnx] is required: {e}", file=sys.stderr)
+        return 1
+
+    t0 = time.perf_counter()
+    model = SentenceTransformer(args.model, backend="onnx", device="cpu")  # onnx 파일 없으면 torch 가중치에서 변환
+    model.save_pretrained(args.out)
+    print(f"exported {args.model} -> {args.out}/onnx/model.onnx ({time.perf_counter() - t0:.1f}s)")
+
+    onnx_file = "onnx/model.onnx"
+    if args.quantize:
+        onnx_dir = os.path.join(args.out, "onnx")
+        before = set(os.listdir(onnx_dir))
+        t0 = time.perf_counter()
+        export_dynamic_quantized_onnx_model(model, args.quantize, args.out)
+        # 파일명은 설정마다 다름 (avx2 -> quint8, 나머지 -> qint8)
+        written = sorted(set(os.listdir(onnx_dir)) - before)
+        onnx_file = f"onnx/{written[0]}" if written else f"onnx/model_qint8_{args.quantize}.onnx"
+        print(f"quantized -> {args.out}/{onnx_file} ({time.perf_counter() - t0:.1f}s)")
+
+    if args.check:
+        _check(args.model, args.out, onnx_file)
+
+    print("# deploy with")
+    print(f"  LOCAL_EMBEDDING_PATH={args.out}")
+    print("  LOCAL_EMBEDDING_BACKEND=onnx")
+    print(f"  LOCAL_EMBEDDING_ONNX_FILE={onnx_file}")
+    if args.model != getattr(config, "LOCAL_EMBEDDING_MODEL", None):
+        print(f"  LOCAL_EMBEDDING_MODEL={args.model}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
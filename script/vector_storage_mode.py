@@ -0,0 +1,84 @@
+"""
+Switch the document_chunks ANN index between storage modes.
+
+  full    : HNSW on vector_memory (float32)
+  halfvec : HNSW on (vector_memory::halfvec(dim))            ~1/2 index size
+  binary  : HNSW on (binary_quantize(vector_memory)::bit(dim)) ~1/32 index size
+
+The float32 column is kept; searches re-score the ANN candidates against it
+(VECTOR_RESCORE_MULTIPLIER). Indexes are built/dropped CONCURRENTLY, so
+ingestion and search keep running.
+
+Rollout:
+    1) python -m script.vector_storage_mode --mode halfvec          (build)
+    2) deploy with VECTOR_STORAGE_MODE=halfvec
+    3) python -m script.vector_storage_mode --mode halfvec --drop-others
+
+Usage:
+    python -m script.vector_storage_mode --mode full|halfvec|binary [--drop-others] [--dry-run]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+from core import config
+from database.session import get_db_connection
+from database.vector_index import VECTOR_STORAGE_MODES, apply_vector_storage_mode, index_name
+
+
+def _print_sizes(cur) -> None:
+    names = [index_name(m) for m in VECTOR_STORAGE_MODES]
+    cur.execute(
+        "SELECT indexrelname, pg_size_pretty(pg_relation_size(indexrelid)) "
+        "FROM pg_stat_user_indexes WHERE schemaname = 'user' AND indexrelname = ANY(%s) ORDER BY 1",
+        (names,),
+    )
+    rows = cur.fetchall()
+    for name, size in rows:
+        print(f"  {name:<40} {size:>10}")
+    if not rows:
+        print("  (no ANN index)")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="document_chunks ANN index storage mode")
+    parser.add_argument("--mode", choices=VECTOR_STORAGE_MODES, required=True)
+    parser.add_argument("--drop-others", action="store_true", help="drop the other modes' indexes after building")
+    parser.add_argument("--dim", type=int, default=int(getattr(config, "EMBEDDING_DIM_FIXED", 1536)))
+    parser.add_argument("--maintenance-work-mem", default="2GB")
+    parser.add_argument("--dry-run", action="store_true", help="print the DDL only")
+    args = parser.parse_args(argv)
+
+    if args.dry_run:
+        apply_vector_storage_mode(print, args.mode, dim=args.dim, drop_others=args.drop_others)
+        return 0
+
+    conn = get_db_connection()
+    conn.autocommit = True  # CREATE/DROP INDEX CONCURRENTLY
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT set_config('maintenance_work_mem', %s, false)", (args.maintenance_work_mem,))
+            print("# before")
+            _print_sizes(cur)
+
+            def execute(sql: str) -> None:
+                t0 = time.perf_counter()
+                cur.execute(sql)
+                print(f"{sql}  -- {time.perf_counter() - t0:.1f}s")
+
+            apply_vector_storage_mode(execute, args.mode, dim=args.dim, drop_others=args.drop_others)
+            print("# after")
+            _print_sizes(cur)
+    finally:
+        conn.close()
+
+    current = getattr(config, "VECTOR_STORAGE_MODE", "full")
+    if current != args.mode:
+        print(f"# note: this process has VECTOR_STORAGE_MODE={current}; deploy with VECTOR_STORAGE_MODE={args.mode}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,13 +2,198 @@
 from __future__ import annotations
 
 import re
-from typing import Optional, List, Callable, Sequence
+from collections import deque
+from typing import Optional, List, Callable, Sequence, Dict, Set, Deque, Tuple
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from core.pricing import get_token_encoder
+
 DEFAULT_SEPARATORS: Sequence[str] = ["\n\n", "\n", " ", ""]
 
 
+# =========================================================
+# Token length engine
+# =========================================================
+def _pretoken_offsets(enc, text: str) -> Optional[Set[int]]:
+    """
+    encoder 정규식 기준 pre-token 경계 (char offset, 0과 끝 포함)
+    - 매치 사이에 빈 구간이 생기면 그 앞까지만 (이후 조각은 직접 인코딩)
+    - 정규식을 못 쓰면 None
+    """
+    pat = getattr(enc, "_pat_str", None)
+    if not pat:
+        return None
+    try:
+        import regex  # tiktoken 의존성
+    except ImportError:
+        return None
+
+    offsets = {0}
+    pos = 0
+    for m in regex.finditer(pat, text):
+        if m.start() != pos:
+            break
+        pos = m.end()
+        offsets.add(pos)
+    return offsets
+
+
+class TokenLengthEngine:
+    """
+    splitter용 length_function (토큰 기준).
+
+    - encoder는 core.pricing 전역 캐시에서 가져옴
+    - bind(text) 시 문서 전체를 한 번만 인코딩해서 토큰 시작 오프셋(char)을 저장
+    - splitter가 길이를 물어보는 조각이 문서의 부분 문자열이고, 양 끝이
+      문서의 pre-token 경계면 오프셋 차이로 바로 계산 (재인코딩 없음)
+    - 그 외(pre-token 중간에서 끊기거나 문서 밖 문자열)는 기존과 동일하게 직접 인코딩
+    - 결과는 문자열 단위로 memo
+
+    경계 조건:
+    - tiktoken은 encoder 정규식(_pat_str)으로 pre-token을 나누고 pre-token 안에서만 BPE
+      -> 토큰 경계라도 pre-token 중간이면 (예: ".\n"이 "." + "\n" 토큰) 부분 문자열은 다르게 인코딩될 수 있음
+    - 정규식은 lookbehind가 없으므로 start/end 모두 문서의 pre-token 경계면
+      부분 문자열 인코딩 == 문서 인코딩의 해당 구간
+    - 단, 공백으로 끝나는 조각은 제외 (cl100k의 "\s++$"처럼 문자열 끝에서만 붙는 공백 규칙)
+    - 정규식을 못 쓰면(_pat_str 없음 / regex 모듈 없음) 항상 직접 인코딩
+    => 기존 tokens_for_texts 기반 length_function과 동일한 값/청크 경계를 보장.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self._enc = get_token_encoder(model)
+        self._memo: Dict[str, int] = {}
+        self._text: str = ""
+        # char offset -> token index (문서 끝 offset -> 전체 토큰 수)
+        self._boundaries: Dict[int, int] = {}
+        self._cursor: int = 0
+
+    # -----------------------------------------------------
+    # exact (fallback)
+    # -----------------------------------------------------
+    def count(self, s: str) -> int:
+        if not s:
+            return 0
+        if self._enc is None:
+            return len(s)
+        return len(self._enc.encode_ordinary(s))
+
+    def lower_bound(self, s: str, limit: Optional[int] = None) -> int:
+        """
+        s 뒤에 텍스트가 더 붙어도 전체 토큰 수는 이 값 이상 (스트리밍 분할에서 큰 조각 조기 판정용)
+        - 마지막 pre-token 2개는 뒤 텍스트와 합쳐질 수 있어서 제외
+        - 공백으로 끝나는 지점도 제외 (문자열 끝 공백 규칙)
+        - 정규식을 못 쓰면 0 (조기 판정 안 함)
+        - limit: 그 이상인지만 보면 될 때 앞부분만 먼저 확인 (앞부분의 하한도 하한)
+        """
+        if not s:
+            return 0
+        if limit is not None and len(s) > 8 * limit:
+            n = self.lower_bound(s[: 8 * limit])
+            if n >= limit:
+                return n
+        if self._enc is None:
+            return len(s)
+        pretokens = _pretoken_offsets(self._enc, s)
+        if pretokens is None or len(s) not in pretokens:
+            return 0
+        offsets = sorted(pretokens)[:-2]
+        for cut in reversed(offsets):
+            if cut > 0 and not s[cut - 1].isspace():
+                return self.count(s[:cut])
+        return 0
+
+    # -----------------------------------------------------
+    # bind: 문서 1회 인코딩 + 토큰 시작 오프셋
+    # -----------------------------------------------------
+    def bind(self, text: str) -> "TokenLengthEngine":
+        self._memo.clear()
+        self._text = text or ""
+        self._boundaries = {}
+        self._cursor = 0
+
+        if self._enc is None or not self._text:
+            return self
+
+        pretokens = _pretoken_offsets(self._enc, self._text)
+        if pretokens is None:
+            return self
+
+        raw = self._text.encode("utf-8")
+
+        # utf-8 byte offset -> char offset (문자 시작 바이트만)
+        byte_to_char: Dict[int, int] = {}
+        ci = 0
+        for bi, b in enumerate(raw):
+            if (b & 0xC0) != 0x80:
+                byte_to_char[bi] = ci
+                ci += 1
+        byte_to_char[len(raw)] = ci
+
+        # 토큰 시작 중 pre-token 시작인 것만 경계로 기록
+        # (pre-token 경계는 항상 문자 경계 + 토큰 경계, 한글처럼 문자 중간에서 끊기는 토큰은 해당 없음)
+        boundaries: Dict[int, int] = {}
+        pos = 0
+        tokens = self._enc.encode_ordinary(self._text)
+        for ti, tok in enumerate(tokens):
+            c = byte_to_char.get(pos)
+            if c is not None and c in pretokens:
+                boundaries[c] = ti
+            pos += len(self._enc.decode_single_token_bytes(tok))
+        boundaries[len(self._text)] = len(tokens)
+
+        self._boundaries = boundaries
+        return self
+
+    def _locate(self, s: str) -> int:
+        # splitter는 대체로 앞에서 뒤로 진행 -> 마지막 위치 근처부터 탐색
+        t = self._text
+        i = t.find(s, self._cursor)
+        if i < 0:
+            i = t.find(s)
+        if i >= 0:
+            self._cursor = max(0, i)
+        return i
+
+    def _count_by_offsets(self, s: str) -> Optional[int]:
+        if not self._boundaries:
+            return None
+        a = self._locate(s)
+        if a < 0:
+            return None
+        b = a + len(s)
+        if b < len(self._text) and s[-1].isspace():
+            return None
+
+        ia = self._boundaries.get(a)
+        ib = self._boundaries.get(b)
+        if ia is None or ib is None:
+            return None
+        return ib - ia
+
+    # -----------------------------------------------------
+    # length_function
+    # -----------------------------------------------------
+    def __call__(self, s: str) -> int:
+        if not s:
+            return 0
+        hit = self._memo.get(s)
+        if hit is not None:
+            return hit
+
+        n = self._count_by_offsets(s)
+        if n is None:
+            n = self.count(s)
+        self._memo[s] = n
+        return n
+
+
+def build_token_length_function(model: str, text: str) -> TokenLengthEngine:
+    """문서 text에 bind된 토큰 length_function (ingest/preview 공용)."""
+    return TokenLengthEngine(model).bind(text)
+
+
 def build_splitter(
     *,
     chunk_size: int,
@@ -29,6 +214,182 @@ def build_splitter(
     )
 
 
+# =========================================================
+# Streaming split (general 모드 페이지 스트리밍)
+# =========================================================
+class _MergeFold:
+    """splitter._merge_splits를 조각 하나씩 (keep_separator -> 구분자 길이 0)"""
+
+    def __init__(self, root: "StreamingSplitter"):
+        self.root = root
+        self.docs: Deque[Tuple[str, int, int]] = deque()  # (조각, 길이, 시작 offset)
+        self.total = 0
+
+    def _emit(self) -> None:
+        self.root._emit("".join(d for d, _, _ in self.docs), self.docs[0][2])
+
+    def add(self, piece: str, n: int, start: int) -> None:
+        size, overlap = self.root.chunk_size, self.root.chunk_overlap
+        if self.total + n > size and self.docs:
+            self._emit()
+            while self.total > overlap or (self.total + n > size and self.total > 0):
+                self.total -= self.docs.popleft()[1]
+        self.docs.append((piece, n, start))
+        self.total += n
+
+    def finish(self) -> None:
+        if self.docs:
+            self._emit()
+        self.docs.clear()
+        self.total = 0
+
+
+class _SplitLevel:
+    """
+    splitter._split_text(text, separators)를 텍스트를 나눠 받으면서 계산
+    - 첫 구분자가 나오면 그 구분자로 확정 -> 다음 구분자 앞까지가 완성된 조각
+      (작은 조각은 merge, 큰 조각은 다음 구분자 목록으로 재귀 = 원본과 같은 순서)
+    - 아직 안 나왔거나 현재 조각이 chunk_size 이상으로 확정되면(lower_bound)
+      하위 단계로 넘겨서 계속 흘려보냄 (어느 쪽이든 원본도 하위 구분자로 분할)
+    - 구분자가 다음 입력과 이어질 수 있어서 끝의 len(sep)-1 글자는 남겨둠
+    """
+
+    def __init__(self, root: "StreamingSplitter", separators: Sequence[str], offset: int = 0):
+        self.root = root
+        self.seps = list(separators)
+        self.sep: Optional[str] = None  # 확정된 구분자 (None = 첫 구분자 아직 안 나옴)
+        self.rest: List[str] = []
+        self.cur = ""  # 하위 단계로 아직 안 넘긴 현재 조각
+        self.pos = offset  # cur 시작의 문서 offset
+        self.scan = 0  # cur에서 다음 구분자를 찾기 시작할 위치
+        self.child: Optional[_SplitLevel] = None
+        self.fold = _MergeFold(root)
+        if not self.seps[0]:
+            self.sep = ""
+
+    def feed(self, text: str) -> None:
+        self.cur += text
+        if self.sep is None:
+            if self.seps[0] not in self.cur:
+                self._spill(self.seps[1:], len(self.seps[0]) - 1)
+                return
+            self.sep, self.rest = self.seps[0], self.seps[1:]
+        self._scan_pieces()
+
+    def close(self) -> None:
+        if self.sep is None:
+            # 첫 구분자가 끝까지 없음 -> 원본도 다음 구분자부터 (마지막 구분자면 전체가 조각 하나)
+            if self.child is None and len(self.seps) > 1 and self.cur:
+                self.child = _SplitLevel(self.root, self.seps[1:], self.pos)
+            if self.child is None:
+                self.sep = self.seps[0]
+        self._end_piece(self.cur, self.pos)
+        self.fold.finish()
+        self.cur = ""
+        self.scan = 0
+
+    def _scan_pieces(self) -> None:
+        if self.sep == "":
+            for i, ch in enumerate(self.cur):
+                self._end_piece(ch, self.pos + i)
+            self.pos += len(self.cur)
+            self.cur = ""
+            return
+
+        # cur는 끝에서 한 번만 자름 (큰 입력을 조각마다 복사하지 않게)
+        cur, a, scan = self.cur, 0, self.scan
+        while True:
+            i = cur.find(self.sep, scan)
+            if i < 0:
+                break
+            self._end_piece(cur[a:i], self.pos + a)
+            a, scan = i, i + len(self.sep)
+        self.cur = cur[a:]
+        self.pos += a
+        self.scan = scan - a
+        self._spill(self.rest, len(self.sep) - 1)
+
+    def _spill(self, rest: List[str], keep: int) -> None:
+        if self.child is None:
+            if not rest or self.root.length.lower_bound(self.cur, self.root.chunk_size) < self.root.chunk_size:
+                return
+            # 큰 조각 앞의 작은 조각들 먼저 확정 (원본과 같은 순서)
+            self.fold.finish()
+            self.child = _SplitLevel(self.root, rest, self.pos)
+
+        n = len(self.cur) - keep
+        if n > 0:
+            self.child.feed(self.cur[:n])
+            self.cur = self.cur[n:]
+            self.pos += n
+            self.scan = max(0, self.scan - n)
+
+    def _end_piece(self, piece: str, start: int) -> None:
+        if self.child is None and piece:
+            n = self.root.length(piece)
+            if n < self.root.chunk_size:
+                self.fold.add(piece, n, start)
+                return
+            self.fold.finish()
+            if not self.rest:
+                self.root._emit(piece, start)
+                return
+            self.child = _SplitLevel(self.root, self.rest, start)
+
+        if self.child is not None:
+            self.child.feed(piece)
+            self.child.close()
+            self.child = None
+
+
+class StreamingSplitter:
+    """
+    recursive splitter의 split_text(전체 텍스트)와 같은 청크를, 텍스트를 앞에서부터 나눠 받으면서 확정되는 대로 내보냄
+    - feed(text) 후 drain()으로 확정된 (청크, 문서 offset)을 가져감, 마지막에 close()
+    - 확정 안 된 꼬리(현재 조각 + merge 중인 조각)만 들고 있음
+    - bind(length): 입력마다 length_function(TokenLengthEngine) 교체 가능 (값은 같고 빠른 경로만 달라짐)
+    """
+
+    def __init__(
+        self,
+        *,
+        chunk_size: int,
+        chunk_overlap: int,
+        strategy: str,
+        separators: Sequence[str] = DEFAULT_SEPARATORS,
+    ):
+        # MVP: recursive만
+        if strategy != "recursive":
+            raise ValueError(f"Unsupported chunk_strategy: {strategy}")
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.out: List[Tuple[str, int]] = []
+        self.length: Optional[TokenLengthEngine] = None
+        self._top = _SplitLevel(self, separators)
+
+    def bind(self, length: TokenLengthEngine) -> "StreamingSplitter":
+        self.length = length
+        return self
+
+    def _emit(self, text: str, start: int) -> None:
+        # splitter와 같이 strip (offset은 strip 후 시작 위치)
+        body = text.strip()
+        if body:
+            self.out.append((body, start + len(text) - len(text.lstrip())))
+
+    def feed(self, text: str) -> None:
+        self._top.feed(text)
+
+    def close(self) -> None:
+        self._top.close()
+
+    def drain(self) -> List[Tuple[str, int]]:
+        out = list(self.out)
+        self.out.clear()
+        return out
+
+
 def split_segments(*, text: str, separator: Optional[str]) -> list[str]:
     """
     1차 segment 분리
@@ -0,0 +1,156 @@
+# service/user/document_events.py
+from __future__ import annotations
+
+import json
+import time
+import select
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from core import config
+
+log = logging.getLogger(__name__)
+
+
+class DocumentStatusSubscription:
+    """특정 knowledge_id들의 상태 이벤트를 받는 asyncio 큐"""
+
+    def __init__(self, hub: "DocumentStatusHub", knowledge_ids: Iterable[int], loop: asyncio.AbstractEventLoop):
+        self._hub = hub
+        self.knowledge_ids: Set[int] = {int(k) for k in knowledge_ids}
+        self.loop = loop
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+
+    async def get(self, timeout_s: float) -> Optional[Dict[str, Any]]:
+        """이벤트 1개 (timeout이면 None)"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=max(0.0, timeout_s))
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self._hub.unsubscribe(self)
+
+
+class DocumentStatusHub:
+    """
+    프로세스당 LISTEN 커넥션 1개 -> 대기 중인 WebSocket들에 fan-out.
+    - 별도 스레드에서 psycopg2 LISTEN + select() (이벤트 루프를 막지 않음)
+    - 커넥션이 끊기면 backoff 후 재연결 (그동안 connected=False -> 호출자는 polling fallback)
+    """
+
+    def __init__(self, channel: Optional[str] = None):
+        self.channel = channel or getattr(config, "DOCUMENT_STATUS_CHANNEL", "document_status")
+        self._lock = threading.Lock()
+        self._subs: Dict[int, Set[DocumentStatusSubscription]] = {}
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.connected = False
+        self.connects = 0  # 재연결마다 +1 (끊긴 동안 놓친 이벤트가 있을 수 있음)
+
+    # -----------------------------------------------------
+    # subscribe
+    # -----------------------------------------------------
+    def subscribe(self, knowledge_ids: Iterable[int]) -> DocumentStatusSubscription:
+        self._ensure_started()
+        sub = DocumentStatusSubscription(self, knowledge_ids, asyncio.get_running_loop())
+        with self._lock:
+            for kid in sub.knowledge_ids:
+                self._subs.setdefault(kid, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: DocumentStatusSubscription) -> None:
+        with self._lock:
+            for kid in sub.knowledge_ids:
+                subs = self._subs.get(kid)
+                if subs is None:
+                    continue
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[kid]
+
+    def add_listener(self, fn: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        모든 문서 이벤트를 받는 프로세스 내부 콜백 (문서별 캐시 무효화용).
+        listener 스레드에서 호출되므로 짧게 끝나야 함.
+        """
+        self._ensure_started()
+        with self._lock:
+            self._listeners.append(fn)
+
+    def _dispatch(self, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+            kid = int(event["knowledge_id"])
+        except (ValueError, KeyError, TypeError):
+            log.warning("invalid document status payload: %r", payload[:200])
+            return
+        with self._lock:
+            listeners = list(self._listeners)
+            targets = list(self._subs.get(kid, ()))
+        for fn in listeners:
+            try:
+                fn(event)
+            except Exception as e:
+                log.warning("document event listener failed: %s", e)
+        for sub in targets:
+            try:
+                sub.loop.call_soon_threadsafe(sub.queue.put_nowait, event)
+            except RuntimeError:
+                # 이벤트 루프가 이미 닫힘
+                self.unsubscribe(sub)
+
+    # -----------------------------------------------------
+    # listener thread
+    # -----------------------------------------------------
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="document-status-listener", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        from database.session import get_db_connection
+
+        backoff = 1.0
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = get_db_connection()
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f'LISTEN "{self.channel}"')
+                self.connects += 1
+                self.connected = True
+                backoff = 1.0
+                log.info("document status listener connected (channel=%s)", self.channel)
+
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 5.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._dispatch(conn.notifies.pop(0).payload)
+            except Exception as e:
+                log.warning("document status listener error: %s (retry in %.0fs)", e, backoff)
+            finally:
+                self.connected = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            if not self._stop.is_set():
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+
+document_status_hub = DocumentStatusHub()
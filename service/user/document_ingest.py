@@ -1,59 +1,110 @@
 # service/user/document_ingest.py
 from __future__ import annotations
 
-from typing import Sequence, Optional, List, Tuple, Callable
+import re
+import json
+import hashlib
+from bisect import bisect_right
+from dataclasses import dataclass, field, asdict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Sequence, Optional, List, Tuple, Dict, Any, Deque
 
 from sqlalchemy.orm import Session
 
 from core import config
-from core.pricing import tokens_for_texts
+from database.session import SessionLocal
 
 from models.user.document import Document
 from crud.user.document import (
     document_chunk_crud,
     document_ingestion_setting_crud,
+    embedding_cache_crud,
 )
 from schemas.user.document import DocumentChunkCreate
-from langchain_service.embedding.get_vector import texts_to_vectors
+from langchain_service.embedding.get_vector import embed_texts
+from langchain_service.embedding.query_cache import (
+    embedding_cache_model,
+    embedding_text_hash,
+    normalize_embedding_text,
+)
+from langchain_service.embedding.factory import get_embeddings
+from langchain_service.embedding.batch_scheduler import (
+    EmbeddingBatchScheduler,
+    count_text_tokens,
+    pack_batches_by_tokens,
+)
 
 from service.user.document_chunking import (
     build_splitter,
+    build_token_length_function,
     split_segments,
     clean_texts,
+    StreamingSplitter,
 )
+from service.user.rerank import invalidate_rerank_scores
+from service.user.vector_cache import invalidate_document_vectors
 
 # =========================================================
 # helpers
 # =========================================================
-def _count_tokens(model: str, texts: List[str]) -> int:
-    if not texts:
-        return 0
-    return int(tokens_for_texts(model, texts))
+_SEGMENT_BREAK = re.compile(r"\n\s*\n")  # split_segments("\n\n")와 동일
+
+
+# 청크 캐시 키 = 질문 임베딩 캐시와 같은 정규화/해시 (user.embedding_cache 공유)
+normalize_chunk_text = normalize_embedding_text
+chunk_text_hash = embedding_text_hash
+
+
+def _resolve_embed_model(setting: Any) -> str:
+    return (
+        getattr(setting, "embedding_model", None)
+        or getattr(config, "DEFAULT_EMBEDDING_MODEL", "text-embedding-3-small")
+    )
+
 
+def _resolve_embed_dim(setting: Any) -> int:
+    return int(getattr(setting, "embedding_dim", None) or getattr(config, "EMBEDDING_DIM_FIXED", 1536))
 
-def _tok_len_factory(model: str) -> Callable[[str], int]:
-    def _tok_len(s: str) -> int:
-        return _count_tokens(model, [s])
 
-    return _tok_len
+def _resolve_embed_provider(setting: Any) -> str:
+    return str(getattr(setting, "embedding_provider", None) or "openai")
+
+
+def _check_vector_dims(vectors: Sequence[Sequence[float]], *, dim: int, model: str) -> None:
+    """임베더 출력 차원 == ingestion embedding_dim (차원별 벡터 컬럼) 확인 -> 다르면 저장 전에 실패"""
+    for v in vectors:
+        if len(v) != dim:
+            raise RuntimeError(
+                f"embedding model {model} returned {len(v)}-dim vectors, but embedding_dim is {dim}"
+            )
 
 
 # =========================================================
-# main service
+# chunk settings
 # =========================================================
-def ingest_document_text(
-    db: Session,
-    *,
-    document: Document,
-    full_text: str,
-) -> Tuple[int, int]:
-    """
-    ingestion_setting 기준으로
-    - general / parent_child 모드 처리
-    - child chunk만 embedding
-    반환: (생성된 child chunk 수, 임베딩에 사용된 총 토큰 수)
-    """
-    setting = document_ingestion_setting_crud.get(db, document.knowledge_id)
+@dataclass
+class ChunkSettings:
+    chunking_mode: str
+    segment_separator: Optional[str]
+    chunk_size: int
+    chunk_overlap: int
+    chunk_strategy: str
+    max_chunks: int  # 0이면 제한 없음
+    parent_chunk_size: Optional[int]
+    parent_chunk_overlap: int
+    embed_model: str
+    embed_dim: int
+    embed_provider: str = "openai"
+
+    def fingerprint(self) -> str:
+        """청크/임베딩 결과를 결정하는 설정 전체의 hash (인제스트 시 documents.ingest_fingerprint로 저장)"""
+        raw = json.dumps(asdict(self), sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def load_chunk_settings(db: Session, knowledge_id: int) -> ChunkSettings:
+    setting = document_ingestion_setting_crud.get(db, knowledge_id)
     if setting is None:
         raise RuntimeError("DocumentIngestionSetting not found")
 
@@ -64,188 +115,753 @@ def ingest_document_text(
     if chunking_mode == "parent_child" and not segment_separator:
         segment_separator = "\n\n"
 
-    # child settings
-    child_chunk_size = int(getattr(setting, "chunk_size", 800) or 800)
-    child_chunk_overlap = int(getattr(setting, "chunk_overlap", 200) or 0)
-    chunk_strategy = str(getattr(setting, "chunk_strategy", "recursive") or "recursive")
-    max_chunks = int(getattr(setting, "max_chunks", 0) or 0)  # 0이면 제한 없음
-
     # parent settings (parent_child에서만 의미)
     parent_chunk_size_raw = getattr(setting, "parent_chunk_size", None)
     parent_chunk_overlap_raw = getattr(setting, "parent_chunk_overlap", None)
 
-    parent_chunk_size = int(parent_chunk_size_raw) if parent_chunk_size_raw is not None else None
-    parent_chunk_overlap = int(parent_chunk_overlap_raw) if parent_chunk_overlap_raw is not None else 0
-
-    embed_model = (
-        getattr(setting, "embedding_model", None)
-        or getattr(config, "DEFAULT_EMBEDDING_MODEL", "text-embedding-3-small")
+    return ChunkSettings(
+        chunking_mode=chunking_mode,
+        segment_separator=segment_separator,
+        chunk_size=int(getattr(setting, "chunk_size", 800) or 800),
+        chunk_overlap=int(getattr(setting, "chunk_overlap", 200) or 0),
+        chunk_strategy=str(getattr(setting, "chunk_strategy", "recursive") or "recursive"),
+        max_chunks=int(getattr(setting, "max_chunks", 0) or 0),
+        parent_chunk_size=int(parent_chunk_size_raw) if parent_chunk_size_raw is not None else None,
+        parent_chunk_overlap=int(parent_chunk_overlap_raw) if parent_chunk_overlap_raw is not None else 0,
+        embed_model=_resolve_embed_model(setting),
+        embed_dim=_resolve_embed_dim(setting),
+        embed_provider=_resolve_embed_provider(setting),
     )
 
+
+# =========================================================
+# chunk plan (chunk 단계 산출물)
+# - DB 저장 전 순수 데이터 -> job checkpoint로 직렬화 가능
+# =========================================================
+@dataclass
+class PlannedChunk:
+    chunk_level: str
+    segment_index: int
+    chunk_text: str
+    chunk_index_in_segment: Optional[int] = None
+    chunk_index: Optional[int] = None
+    parent_ref: Optional[int] = None  # child만: 몇 번째 parent인지 (0부터, 문서 전체 기준)
+    page_no: Optional[int] = None  # 청크 시작 위치의 페이지 (1부터)
+
+
+@dataclass
+class ChunkPlan:
+    embed_model: str
+    embed_dim: int = 1536
+    embed_provider: str = "openai"
+    parents: List[PlannedChunk] = field(default_factory=list)
+    children: List[PlannedChunk] = field(default_factory=list)
+
+    def child_texts(self) -> List[str]:
+        return [c.chunk_text for c in self.children]
+
+    @property
+    def cache_model(self) -> str:
+        """embedding_cache key (축소 차원이면 "모델@dim", openai 외 provider는 "provider:모델")"""
+        return embedding_cache_model(self.embed_model, self.embed_dim, self.embed_provider)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "embed_model": self.embed_model,
+            "embed_dim": self.embed_dim,
+            "embed_provider": self.embed_provider,
+            "parents": [asdict(p) for p in self.parents],
+            "children": [asdict(c) for c in self.children],
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "ChunkPlan":
+        return cls(
+            embed_model=str(d.get("embed_model") or ""),
+            embed_dim=int(d.get("embed_dim") or getattr(config, "EMBEDDING_DIM_FIXED", 1536)),
+            embed_provider=str(d.get("embed_provider") or "openai"),
+            parents=[PlannedChunk(**p) for p in (d.get("parents") or [])],
+            children=[PlannedChunk(**c) for c in (d.get("children") or [])],
+        )
+
+
+class _PageMarks:
+    """텍스트 offset -> page_no (페이지 시작 offset 목록)"""
+
+    def __init__(self, starts: Optional[Sequence[Tuple[int, int]]] = None):
+        self.offsets: List[int] = []
+        self.pages: List[int] = []
+        for off, page_no in starts or []:
+            self.add(off, page_no)
+
+    def add(self, offset: int, page_no: int) -> None:
+        self.offsets.append(int(offset))
+        self.pages.append(int(page_no))
+
+    def page_at(self, offset: int) -> Optional[int]:
+        if not self.pages:
+            return None
+        i = bisect_right(self.offsets, offset) - 1
+        return self.pages[max(i, 0)]
+
+    def drop_before(self, cut: int) -> None:
+        """버퍼 앞부분(cut 이전)을 버린 뒤 offset 재정렬"""
+        if not self.pages:
+            return
+        first = self.page_at(cut)
+        kept = [(o - cut, p) for o, p in zip(self.offsets, self.pages) if o > cut]
+        self.offsets = [0] + [o for o, _ in kept]
+        self.pages = [first] + [p for _, p in kept]
+
+
+# =========================================================
+# stage: chunk
+# =========================================================
+class ChunkPlanner:
+    """
+    general / parent_child 청크 계획 (DB 쓰기 없음)
+
+    - plan_text(full_text): 문서 전체 한 번에 (기존 방식)
+    - feed(page_no, page_text) / finish(): 페이지 단위 스트리밍
+      * parent_child: 마지막 segment 구분자까지만 처리하고 나머지는 다음 페이지와 이어붙임
+        -> segment 경계는 전체 처리와 동일
+      * general: StreamingSplitter로 확정된 청크부터 바로 내보냄
+        -> 꼬리(확정 안 된 조각)만 다음 페이지와 이어붙임, 청크 경계는 전체 처리와 동일
+      * drain()으로 새로 확정된 parent/child를 가져감 (메모리에 문서 전체를 들고 있지 않음)
+    - 청크마다 시작 위치의 page_no 기록
+    """
+
+    def __init__(self, settings: ChunkSettings):
+        self.s = settings
+        self.plan = ChunkPlan(
+            embed_model=settings.embed_model,
+            embed_dim=settings.embed_dim,
+            embed_provider=settings.embed_provider,
+        )
+
+        self._global_idx = 1
+        self._seg_idx = 0
+        self._parent_count = 0
+        self._remaining: Optional[int] = settings.max_chunks if settings.max_chunks > 0 else None  # child 기준
+
+        # 현재 분할 대상 텍스트 + 페이지 위치
+        self._buf = ""
+        self._marks = _PageMarks()
+        self._cursor = 0
+        self._child_cursor = 0
+
+        # general 스트리밍: 페이지를 나눠 받아도 전체 처리와 같은 경계
+        self._stream: Optional[StreamingSplitter] = None
+        if settings.chunking_mode == "general":
+            self._stream = StreamingSplitter(
+                chunk_size=settings.chunk_size,
+                chunk_overlap=settings.chunk_overlap,
+                strategy=settings.chunk_strategy,
+            )
+        self._offset = 0  # 지금까지 공급한 텍스트 길이 (페이지 사이 "\n" 포함)
+
+    @property
+    def done(self) -> bool:
+        return self._remaining is not None and self._remaining <= 0
+
     # -----------------------------------------------------
-    # 0) 기존 청크 삭제 (reindex)
+    # splitter / page 위치
     # -----------------------------------------------------
-    document_chunk_crud.delete_by_document(db, document.knowledge_id)
+    def _splitters(self, text: str):
+        # 분할 대상 텍스트를 한 번만 인코딩한 토큰 오프셋 기반 length_function
+        tok_len = build_token_length_function(self.s.embed_model, text)
+
+        child_splitter = build_splitter(
+            chunk_size=self.s.chunk_size,
+            chunk_overlap=self.s.chunk_overlap,
+            strategy=self.s.chunk_strategy,
+            length_function=tok_len,
+        )
+        parent_splitter = None
+        if self.s.chunking_mode == "parent_child" and self.s.parent_chunk_size:
+            parent_splitter = build_splitter(
+                chunk_size=self.s.parent_chunk_size,
+                chunk_overlap=self.s.parent_chunk_overlap,
+                strategy=self.s.chunk_strategy,
+                length_function=tok_len,
+            )
+        return child_splitter, parent_splitter
 
-    if not full_text or not full_text.strip():
-        document.chunk_count = 0
-        db.flush()
-        return 0, 0
+    def _locate(self, text: str, cursor: int) -> int:
+        i = self._buf.find(text, cursor)
+        if i < 0:
+            i = self._buf.find(text)
+        return i
+
+    def _page_of(self, offset: int) -> Optional[int]:
+        return self._marks.page_at(max(offset, 0))
 
     # -----------------------------------------------------
-    # 1) splitter 준비
+    # emit
     # -----------------------------------------------------
-    tok_len = _tok_len_factory(embed_model)
+    def _emit_general(self, chunks: List[Tuple[str, int]]) -> None:
+        # (청크, 문서 offset) -> 시작 위치의 page_no
+        if self._remaining is not None:
+            chunks = chunks[: self._remaining]
+
+        for text, start in chunks:
+            self.plan.children.append(
+                PlannedChunk(
+                    chunk_level="child",
+                    segment_index=1,
+                    chunk_index_in_segment=self._global_idx,
+                    chunk_index=self._global_idx,
+                    chunk_text=text,
+                    page_no=self._page_of(start),
+                )
+            )
+            self._global_idx += 1
+            if self._remaining is not None:
+                self._remaining -= 1
 
-    child_splitter = build_splitter(
-        chunk_size=child_chunk_size,
-        chunk_overlap=child_chunk_overlap,
-        strategy=chunk_strategy,
-        length_function=tok_len,
-    )
+    def _emit_segment(self, segment_text: str, child_splitter, parent_splitter) -> None:
+        self._seg_idx += 1
+        seg_idx = self._seg_idx
 
-    parent_splitter = None
-    if chunking_mode == "parent_child" and parent_chunk_size:
-        parent_splitter = build_splitter(
-            chunk_size=parent_chunk_size,
-            chunk_overlap=parent_chunk_overlap,
-            strategy=chunk_strategy,
-            length_function=tok_len,
-        )
+        # segment을 parent 단위로 추가 분할(옵션)
+        if parent_splitter is not None:
+            parent_texts = clean_texts(parent_splitter.split_text(segment_text))
+        else:
+            st = (segment_text or "").strip()
+            parent_texts = [st] if st else []
 
-    chunk_rows: list[tuple[DocumentChunkCreate, Optional[Sequence[float]]]] = []
+        child_in_segment = 1  # segment 내 child 순번(여러 parent를 걸쳐 연속 증가)
 
-    global_chunk_index = 1
-    total_child_count = 0
-    total_tokens = 0
+        for parent_text in parent_texts:
+            if self.done:
+                break
 
-    remaining = max_chunks if max_chunks > 0 else None  # child 기준 제한(None이면 무제한)
+            parent_text = (parent_text or "").strip()
+            if not parent_text:
+                continue
 
-    # =====================================================
-    # 2) GENERAL MODE
-    # =====================================================
-    if chunking_mode == "general":
-        child_texts = clean_texts(child_splitter.split_text(full_text))
-        if remaining is not None:
-            child_texts = child_texts[:remaining]
+            # child 먼저 만들어보고(없으면 parent row도 만들 필요 없음)
+            child_texts = clean_texts(child_splitter.split_text(parent_text))
+            if self._remaining is not None:
+                child_texts = child_texts[: self._remaining]
 
-        if not child_texts:
-            document.chunk_count = 0
-            db.flush()
-            return 0, 0
+            if not child_texts:
+                continue
 
-        vectors = texts_to_vectors(child_texts)
-        total_tokens += _count_tokens(embed_model, child_texts)
+            ppos = self._locate(parent_text, self._cursor)
+            if ppos >= 0:
+                self._cursor = ppos + 1
+            self._child_cursor = max(ppos, 0)
+
+            parent_ref = self._parent_count
+            self._parent_count += 1
+            self.plan.parents.append(
+                PlannedChunk(
+                    chunk_level="parent",
+                    segment_index=seg_idx,
+                    chunk_text=parent_text,
+                    page_no=self._page_of(ppos if ppos >= 0 else self._cursor),
+                )
+            )
 
-        for i, (text, vec) in enumerate(zip(child_texts, vectors), start=1):
-            chunk_rows.append(
-                (
-                    DocumentChunkCreate(
-                        knowledge_id=document.knowledge_id,
+            for text in child_texts:
+                cpos = self._locate(text, self._child_cursor)
+                if cpos >= 0:
+                    self._child_cursor = cpos + 1
+                self.plan.children.append(
+                    PlannedChunk(
                         chunk_level="child",
-                        parent_chunk_id=None,
-                        segment_index=1,
-                        chunk_index_in_segment=i,
-                        chunk_index=global_chunk_index,
+                        segment_index=seg_idx,
+                        chunk_index_in_segment=child_in_segment,
+                        chunk_index=self._global_idx,
                         chunk_text=text,
-                    ),
-                    vec,
+                        parent_ref=parent_ref,
+                        page_no=self._page_of(cpos if cpos >= 0 else self._child_cursor),
+                    )
                 )
+                child_in_segment += 1
+                self._global_idx += 1
+
+                if self._remaining is not None:
+                    self._remaining -= 1
+                    if self._remaining <= 0:
+                        break
+
+    def _emit_segments(self, text: str) -> None:
+        child_splitter, parent_splitter = self._splitters(text)
+        for segment_text in split_segments(text=text, separator=self.s.segment_separator):
+            if self.done:
+                break
+            self._emit_segment(segment_text, child_splitter, parent_splitter)
+
+    def _set_buffer(self, text: str, marks: _PageMarks) -> None:
+        self._buf = text
+        self._marks = marks
+        self._cursor = 0
+        self._child_cursor = 0
+
+    # -----------------------------------------------------
+    # 전체 텍스트 (staged)
+    # -----------------------------------------------------
+    def plan_text(
+        self,
+        full_text: str,
+        *,
+        page_starts: Optional[Sequence[Tuple[int, int]]] = None,
+    ) -> ChunkPlan:
+        if not full_text or not full_text.strip():
+            return self.plan
+
+        self._set_buffer(full_text, _PageMarks(page_starts))
+
+        if self._stream is not None:
+            self._stream.bind(build_token_length_function(self.s.embed_model, full_text))
+            self._stream.feed(full_text)
+            self._stream.close()
+            self._emit_general(self._stream.drain())
+        else:
+            self._emit_segments(full_text)
+        return self.plan
+
+    # -----------------------------------------------------
+    # 페이지 스트리밍
+    # -----------------------------------------------------
+    def feed(self, page_no: int, page_text: str) -> None:
+        if self.done or not page_text:
+            return
+        if self._stream is not None:
+            self._feed_general(page_no, page_text)
+            return
+        if self._buf:
+            self._buf += "\n"
+        self._marks.add(len(self._buf), page_no)
+        self._buf += page_text
+        self._flush(final=False)
+
+    def finish(self) -> None:
+        if not self.done:
+            if self._stream is not None:
+                self._stream.close()
+                self._emit_general(self._stream.drain())
+            else:
+                self._flush(final=True)
+        self._set_buffer("", _PageMarks())
+
+    def _feed_general(self, page_no: int, page_text: str) -> None:
+        text = ("\n" + page_text) if self._offset else page_text
+        self._marks.add(self._offset + len(text) - len(page_text), page_no)
+        self._offset += len(text)
+
+        # 이번 입력에 bind (꼬리와 걸친 조각은 직접 인코딩, 값은 전체 처리와 동일)
+        self._stream.bind(build_token_length_function(self.s.embed_model, text))
+        self._stream.feed(text)
+        self._emit_general(self._stream.drain())
+
+    def _carry_from(self, cut: int) -> None:
+        marks = self._marks
+        marks.drop_before(cut)
+        self._set_buffer(self._buf[cut:], marks)
+
+    def _flush(self, *, final: bool) -> None:
+        buf = self._buf
+        if not buf.strip():
+            return
+
+        # parent_child: 마지막 segment 구분자 앞까지만 확정
+        if final:
+            self._emit_segments(buf)
+            return
+
+        sep = self.s.segment_separator or ""
+        if not sep:
+            return
+        if sep == "\n\n":
+            last = None
+            for m in _SEGMENT_BREAK.finditer(buf):
+                last = m
+            if last is None:
+                return
+            head_end, tail_start = last.start(), last.end()
+        else:
+            head_end = buf.rfind(sep)
+            if head_end < 0:
+                return
+            tail_start = head_end + len(sep)
+
+        head = buf[:head_end]
+        self._set_buffer(head, self._marks)
+        self._emit_segments(head)
+        self._buf = buf  # carry 계산용 원본 복구
+        self._carry_from(tail_start)
+
+    def drain(self) -> Tuple[List[PlannedChunk], List[PlannedChunk]]:
+        """새로 확정된 (parents, children) 반환 후 비움 (parent_ref는 문서 전체 기준 유지)"""
+        parents, children = self.plan.parents, self.plan.children
+        self.plan.parents, self.plan.children = [], []
+        return parents, children
+
+
+def plan_document_chunks(
+    db: Session,
+    *,
+    document: Document,
+    full_text: str,
+    page_starts: Optional[Sequence[Tuple[int, int]]] = None,
+) -> ChunkPlan:
+    """
+    ingestion_setting 기준으로 general / parent_child 청크 계획 생성 (DB 쓰기 없음)
+    - page_starts: [(full_text offset, page_no)] -> 청크별 page_no
+    """
+    settings = load_chunk_settings(db, document.knowledge_id)
+    return ChunkPlanner(settings).plan_text(full_text, page_starts=page_starts)
+
+
+# =========================================================
+# stage: embed
+# =========================================================
+@dataclass
+class EmbedResult:
+    vectors: List[List[float]]
+    embedding_tokens: int = 0  # 실제 API로 보낸(캐시 miss) 토큰 수
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+
+def embed_chunk_plan(db: Session, plan: ChunkPlan) -> EmbedResult:
+    """
+    child chunk만 임베딩.
+    - embedding_cache에서 (model(+차원), 텍스트 hash)로 bulk 조회 -> miss만 임베딩 후 캐시에 저장
+    - plan.embed_dim이 모델 기본 차원보다 작으면 dimensions 파라미터로 축소 임베딩
+    - 문서 내 같은 텍스트는 한 번만 임베딩
+    - 문서의 child 텍스트 전체를 한 번에 넘김 -> 토큰 예산 배치 + 동시 전송 (get_vector.embed_texts)
+    반환 vectors는 child 순서와 동일
+    """
+    child_texts = plan.child_texts()
+    if not child_texts:
+        return EmbedResult(vectors=[])
+
+    hashes = [chunk_text_hash(t) for t in child_texts]
+    cached = embedding_cache_crud.get_many(db, embedding_model=plan.cache_model, text_hashes=hashes)
+
+    # miss: hash 기준 dedupe (첫 등장 텍스트로 임베딩)
+    miss_texts: Dict[str, str] = {}
+    for h, t in zip(hashes, child_texts):
+        if h not in cached and h not in miss_texts:
+            miss_texts[h] = t
+
+    embedding_tokens = 0
+    if miss_texts:
+        result = embed_texts(
+            list(miss_texts.values()),
+            provider=plan.embed_provider,
+            model=plan.embed_model,
+            dimensions=plan.embed_dim,
+        )
+        _check_vector_dims(result.vectors, dim=plan.embed_dim, model=plan.embed_model)
+        fresh = dict(zip(miss_texts.keys(), result.vectors))
+        embedding_cache_crud.put_many(db, embedding_model=plan.cache_model, items=list(fresh.items()))
+        cached.update(fresh)
+        embedding_tokens = result.total_tokens
+
+    hits = sum(1 for h in hashes if h not in miss_texts)
+    return EmbedResult(
+        vectors=[cached[h] for h in hashes],
+        embedding_tokens=embedding_tokens,
+        cache_hits=hits,
+        cache_misses=len(hashes) - hits,
+    )
+
+
+# =========================================================
+# stage: store
+# =========================================================
+def reset_document_chunks(db: Session, knowledge_id: int) -> None:
+    """reindex 전 기존 청크 삭제 + 이 문서의 rerank 점수 / 인메모리 벡터 캐시 무효화"""
+    document_chunk_crud.delete_by_document(db, knowledge_id)
+    invalidate_rerank_scores(knowledge_id)
+    invalidate_document_vectors(knowledge_id)
+
+
+def store_chunk_plan(
+    db: Session,
+    *,
+    document: Document,
+    plan: ChunkPlan,
+    vectors: Sequence[Sequence[float]],
+    page_ids: Optional[Dict[int, int]] = None,
+) -> int:
+    """
+    기존 청크 삭제(reindex) 후 parent -> child 순으로 저장 + chunk_count 갱신.
+    - page_ids: page_no -> page_id (DocumentChunk.page_id)
+    반환: 생성된 child chunk 수
+    """
+    page_ids = page_ids or {}
+    if len(vectors) != len(plan.children):
+        raise RuntimeError("vector count does not match child chunk count")
+
+    reset_document_chunks(db, document.knowledge_id)
+
+    # parent (NO vector) + child를 COPY 한 번으로 저장 (parent id는 시퀀스 선점으로 연결)
+    parents = [
+        DocumentChunkCreate(
+            knowledge_id=document.knowledge_id,
+            page_id=page_ids.get(p.page_no) if p.page_no is not None else None,
+            chunk_level="parent",
+            parent_chunk_id=None,
+            segment_index=p.segment_index,
+            chunk_index=None,
+            chunk_index_in_segment=None,
+            chunk_text=p.chunk_text,
+        )
+        for p in plan.parents
+    ]
+
+    chunk_rows: list[tuple[DocumentChunkCreate, Optional[Sequence[float]], Optional[int]]] = []
+    for c, vec in zip(plan.children, vectors):
+        chunk_rows.append(
+            (
+                DocumentChunkCreate(
+                    knowledge_id=document.knowledge_id,
+                    page_id=page_ids.get(c.page_no) if c.page_no is not None else None,
+                    chunk_level="child",
+                    parent_chunk_id=None,
+                    segment_index=c.segment_index,
+                    chunk_index_in_segment=c.chunk_index_in_segment,
+                    chunk_index=c.chunk_index,
+                    chunk_text=c.chunk_text,
+                ),
+                vec,
+                c.parent_ref,
             )
-            global_chunk_index += 1
-            total_child_count += 1
+        )
 
-        if chunk_rows:
-            document_chunk_crud.bulk_create(db, chunk_rows)
+    document_chunk_crud.bulk_copy(db, parents=parents, children=chunk_rows)
 
-    # =====================================================
-    # 3) PARENT–CHILD MODE
-    # =====================================================
-    else:
-        segments = split_segments(text=full_text, separator=segment_separator)
+    # 문서 통계 업데이트
+    document.chunk_count = len(chunk_rows)
+    db.flush()
+    return len(chunk_rows)
 
-        for seg_idx, segment_text in enumerate(segments, start=1):
-            if remaining is not None and remaining <= 0:
-                break
 
-            # segment을 parent 단위로 추가 분할(옵션)
-            if parent_splitter is not None:
-                parent_texts = clean_texts(parent_splitter.split_text(segment_text))
-            else:
-                st = (segment_text or "").strip()
-                parent_texts = [st] if st else []
+# =========================================================
+# ingest result
+# =========================================================
+@dataclass
+class IngestResult:
+    child_count: int
+    embedding_tokens: int  # 실제 API로 보낸(캐시 miss) 토큰 수
+    cache_hits: int = 0
+    cache_misses: int = 0
 
-            if not parent_texts:
-                continue
 
-            child_in_segment = 1  # segment 내 child 순번(여러 parent를 걸쳐 연속 증가)
+# =========================================================
+# streaming writer (chunk -> embed -> insert 파이프라인)
+# =========================================================
+class StreamingChunkWriter:
+    """
+    ChunkPlanner.drain() 결과를 받아서
+    - parent: 즉시 insert (chunk_id 확보)
+    - child : stream batch 단위로 embedding_cache 조회 -> miss만 백그라운드 임베딩
+              -> 완료된 batch 순서대로 insert
+    DB 세션은 호출 스레드에서만 사용 (임베딩 스레드는 API 호출만).
+    commit은 호출자가 한 번에 (기존 청크 삭제 + 새 청크가 같은 트랜잭션 -> 중간 상태가 안 보임).
+    """
 
-            for parent_text in parent_texts:
-                if remaining is not None and remaining <= 0:
-                    break
+    def __init__(
+        self,
+        db: Session,
+        *,
+        document: Document,
+        embed_model: str,
+        page_ids: Dict[int, int],
+        embed_dim: Optional[int] = None,
+        embed_provider: str = "openai",
+        heartbeat: Optional[Callable[[], None]] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ):
+        self.db = db
+        self.document = document
+        self.embed_model = embed_model
+        self.embed_dim = int(embed_dim or getattr(config, "EMBEDDING_DIM_FIXED", 1536))
+        self.embed_provider = embed_provider
+        self.cache_model = embedding_cache_model(embed_model, self.embed_dim, embed_provider)
+        self.page_ids = page_ids  # page_no -> page_id (호출자가 페이지 저장하면서 채움)
+        self.heartbeat = heartbeat  # batch insert마다 호출 (작업 lease 연장, 긴 임베딩 구간 대비)
+        self.on_progress = on_progress  # batch insert마다 (저장된 child 수, 지금까지 받은 child 수)
+
+        self.batch_size = max(1, int(getattr(config, "DOCUMENT_STREAM_EMBED_BATCH", 128)))
+        self.max_inflight = max(1, int(getattr(config, "EMBEDDING_MAX_CONCURRENCY", 4)))
+
+        self._scheduler = EmbeddingBatchScheduler(
+            get_embeddings(embed_provider, model=embed_model, dimensions=self.embed_dim)
+        )
+        self._pool = ThreadPoolExecutor(max_workers=self.max_inflight, thread_name_prefix="ingest-embed")
+        self._inflight: Deque[Tuple[List[PlannedChunk], List[str], Dict[str, List[float]], Tuple[List[str], Any]]] = deque()
+
+        self._parent_ids: List[int] = []
+        self._pending: List[PlannedChunk] = []
+        self.planned = 0
 
-                parent_text = (parent_text or "").strip()
-                if not parent_text:
-                    continue
+        self.result = IngestResult(child_count=0, embedding_tokens=0)
 
-                # child 먼저 만들어보고(없으면 parent row도 만들 필요 없음)
-                child_texts = clean_texts(child_splitter.split_text(parent_text))
-                if remaining is not None:
-                    child_texts = child_texts[:remaining]
+        reset_document_chunks(db, document.knowledge_id)
 
-                if not child_texts:
-                    continue
+    def _page_id(self, page_no: Optional[int]) -> Optional[int]:
+        return self.page_ids.get(page_no) if page_no is not None else None
+
+    def _embed_misses(self, texts: List[str]) -> Tuple[List[List[float]], int]:
+        # 임베딩 스레드: 토큰 예산 배치로 나눠서 공유 스케줄러로 전송 (429 cooldown 공유)
+        token_counts = count_text_tokens(self.embed_model, texts)
+        batches = pack_batches_by_tokens(
+            token_counts,
+            max_tokens=int(getattr(config, "EMBEDDING_BATCH_MAX_TOKENS", 100_000)),
+            max_items=int(getattr(config, "EMBEDDING_BATCH_MAX_ITEMS", 512)),
+        )
+        out: List[List[float]] = []
+        for b in batches:
+            out.extend(self._scheduler.embed_batch([texts[i] for i in b.indices]))
+        _check_vector_dims(out, dim=self.embed_dim, model=self.embed_model)
+        return out, int(sum(token_counts))
+
+    def add(self, parents: List[PlannedChunk], children: List[PlannedChunk]) -> None:
+        if parents:
+            self._parent_ids.extend(
+                document_chunk_crud.bulk_copy(
+                    self.db,
+                    parents=[
+                        DocumentChunkCreate(
+                            knowledge_id=self.document.knowledge_id,
+                            page_id=self._page_id(p.page_no),
+                            chunk_level="parent",
+                            parent_chunk_id=None,
+                            segment_index=p.segment_index,
+                            chunk_index=None,
+                            chunk_index_in_segment=None,
+                            chunk_text=p.chunk_text,
+                        )
+                        for p in parents
+                    ],
+                )
+            )
 
-                # parent row 생성 (NO vector)
-                parent_row = document_chunk_crud.create(
-                    db,
+        self._pending.extend(children)
+        self.planned += len(children)
+        while len(self._pending) >= self.batch_size:
+            batch, self._pending = self._pending[: self.batch_size], self._pending[self.batch_size :]
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[PlannedChunk]) -> None:
+        hashes = [chunk_text_hash(c.chunk_text) for c in batch]
+        cached = embedding_cache_crud.get_many(self.db, embedding_model=self.cache_model, text_hashes=hashes)
+
+        miss_texts: Dict[str, str] = {}
+        for h, c in zip(hashes, batch):
+            if h not in cached and h not in miss_texts:
+                miss_texts[h] = c.chunk_text
+
+        future = self._pool.submit(self._embed_misses, list(miss_texts.values())) if miss_texts else None
+        self._inflight.append((batch, hashes, cached, (list(miss_texts.keys()), future)))
+
+        while len(self._inflight) > self.max_inflight:
+            self._write_oldest()
+
+    def _put_cache(self, fresh: Dict[str, List[float]]) -> None:
+        # 별도 세션으로 바로 commit: 인제스트 트랜잭션이 rollback돼도 재시도 때 캐시 hit (재과금 없음)
+        side = SessionLocal()
+        try:
+            embedding_cache_crud.put_many(side, embedding_model=self.cache_model, items=list(fresh.items()))
+            side.commit()
+        finally:
+            side.close()
+
+    def _write_oldest(self) -> None:
+        batch, hashes, cached, (miss_hashes, future) = self._inflight.popleft()
+
+        if future is not None:
+            vectors, tokens = future.result()
+            fresh = dict(zip(miss_hashes, vectors))
+            self._put_cache(fresh)
+            cached = {**cached, **fresh}
+            self.result.embedding_tokens += tokens
+
+        rows: list[tuple[DocumentChunkCreate, Optional[Sequence[float]], Optional[int]]] = []
+        for c, h in zip(batch, hashes):
+            rows.append(
+                (
                     DocumentChunkCreate(
-                        knowledge_id=document.knowledge_id,
-                        chunk_level="parent",
-                        parent_chunk_id=None,
-                        segment_index=seg_idx,
-                        chunk_index=None,
-                        chunk_index_in_segment=None,
-                        chunk_text=parent_text,
+                        knowledge_id=self.document.knowledge_id,
+                        page_id=self._page_id(c.page_no),
+                        chunk_level="child",
+                        parent_chunk_id=self._parent_ids[c.parent_ref] if c.parent_ref is not None else None,
+                        segment_index=c.segment_index,
+                        chunk_index_in_segment=c.chunk_index_in_segment,
+                        chunk_index=c.chunk_index,
+                        chunk_text=c.chunk_text,
                     ),
-                    vector=None,
+                    cached[h],
+                    None,
                 )
+            )
+        document_chunk_crud.bulk_copy(self.db, children=rows)
+        if self.heartbeat is not None:
+            self.heartbeat()
+
+        miss_set = set(miss_hashes)
+        misses = sum(1 for h in hashes if h in miss_set)
+        self.result.child_count += len(rows)
+        self.result.cache_misses += misses
+        self.result.cache_hits += len(rows) - misses
+        if self.on_progress is not None:
+            self.on_progress(self.result.child_count, self.planned)
+
+    def drain_completed(self) -> None:
+        """이미 끝난 임베딩 batch를 순서대로 insert (블로킹 없음)"""
+        while self._inflight:
+            future = self._inflight[0][3][1]
+            if future is not None and not future.done():
+                break
+            self._write_oldest()
 
-                # child embedding + rows
-                vectors = texts_to_vectors(child_texts)
-                total_tokens += _count_tokens(embed_model, child_texts)
-
-                for text, vec in zip(child_texts, vectors):
-                    chunk_rows.append(
-                        (
-                            DocumentChunkCreate(
-                                knowledge_id=document.knowledge_id,
-                                chunk_level="child",
-                                parent_chunk_id=parent_row.chunk_id,
-                                segment_index=seg_idx,
-                                chunk_index_in_segment=child_in_segment,
-                                chunk_index=global_chunk_index,
-                                chunk_text=text,
-                            ),
-                            vec,
-                        )
-                    )
-                    child_in_segment += 1
-                    global_chunk_index += 1
-                    total_child_count += 1
+    def finish(self) -> IngestResult:
+        if self._pending:
+            batch, self._pending = self._pending, []
+            self._dispatch(batch)
+        while self._inflight:
+            self._write_oldest()
+        self._pool.shutdown(wait=True)
 
-                    if remaining is not None:
-                        remaining -= 1
-                        if remaining <= 0:
-                            break
+        self.document.chunk_count = self.result.child_count
+        self.db.flush()
+        return self.result
 
-        if chunk_rows:
-            document_chunk_crud.bulk_create(db, chunk_rows)
+    def close(self) -> None:
+        """실패 시 대기 중 임베딩 취소"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
 
-    # -----------------------------------------------------
-    # 4) 문서 통계 업데이트
-    # -----------------------------------------------------
-    document.chunk_count = total_child_count
-    db.flush()
 
-    return total_child_count, total_tokens
+# =========================================================
+# main service
+# =========================================================
+def ingest_document_text(
+    db: Session,
+    *,
+    document: Document,
+    full_text: str,
+) -> IngestResult:
+    """
+    ingestion_setting 기준으로
+    - general / parent_child 모드 처리
+    - child chunk만 embedding (embedding_cache hit은 재사용)
+    반환: IngestResult (child 수, 임베딩 API 토큰 수, 캐시 hit/miss)
+
+    chunk -> embed -> store 단계를 한 번에 실행 (단계별 재시작은 UploadPipeline에서)
+    """
+    plan = plan_document_chunks(db, document=document, full_text=full_text)
+    emb = embed_chunk_plan(db, plan)
+    child_count = store_chunk_plan(db, document=document, plan=plan, vectors=emb.vectors)
+    return IngestResult(
+        child_count=child_count,
+        embedding_tokens=emb.embedding_tokens,
+        cache_hits=emb.cache_hits,
+        cache_misses=emb.cache_misses,
+    )
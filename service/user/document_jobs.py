@@ -0,0 +1,213 @@
+# service/user/document_jobs.py
+from __future__ import annotations
+
+import os
+import time
+import socket
+import logging
+import threading
+from uuid import uuid4
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import Session
+
+from core import config
+from database.session import SessionLocal
+from crud.user.document import document_ingest_job_crud
+from service.user.upload_pipeline import IngestSuperseded, UploadPipeline
+
+log = logging.getLogger(__name__)
+
+_HEARTBEAT_MIN_INTERVAL_S = 5.0  # 페이지 / batch마다 호출돼도 DB 쓰기는 이 간격 이상으로
+
+
+# =========================================================
+# enqueue (API 쪽)
+# =========================================================
+def enqueue_document_ingest(db: Session, *, user_id: int, knowledge_id: int) -> None:
+    """
+    문서 인제스트 작업 등록. commit은 호출자가 (문서 row와 같은 트랜잭션).
+    실제 처리는 script/document_worker.py 워커 프로세스가 가져감.
+    """
+    document_ingest_job_crud.enqueue(
+        db,
+        knowledge_id=knowledge_id,
+        user_id=user_id,
+        max_attempts=int(getattr(config, "DOCUMENT_JOB_MAX_ATTEMPTS", 3)),
+    )
+
+
+# =========================================================
+# run one job
+# =========================================================
+def run_document_ingest_job(
+    knowledge_id: int,
+    *,
+    user_id: int,
+    resume_after: Optional[str],
+    locked_by: str,
+) -> None:
+    """
+    claim된 작업 1개 실행 (워커 스레드, 세션 독립)
+    - locked_by: claim 때 받은 lease. 작업 기록은 lease가 유지될 때만 반영
+    - 실행 중 lease를 잃으면 (reindex 재enqueue / lease 만료 재큐잉) 다음 단계 기록 시점에 중단
+    """
+    db = SessionLocal()
+    try:
+        job = document_ingest_job_crud.get(db, knowledge_id)
+        max_attempts = int(getattr(job, "max_attempts", 1) or 1)
+        attempts = int(getattr(job, "attempts", 1) or 1)
+
+        def _on_stage(stage: str) -> None:
+            # pipeline이 같은 트랜잭션에서 commit
+            if not document_ingest_job_crud.mark_stage(
+                db, knowledge_id=knowledge_id, stage=stage, locked_by=locked_by
+            ):
+                raise IngestSuperseded(f"document ingest job {knowledge_id} was superseded")
+
+        last_beat = [time.monotonic()]
+
+        def _heartbeat() -> None:
+            # 스트리밍 중 lease 연장: 인제스트 트랜잭션은 아직 commit 전이라 별도 세션으로 바로 commit
+            now = time.monotonic()
+            if now - last_beat[0] < _HEARTBEAT_MIN_INTERVAL_S:
+                return
+            last_beat[0] = now
+            side = SessionLocal()
+            try:
+                alive = document_ingest_job_crud.heartbeat(side, knowledge_id=knowledge_id, locked_by=locked_by)
+                side.commit()
+            finally:
+                side.close()
+            if not alive:
+                raise IngestSuperseded(f"document ingest job {knowledge_id} was superseded")
+
+        try:
+            UploadPipeline(db, user_id).process_document(
+                knowledge_id,
+                resume_after=resume_after,
+                on_stage=_on_stage,
+                heartbeat=_heartbeat,
+                mark_failed=attempts >= max_attempts,
+            )
+        except IngestSuperseded:
+            log.warning("document ingest superseded: knowledge_id=%s lease=%s", knowledge_id, locked_by)
+            db.rollback()
+            return
+        except Exception as e:
+            log.exception("document ingest failed: knowledge_id=%s attempt=%s", knowledge_id, attempts)
+            db.rollback()
+            document_ingest_job_crud.fail(
+                db,
+                knowledge_id=knowledge_id,
+                locked_by=locked_by,
+                error=str(e),
+                backoff_base_s=float(getattr(config, "DOCUMENT_JOB_BACKOFF_BASE_S", 10.0)),
+            )
+            db.commit()
+            return
+
+        if not document_ingest_job_crud.complete(db, knowledge_id=knowledge_id, locked_by=locked_by):
+            log.warning("document ingest finished after lease loss: knowledge_id=%s lease=%s", knowledge_id, locked_by)
+        db.commit()
+    finally:
+        db.close()
+
+
+# =========================================================
+# worker
+# =========================================================
+class DocumentIngestWorker:
+    """
+    DB 작업 큐 폴링 워커.
+    - concurrency: 프로세스 내 동시 실행 수 (bounded thread pool)
+    - per_user_limit: 사용자별 동시 running 제한 (claim SQL에서 적용)
+    - lease 만료된 running 작업은 주기적으로 재큐잉 -> 마지막 완료 단계부터 이어서 실행
+    """
+
+    def __init__(
+        self,
+        *,
+        concurrency: Optional[int] = None,
+        per_user_limit: Optional[int] = None,
+        poll_s: Optional[float] = None,
+        lease_s: Optional[float] = None,
+    ):
+        self.concurrency = max(1, int(concurrency or getattr(config, "DOCUMENT_WORKER_CONCURRENCY", 2)))
+        self.per_user_limit = max(1, int(per_user_limit or getattr(config, "DOCUMENT_WORKER_PER_USER_LIMIT", 1)))
+        self.poll_s = float(poll_s or getattr(config, "DOCUMENT_WORKER_POLL_S", 2.0))
+        self.lease_s = float(lease_s or getattr(config, "DOCUMENT_JOB_LEASE_S", 900.0))
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:6]}"
+
+        self._slots = threading.Semaphore(self.concurrency)
+        self._stop = threading.Event()
+        self._last_reap = 0.0
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _reap_stale(self) -> None:
+        now = time.monotonic()
+        if now - self._last_reap < min(self.lease_s, 60.0):
+            return
+        self._last_reap = now
+
+        db = SessionLocal()
+        try:
+            n, failed = document_ingest_job_crud.requeue_stale(db, lease_s=self.lease_s)
+            db.commit()
+            if n:
+                log.warning("requeued %s stale document ingest jobs", n)
+            if failed:
+                log.error("stale document ingest jobs out of attempts, marked failed: %s", failed)
+        finally:
+            db.close()
+
+    def _claim(self):
+        # claim마다 고유 lease (같은 워커가 재큐잉된 같은 작업을 다시 가져가도 옛 실행과 구분)
+        lease = f"{self.worker_id}:{uuid4().hex[:8]}"
+        db = SessionLocal()
+        try:
+            job = document_ingest_job_crud.claim_next(
+                db,
+                worker_id=lease,
+                per_user_limit=self.per_user_limit,
+            )
+            if job is None:
+                db.rollback()
+                return None
+            claimed = (int(job.knowledge_id), int(job.user_id), job.stage, lease)
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def _run(self, knowledge_id: int, user_id: int, stage: Optional[str], lease: str) -> None:
+        try:
+            run_document_ingest_job(knowledge_id, user_id=user_id, resume_after=stage, locked_by=lease)
+        finally:
+            self._slots.release()
+
+    def run_forever(self) -> None:
+        log.info("document ingest worker start: id=%s concurrency=%s", self.worker_id, self.concurrency)
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="doc-ingest") as pool:
+            while not self._stop.is_set():
+                # 빈 슬롯이 생길 때까지 대기
+                if not self._slots.acquire(timeout=self.poll_s):
+                    continue
+
+                try:
+                    self._reap_stale()
+                    claimed = self._claim()
+                except Exception:
+                    log.exception("document ingest claim failed")
+                    claimed = None
+
+                if claimed is None:
+                    self._slots.release()
+                    self._stop.wait(self.poll_s)
+                    continue
+
+                pool.submit(self._run, *claimed)
+        log.info("document ingest worker stop: id=%s", self.worker_id)
@@ -1,14 +1,22 @@
 # service/user/document_rag.py
 from __future__ import annotations
 
-from typing import Optional, Any, Dict
+from dataclasses import replace
+from typing import Optional, Any, Dict, List, Sequence, Tuple
 import logging
 
 from sqlalchemy.orm import Session
 
 from core import config
+from core.pricing import tokens_for_text
 from crud.user import document as document_crud
-from crud.user.document import document_search_setting_crud
+from crud.user.document import (
+    ChunkSearchHit,
+    document_chunk_crud,
+    document_ingestion_setting_crud,
+    document_search_setting_crud,
+)
+from langchain_service.chain.context_pack import pack_context
 from schemas.common.llm import QASource
 
 log = logging.getLogger("api_cost")
@@ -27,19 +35,26 @@ def get_effective_search_settings(
     - knowledge_id 없으면 config.DEFAULT_SEARCH + fallback top_k
     - score_type은 cosine_similarity로 고정
     - reranker_top_n <= top_k 보정
+    - search_mode: vector | hybrid
+    - expand_to_parent: small-to-big (child 매칭 -> parent 본문)
+    - hnsw_ef_search / ivfflat_probes: NULL이면 None (crud에서 config 기본값)
+    - 읽기 전용: 설정 행은 업로드 시 생성, 여기서는 캐시 스냅샷만 읽음 (행 없으면 기본값, write 없음)
     """
     defaults = dict(getattr(config, "DEFAULT_SEARCH"))
     defaults["score_type"] = _SCORE_TYPE_FIXED
 
+    defaults.setdefault("search_mode", "vector")
+    defaults.setdefault("expand_to_parent", False)
+    defaults.setdefault("hnsw_ef_search", None)
+    defaults.setdefault("ivfflat_probes", None)
+
     if knowledge_id is None:
         defaults["top_k"] = int(top_k_fallback)
         return defaults
 
-    setting = document_search_setting_crud.ensure_default(
-        db,
-        knowledge_id=knowledge_id,
-        defaults=defaults,
-    )
+    setting = document_search_setting_crud.get_cached(db, knowledge_id)
+    if setting is None:
+        return defaults
 
     top_k = int(getattr(setting, "top_k", defaults["top_k"]))
     min_score = float(getattr(setting, "min_score", defaults["min_score"]))
@@ -48,6 +63,10 @@ def get_effective_search_settings(
     reranker_enabled = bool(getattr(setting, "reranker_enabled", defaults["reranker_enabled"]))
     reranker_model = getattr(setting, "reranker_model", defaults.get("reranker_model"))
     reranker_top_n = int(getattr(setting, "reranker_top_n", defaults["reranker_top_n"]))
+    search_mode = str(getattr(setting, "search_mode", None) or defaults["search_mode"])
+    expand_to_parent = bool(getattr(setting, "expand_to_parent", defaults["expand_to_parent"]))
+    hnsw_ef_search = getattr(setting, "hnsw_ef_search", None) or defaults["hnsw_ef_search"]
+    ivfflat_probes = getattr(setting, "ivfflat_probes", None) or defaults["ivfflat_probes"]
 
     if score_type != _SCORE_TYPE_FIXED:
         score_type = _SCORE_TYPE_FIXED
@@ -61,9 +80,81 @@ def get_effective_search_settings(
         "reranker_enabled": reranker_enabled,
         "reranker_model": reranker_model,
         "reranker_top_n": reranker_top_n,
+        "search_mode": search_mode,
+        "expand_to_parent": expand_to_parent,
+        "hnsw_ef_search": hnsw_ef_search,
+        "ivfflat_probes": ivfflat_probes,
     }
 
 
+def group_by_embedding_space(
+    db: Session, knowledge_ids: Sequence[int]
+) -> Dict[Tuple[str, str, int], List[int]]:
+    """
+    문서를 임베딩 공간 (provider, model, embedding_dim)별로 묶음
+    (질문은 공간마다 한 번 임베딩해서 해당 차원 컬럼 + 그 문서들로만 검색).
+    - 같은 차원이라도 provider/model이 다르면 다른 벡터 공간 -> 따로 묶음
+    - 설정 행이 없으면 기본값 (openai, DEFAULT_EMBEDDING_MODEL, EMBEDDING_DIM_FIXED)
+    - 읽기 캐시 스냅샷 사용 (write 없음)
+    """
+    default_model = str(getattr(config, "DEFAULT_EMBEDDING_MODEL", "text-embedding-3-small"))
+    default_dim = int(getattr(config, "EMBEDDING_DIM_FIXED", 1536))
+    groups: Dict[Tuple[str, str, int], List[int]] = {}
+    for kid in dict.fromkeys(int(k) for k in knowledge_ids):
+        setting = document_ingestion_setting_crud.get_cached(db, kid)
+        key = (
+            str(getattr(setting, "embedding_provider", None) or "openai"),
+            str(getattr(setting, "embedding_model", None) or default_model),
+            int(getattr(setting, "embedding_dim", None) or default_dim),
+        )
+        groups.setdefault(key, []).append(kid)
+    return groups
+
+
+def expand_hits_to_parents(
+    db: Session,
+    hits: Sequence[Any],
+    *,
+    token_budget: Optional[int] = None,
+    model: Optional[str] = None,
+) -> List[Any]:
+    """
+    small-to-big: 매칭된 child 대신 parent 본문을 컨텍스트로.
+    - 입력 순서(점수 순) 유지, 같은 parent에 붙은 child는 처음 것 1개만 (이웃 중복 제거)
+    - parent 본문은 쿼리 1번으로 조회, parent 없는 hit(general 모드)은 그대로
+    - 토큰 합계가 token_budget을 넘는 항목은 건너뜀 (첫 항목은 항상 포함)
+    - 결과는 child hit의 chunk_text만 parent 본문으로 바꾼 것 (chunk_id/score는 매칭된 child 기준)
+    """
+    if not hits:
+        return []
+
+    budget = int(token_budget or getattr(config, "PARENT_CONTEXT_TOKEN_BUDGET", 3000))
+    enc_model = model or getattr(config, "DEFAULT_CHAT_MODEL", "gpt-4o-mini")
+    parent_texts = document_chunk_crud.get_parent_texts(
+        db, [getattr(h, "parent_chunk_id", None) for h in hits]
+    )
+
+    out: List[Any] = []
+    seen_parents: set = set()
+    used = 0
+    for hit in hits:
+        pid = getattr(hit, "parent_chunk_id", None)
+        text = parent_texts.get(pid) if pid is not None else None
+        if text is not None:
+            if pid in seen_parents:
+                continue
+            seen_parents.add(pid)
+            hit = replace(hit, chunk_text=text) if isinstance(hit, ChunkSearchHit) else hit
+        body = getattr(hit, "chunk_text", None) or ""
+
+        tokens = tokens_for_text(enc_model, body)
+        if out and used + tokens > budget:
+            continue
+        used += tokens
+        out.append(hit)
+    return out
+
+
 def retrieve_sources(
     db: Session,
     *,
@@ -73,16 +164,30 @@ def retrieve_sources(
     search: Dict[str, Any],
 ) -> list[QASource]:
     """
-    벡터검색 + min_score + (옵션) rerank 적용 후 QASource 생성
+    벡터검색(또는 hybrid: 벡터 + 키워드 RRF) + min_score + (옵션) rerank 적용 후 QASource 생성
     """
-    chunks = document_crud.search_chunks_by_vector(
-        db,
-        query_vector=vector,
-        knowledge_id=knowledge_id,
-        top_k=int(search["top_k"]),
-        min_score=float(search["min_score"]),
-        score_type=str(search["score_type"]),
-    )
+    if search.get("search_mode") == "hybrid":
+        chunks = document_crud.search_chunks_hybrid(
+            db,
+            query_text=question,
+            query_vector=vector,
+            knowledge_id=knowledge_id,
+            top_k=int(search["top_k"]),
+            min_score=float(search["min_score"]),
+            ef_search=search.get("hnsw_ef_search"),
+            probes=search.get("ivfflat_probes"),
+        )
+    else:
+        chunks = document_crud.search_chunks_by_vector(
+            db,
+            query_vector=vector,
+            knowledge_id=knowledge_id,
+            top_k=int(search["top_k"]),
+            min_score=float(search["min_score"]),
+            score_type=str(search["score_type"]),
+            ef_search=search.get("hnsw_ef_search"),
+            probes=search.get("ivfflat_probes"),
+        )
 
     if (
         search.get("reranker_enabled")
@@ -91,7 +196,7 @@ def retrieve_sources(
         and int(search.get("reranker_top_n", 1)) >= 1
     ):
         try:
-            from service import rerank_chunks  # lazy import
+            from service.user.rerank import rerank_chunks  # lazy import
             chunks = rerank_chunks(
                 question,
                 chunks,
@@ -101,6 +206,9 @@ def retrieve_sources(
         except Exception as e:
             log.exception("rerank failed (fallback to vector order): %s", e)
 
+    if search.get("expand_to_parent"):
+        chunks = expand_hits_to_parents(db, chunks)
+
     sources: list[QASource] = []
     for chunk in chunks:
         kid = getattr(chunk, "knowledge_id", None)
@@ -130,8 +238,16 @@ def retrieve_sources(
     return sources
 
 
-def build_context_text(sources: list[QASource], *, max_chars: int = 12000) -> str:
+def build_context_text(
+    sources: list[QASource],
+    *,
+    model: Optional[str] = None,
+    token_budget: Optional[int] = None,
+) -> str:
+    """
+    sources(순위 순) -> 컨텍스트 문자열.
+    모델 토큰 예산 안에서 packing, 인접 chunk 겹침 제거 (langchain_service.chain.context_pack)
+    """
     if not sources:
         return ""
-    ctx = "\n\n".join((s.text or "") for s in sources)
-    return ctx[:max_chars]
+    return pack_context(sources, model=model, token_budget=token_budget).text
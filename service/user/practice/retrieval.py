@@ -2,43 +2,91 @@
 from __future__ import annotations
 
 import math
-from typing import Any, Callable, Dict, List, Mapping
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Mapping, Optional
 
 from sqlalchemy.orm import Session
 
 from core import config
+from database.session import SessionLocal
 from models.user.account import AppUser
 
-from langchain_service.embedding.get_vector import texts_to_vectors
+from langchain_service.embedding.get_vector import text_to_vector
 
-from crud.user.document import document_crud, document_chunk_crud
+from crud.user.document import document_chunk_crud
+from service.user.document_rag import expand_hits_to_parents, group_by_embedding_space
+from service.user.vector_cache import get_document_vector_cache
 
 from service.user.practice.ids import coerce_int_list
 
+log = logging.getLogger(__name__)
 
-def embed_question_to_vector(question: str) -> list[float]:
+
+def embed_question_to_vector(
+    question: str,
+    *,
+    provider: str = "openai",
+    model: Optional[str] = None,
+    dimensions: Optional[int] = None,
+) -> list[float]:
+    """
+    질문 임베딩 (text_to_vector -> 프로세스 전역 질문 임베딩 캐시 사용)
+    - provider / model / dimensions: 검색할 문서의 ingestion 설정과 같게 (None이면 기본 모델 / 기본 차원)
+    """
     cleaned = (question or "").strip()
     if not cleaned:
         return []
 
     try:
-        vectors = texts_to_vectors([cleaned])
+        vector = text_to_vector(cleaned, provider=provider, model=model, dimensions=dimensions)
     except Exception:
         return []
 
-    if not vectors:
-        return []
-
-    v0 = vectors[0]
-    if not isinstance(v0, (list, tuple)):
+    if vector is None:
         return []
 
-    return list(v0)
+    return [float(v) for v in vector.tolist()]
 
 
-def make_retrieve_fn_for_practice(db_outer: Session, me: AppUser) -> Callable[..., Any]:
-    vec_cache: dict[str, list[float]] = {}
+def make_retrieve_fn_for_practice(db_outer: Optional[Session], me: AppUser) -> Callable[..., Any]:
+    """
+    practice 검색 함수 (질문 임베딩 + 벡터 검색 + rerank, 결과는 key별 캐시).
+    - turn 단위로 1개 만들어 모든 모델 chain이 공유 -> 같은 질문/문서/검색 파라미터면 1번만 실행
+    - 모델별 retrieval_params가 다르면 key가 달라져 따로 검색
+    - 스레드 안전. db_outer=None이면 검색마다 세션을 따로 열어 씀 (여러 스레드에서 호출할 때)
+    - 문서의 임베딩 공간(provider, model, embedding_dim)이 섞여 있으면 공간별로 질문을 임베딩해서 따로 검색 후 합침
+    """
+    vec_cache: dict[tuple[str, tuple[str, str, int]], list[float]] = {}
     ret_cache: dict[tuple, Dict[str, Any]] = {}
+    lock = threading.Lock()
+    inflight: dict[Any, Future] = {}
+
+    def _single_flight(cache: dict, key: Any, compute: Callable[[], Any]) -> Any:
+        with lock:
+            if key in cache:
+                return cache[key]
+            fut = inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = Future()
+                inflight[key] = fut
+        if not owner:
+            return fut.result()
+
+        try:
+            value = compute()
+        except BaseException as exc:
+            with lock:
+                inflight.pop(key, None)
+            fut.set_exception(exc)
+            raise
+        with lock:
+            cache[key] = value
+            inflight.pop(key, None)
+        fut.set_result(value)
+        return value
 
     def _coerce_int(value: Any) -> int | None:
         try:
@@ -46,11 +94,10 @@ def make_retrieve_fn_for_practice(db_outer: Session, me: AppUser) -> Callable[..
         except (TypeError, ValueError):
             return None
 
-    def _coerce_float(value: Any) -> float | None:
-        try:
-            return float(value)
-        except (TypeError, ValueError):
-            return None
+    def _coerce_bool(value: Any) -> bool:
+        if isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes", "y")
+        return bool(value)
 
     def _get_search_params(raw_payload: dict | None) -> Mapping[str, Any]:
         if not isinstance(raw_payload, Mapping):
@@ -72,35 +119,6 @@ def make_retrieve_fn_for_practice(db_outer: Session, me: AppUser) -> Callable[..
                 value = _default_threshold()
         return float(min(max(float(value), 0.0), 1.0))
 
-    def _cosine_similarity(vec_a: list[float], vec_b: list[float]) -> float | None:
-        if not vec_a or not vec_b or len(vec_a) != len(vec_b):
-            return None
-        dot = 0.0
-        norm_a = 0.0
-        norm_b = 0.0
-        for a, b in zip(vec_a, vec_b):
-            dot += a * b
-            norm_a += a * a
-            norm_b += b * b
-        if norm_a <= 0.0 or norm_b <= 0.0:
-            return None
-        return dot / (math.sqrt(norm_a) * math.sqrt(norm_b))
-
-    def _chunk_score(chunk: Any, query_vector: list[float]) -> float | None:
-        existing = getattr(chunk, "score", None)
-        if existing is None:
-            existing = getattr(chunk, "similarity", None)
-        if existing is not None:
-            return _coerce_float(existing)
-        vec = getattr(chunk, "vector_memory", None)
-        if vec is None:
-            return None
-        try:
-            vector = list(vec)
-        except TypeError:
-            return None
-        return _cosine_similarity(query_vector, vector)
-
     def _retrieve(
         *,
         knowledge_ids: List[int] | None = None,
@@ -144,6 +162,18 @@ def make_retrieve_fn_for_practice(db_outer: Session, me: AppUser) -> Callable[..
         if rerank_top_n is not None:
             rerank_top_n = max(1, min(rerank_top_n, candidate_top_k))
 
+        ef_search = _coerce_int(search_params.get("hnsw_ef_search") or search_params.get("ef_search"))
+        probes = _coerce_int(search_params.get("ivfflat_probes") or search_params.get("probes"))
+        search_mode = str(
+            search_params.get("search_mode")
+            or getattr(config, "DEFAULT_SEARCH", {}).get("search_mode")
+            or "vector"
+        )
+        expand_to_parent = search_params.get("expand_to_parent", search_params.get("small_to_big"))
+        if expand_to_parent is None:
+            expand_to_parent = getattr(config, "DEFAULT_SEARCH", {}).get("expand_to_parent", False)
+        expand_to_parent = _coerce_bool(expand_to_parent)
+
         cache_key = (
             tuple(kids),
             q,
@@ -153,89 +183,112 @@ def make_retrieve_fn_for_practice(db_outer: Session, me: AppUser) -> Callable[..
             reranker_model,
             reranker_enabled,
             rerank_top_n,
+            ef_search,
+            probes,
+            search_mode,
+            expand_to_parent,
+        )
+        # 같은 key를 여러 모델 스레드가 동시에 요청하면 1번만 검색하고 결과 공유
+        return _single_flight(
+            ret_cache,
+            cache_key,
+            lambda: _search(
+                q=q,
+                kids=kids,
+                max_chunks=max_chunks,
+                effective_threshold=effective_threshold,
+                candidate_top_k=candidate_top_k,
+                reranker_model=reranker_model,
+                reranker_enabled=reranker_enabled,
+                rerank_top_n=rerank_top_n,
+                ef_search=ef_search,
+                probes=probes,
+                search_mode=search_mode,
+                expand_to_parent=expand_to_parent,
+            ),
         )
-        cached = ret_cache.get(cache_key)
-        if cached is not None:
-            return cached
-
-        if q in vec_cache:
-            query_vector = vec_cache[q]
-        else:
-            query_vector = embed_question_to_vector(q)
-            vec_cache[q] = query_vector
-
-        if not query_vector:
-            out = {"context": "", "sources": []}
-            ret_cache[cache_key] = out
-            return out
-
-        valid_docs: list[Any] = []
-        for kid in kids:
-            try:
-                doc = document_crud.get(db_outer, knowledge_id=kid)
-            except Exception:
-                doc = None
-
-            if not doc:
-                continue
-
-            owner_id = (
-                getattr(doc, "owner_id", None)
-                or getattr(doc, "user_id", None)
-                or getattr(doc, "owner_user_id", None)
-            )
-            if owner_id is not None and owner_id != me.user_id:
-                continue
-
-            real_kid = getattr(doc, "knowledge_id", None)
-            if real_kid is None:
-                continue
-
-            valid_docs.append(doc)
-
-        if not valid_docs:
-            out = {"context": "", "sources": []}
-            ret_cache[cache_key] = out
-            return out
 
-        chunks: list[Any] = []
-        for doc in valid_docs:
-            kid = getattr(doc, "knowledge_id", None)
-            if kid is None:
-                continue
-            try:
-                doc_chunks = document_chunk_crud.search_by_vector(
-                    db_outer,
-                    query_vector=query_vector,
-                    knowledge_id=kid,
-                    top_k=candidate_top_k,
-                    min_score=effective_threshold,
+    def _search(
+        *,
+        q: str,
+        kids: List[int],
+        max_chunks: int,
+        effective_threshold: float,
+        candidate_top_k: int,
+        reranker_model: Any,
+        reranker_enabled: Any,
+        rerank_top_n: int | None,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        search_mode: str = "vector",
+        expand_to_parent: bool = False,
+    ) -> Dict[str, Any]:
+        # 소유권 확인 + 전체 top-k를 쿼리 1번으로 (문서 수와 무관, 임베딩 공간별로는 1번씩)
+        hybrid = search_mode == "hybrid"
+        db_search = db_outer if db_outer is not None else SessionLocal()
+        hits: list[Any] = []
+        try:
+            groups = group_by_embedding_space(db_search, kids)
+            for space, group in groups.items():
+                query_vector = _single_flight(
+                    vec_cache,
+                    (q, space),
+                    lambda s=space: embed_question_to_vector(q, provider=s[0], model=s[1], dimensions=s[2]),
                 )
-            except Exception:
-                doc_chunks = []
-
-            if doc_chunks:
-                chunks.extend(doc_chunks)
-
-        if not chunks:
-            out = {"context": "", "sources": []}
-            ret_cache[cache_key] = out
-            return out
-
-        scored_chunks: list[tuple[float, Any]] = []
-        for chunk in chunks:
-            score = _chunk_score(chunk, query_vector)
-            score = score if score is not None else 0.0
-            if score < effective_threshold:
-                continue
-            scored_chunks.append((score, chunk))
+                if not query_vector:
+                    continue
+                if hybrid:
+                    # 벡터 + 키워드 -> RRF 순서 (키워드 arm은 min_score 미적용)
+                    hits.extend(
+                        document_chunk_crud.search_hybrid(
+                            db_search,
+                            query_text=q,
+                            query_vector=query_vector,
+                            knowledge_ids=group,
+                            owner_id=me.user_id,
+                            top_k=candidate_top_k,
+                            min_score=effective_threshold,
+                            ef_search=ef_search,
+                            probes=probes,
+                        )
+                    )
+                else:
+                    # 작은 문서는 인메모리 벡터 캐시 (큰/미적재 문서만 pgvector)
+                    vector_cache = get_document_vector_cache()
+                    search_vector = (
+                        vector_cache.search if vector_cache is not None else document_chunk_crud.search_by_vector_multi
+                    )
+                    hits.extend(
+                        search_vector(
+                            db_search,
+                            query_vector=query_vector,
+                            knowledge_ids=group,
+                            owner_id=me.user_id,
+                            top_k=candidate_top_k,
+                            min_score=effective_threshold,
+                            ef_search=ef_search,
+                            probes=probes,
+                        )
+                    )
+            if hybrid and len(groups) > 1:
+                hits.sort(key=lambda h: h.rrf_score or 0.0, reverse=True)
+        except Exception:
+            # 검색 실패는 "결과 없음"과 구분되게 로그 (답변은 context 없이 계속)
+            log.exception("practice retrieval failed (user_id=%s, knowledge_ids=%s)", me.user_id, kids)
+            hits = []
+        finally:
+            if db_search is not db_outer:
+                db_search.close()
+
+        scored_chunks: list[tuple[float, Any]] = [
+            (hit.score, hit) for hit in hits if hybrid or hit.score >= effective_threshold
+        ]
 
         if not scored_chunks:
-            out = {"context": "", "sources": []}
-            ret_cache[cache_key] = out
-            return out
+            return {"context": "", "sources": []}
 
-        scored_chunks.sort(key=lambda x: x[0], reverse=True)
+        if not hybrid:
+            scored_chunks.sort(key=lambda x: x[0], reverse=True)
         scored_chunks = scored_chunks[:candidate_top_k]
 
         chunk_score_map = {id(chunk): score for score, chunk in scored_chunks}
@@ -257,7 +310,19 @@ def make_retrieve_fn_for_practice(db_outer: Session, me: AppUser) -> Callable[..
         else:
             final_chunks = [chunk for _, chunk in scored_chunks[:max_chunks]]
 
+        if expand_to_parent:
+            # small-to-big: child 매칭 -> parent 본문 (parent 조회 쿼리 1번, 토큰 예산 내)
+            db_parent = db_outer if db_outer is not None else SessionLocal()
+            try:
+                final_chunks = expand_hits_to_parents(db_parent, final_chunks)
+            except Exception as e:
+                log.exception("parent expansion failed (fallback to child chunks): %s", e)
+            finally:
+                if db_parent is not db_outer:
+                    db_parent.close()
+
         texts: List[str] = []
+        chunks: List[Dict[str, Any]] = []
         sources: List[Dict[str, Any]] = []
         for c in final_chunks:
             chunk_text = (
@@ -266,42 +331,53 @@ def make_retrieve_fn_for_practice(db_outer: Session, me: AppUser) -> Callable[..
                 or getattr(c, "content", None)
             )
 
+            score = chunk_score_map.get(id(c), getattr(c, "score", None))
+            chunk_id = getattr(c, "chunk_id", None) or getattr(c, "id", None)
             if chunk_text:
                 texts.append(str(chunk_text))
+                # stage1 context packing 입력 (rerank 순서 = 순위, score는 표시용이라 안 넘김)
+                chunks.append(
+                    {
+                        "knowledge_id": getattr(c, "knowledge_id", None),
+                        "chunk_id": chunk_id,
+                        "chunk_index": getattr(c, "chunk_index", None),
+                        "chunk_text": str(chunk_text),
+                    }
+                )
 
-            score = chunk_score_map.get(id(c))
             sources.append(
                 {
                     "knowledge_id": getattr(c, "knowledge_id", None),
-                    "chunk_id": getattr(c, "chunk_id", None) or getattr(c, "id", None),
+                    "chunk_id": chunk_id,
                     "score": float(score) if score is not None else None,
                     "preview": (str(chunk_text)[:200] if chunk_text else ""),
                 }
             )
 
         if not texts:
-            out = {"context": "", "sources": []}
-            ret_cache[cache_key] = out
-            return out
+            return {"context": "", "sources": []}
 
-        context_body = "\n\n".join(texts)
-        context = (
+        context_prefix = (
             "다음은 사용자가 업로드한 참고 문서 중에서, "
             "질문과 가장 관련도가 높은 일부 발췌 내용입니다.\n\n"
-            f"{context_body}\n\n"
-            "위 내용을 참고해서 아래 질문에 답변해 주세요."
         )
+        context_suffix = "\n\n위 내용을 참고해서 아래 질문에 답변해 주세요."
+        context_body = "\n\n".join(texts)
 
         out = {
-            "context": context,
+            # context: packing 안 하는 호출자용 (chain stage1은 chunks를 모델 토큰 예산으로 packing)
+            "context": f"{context_prefix}{context_body}{context_suffix}",
+            "chunks": chunks,
+            "context_prefix": context_prefix,
+            "context_suffix": context_suffix,
             "sources": sources,
             "retrieval": {
                 "retrieved_count": len(sources),
                 "top_k": max_chunks,
                 "threshold": effective_threshold,
+                "search_mode": search_mode,
             },
         }
-        ret_cache[cache_key] = out
         return out
 
     return _retrieve
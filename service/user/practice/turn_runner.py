@@ -6,7 +6,7 @@ from dataclasses import dataclass
 import queue
 import threading
 import time
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
 from fastapi import HTTPException
 from sqlalchemy import select
@@ -370,6 +370,7 @@ def _prepare_model_payload(
     user: AppUser,
     requested_generation_params: Optional[Dict[str, Any]],
     requested_retrieval_params: Optional[Dict[str, Any]],
+    retrieve_fn: Optional[Callable[..., Any]] = None,
 ) -> Dict[str, Any]:
     provider, real_model, runtime_defaults = resolve_runtime_model(model.model_name)
     runtime_defaults = normalize_generation_params_dict(runtime_defaults or {})
@@ -467,7 +468,8 @@ def _prepare_model_payload(
     if provider:
         chain_in["provider"] = provider
 
-    retrieve_fn_task = make_retrieve_fn_for_practice(db_task, user)
+    # turn 공유 검색 함수가 있으면 그대로 (모델마다 임베딩/검색 반복 안 함)
+    retrieve_fn_task = retrieve_fn or make_retrieve_fn_for_practice(db_task, user)
 
     return {
         "provider": provider,
@@ -498,7 +500,13 @@ def iter_practice_model_stream_events(
     requested_retrieval_params: Optional[Dict[str, Any]] = None,
     requested_style_preset: Optional[str] = None,
     requested_style_params: Optional[Dict[str, Any]] = None,
+    retrieve_fn: Optional[Callable[..., Any]] = None,
 ) -> Iterable[Dict[str, Any]]:
+    """
+    모델 1개 스트리밍 이벤트 생성.
+    - retrieve_fn: turn 단위 공유 검색 함수 (make_retrieve_fn_for_practice(None, user)).
+      같은 turn의 모델들에 같은 함수를 넘기면 검색은 1번만 실행
+    """
     if session.user_id != user.user_id:
         raise HTTPException(status_code=403, detail="session not owned by user")
     if model.session_id != session.session_id:
@@ -525,6 +533,7 @@ def iter_practice_model_stream_events(
             user=user,
             requested_generation_params=requested_generation_params,
             requested_retrieval_params=requested_retrieval_params,
+            retrieve_fn=retrieve_fn,
         )
 
         chunk_queue: queue.Queue[tuple[str, Any]] = queue.Queue()
@@ -706,6 +715,9 @@ def run_practice_turn(
         requested_style_params=requested_style_params,
     )
 
+    # 검색은 turn 단위로 1번 (모델 스레드들이 공유, key = 질문 + 문서 + 검색 파라미터)
+    turn_retrieve_fn = make_retrieve_fn_for_practice(None, user)
+
     def run_model_turn(model: PracticeSessionModel) -> Dict[str, Any]:
         if model.session_id != session.session_id:
             raise HTTPException(status_code=400, detail="session_model does not belong to given session")
@@ -721,6 +733,7 @@ def run_practice_turn(
                 user=user,
                 requested_generation_params=requested_generation_params,
                 requested_retrieval_params=requested_retrieval_params,
+                retrieve_fn=turn_retrieve_fn,
             )
             chain_task = _make_practice_chain(
                 ctx=ctx,
@@ -2,11 +2,22 @@
 from __future__ import annotations
 
 import os
+import time
+import queue
+import hashlib
+import logging
 import threading
-from typing import Any, Callable, Sequence, TypeVar, List, Tuple
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Sequence, TypeVar, List, Tuple
+
+from core import config
 
 T = TypeVar("T")
 
+log = logging.getLogger(__name__)
+
 _MODEL_CACHE: dict[str, Any] = {}
 _LOCK = threading.Lock()
 
@@ -48,7 +59,42 @@ def _get_cross_encoder(model_name: str):
 
 def _cross_scores(model_name: str, pairs: list[tuple[str, str]]) -> list[float]:
     model = _get_cross_encoder(model_name)
-    scores = model.predict(pairs)  # list/np.array
+    scores = model.predict(pairs, batch_size=max(1, int(_RERANK_BATCH_SIZE)))  # list/np.array
+    return [float(scores[i]) for i in range(len(pairs))]
+
+
+# ----------------------------
+# Backend: ONNX Runtime (CPU)
+# ----------------------------
+def _get_onnx_cross_encoder(model_name: str):
+    """
+    CPU용: sentence-transformers CrossEncoder(backend="onnx")
+    - RERANK_ONNX_FILE에 int8 양자화 파일(예: onnx/model_qint8_avx512_vnni.onnx)을 주면 그걸 로드
+    - bge-reranker도 이 경로로 (seq classification 모델이라 CrossEncoder로 로드 가능)
+    """
+    try:
+        from sentence_transformers import CrossEncoder  # type: ignore
+    except Exception as e:
+        raise RuntimeError(
+            "ONNX reranker를 쓰려면 sentence-transformers[onnx]가 필요 pip install "
+        ) from e
+
+    file_name = getattr(config, "RERANK_ONNX_FILE", "") or None
+    key = f"onnx:{model_name}:{file_name or ''}"
+    with _LOCK:
+        m = _MODEL_CACHE.get(key)
+        if m is None:
+            kwargs: dict[str, Any] = {"backend": "onnx", "device": "cpu"}
+            if file_name:
+                kwargs["model_kwargs"] = {"file_name": file_name}
+            m = CrossEncoder(model_name, **kwargs)
+            _MODEL_CACHE[key] = m
+    return m
+
+
+def _onnx_scores(model_name: str, pairs: list[tuple[str, str]]) -> list[float]:
+    model = _get_onnx_cross_encoder(model_name)
+    scores = model.predict(pairs, batch_size=max(1, int(_RERANK_BATCH_SIZE)))
     return [float(scores[i]) for i in range(len(pairs))]
 
 
@@ -109,6 +155,245 @@ def _flag_scores(model_name: str, pairs: list[tuple[str, str]]) -> list[float]:
     return out
 
 
+def _use_onnx() -> bool:
+    return str(getattr(config, "RERANK_BACKEND", "torch")).lower() == "onnx"
+
+
+def score_pairs(model_name: str, pairs: list[tuple[str, str]]) -> list[float]:
+    """backend 선택 후 바로 점수 계산 (micro-batch 없이)"""
+    if _use_onnx():
+        return _onnx_scores(model_name, pairs)
+    if _is_bge_reranker(model_name):
+        return _flag_scores(model_name, pairs)
+    return _cross_scores(model_name, pairs)
+
+
+# ----------------------------
+# Micro-batching
+# ----------------------------
+@dataclass
+class _RerankRequest:
+    pairs: list[tuple[str, str]]
+    future: Future
+
+
+class RerankBatcher:
+    """
+    모델 1개당 스레드 1개. 동시 요청들의 (query, passage) pair를 모아서 한 번에 predict.
+    - 첫 요청 후 max_wait_ms 동안 더 모으고, max_batch_pairs를 채우면 바로 실행
+    - 같은 pair(같은 질문 + 같은 청크)는 배치 안에서 1번만 계산
+    - 점수는 요청별로 잘라서 Future로 돌려줌 (예외도 요청별로 전달)
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        *,
+        max_wait_ms: Optional[float] = None,
+        max_batch_pairs: Optional[int] = None,
+        score_fn: Optional[Callable[[list[tuple[str, str]]], list[float]]] = None,
+    ):
+        self.model_name = model_name
+        self.max_wait_s = float(
+            max_wait_ms if max_wait_ms is not None else getattr(config, "RERANK_MAX_WAIT_MS", 5.0)
+        ) / 1000.0
+        self.max_batch_pairs = max(1, int(max_batch_pairs or getattr(config, "RERANK_MAX_BATCH_PAIRS", 64)))
+        self.score_fn = score_fn or (lambda pairs: score_pairs(model_name, pairs))
+
+        self._queue: "queue.Queue[_RerankRequest]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"rerank-batcher:{model_name}", daemon=True)
+        self._thread.start()
+
+        self.requests = 0
+        self.batches = 0
+        self.pairs = 0
+
+    def submit(self, pairs: Sequence[tuple[str, str]]) -> Future:
+        fut: Future = Future()
+        if not pairs:
+            fut.set_result([])
+            return fut
+        self._queue.put(_RerankRequest(list(pairs), fut))
+        return fut
+
+    def score(self, pairs: Sequence[tuple[str, str]], *, timeout_s: Optional[float] = None) -> list[float]:
+        timeout = timeout_s if timeout_s is not None else getattr(config, "RERANK_TIMEOUT_S", 30.0)
+        return self.submit(pairs).result(timeout=timeout)
+
+    def _collect(self) -> list[_RerankRequest]:
+        reqs = [self._queue.get()]
+        n = len(reqs[0].pairs)
+        deadline = time.monotonic() + self.max_wait_s
+        while n < self.max_batch_pairs:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                req = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            reqs.append(req)
+            n += len(req.pairs)
+        return reqs
+
+    def _run(self) -> None:
+        while True:
+            reqs = [r for r in self._collect() if r.future.set_running_or_notify_cancel()]
+            if not reqs:
+                continue
+
+            index: Dict[tuple[str, str], int] = {}
+            for r in reqs:
+                for pair in r.pairs:
+                    index.setdefault(pair, len(index))
+
+            try:
+                scores = self.score_fn(list(index))
+            except BaseException as e:
+                for r in reqs:
+                    r.future.set_exception(e)
+                continue
+
+            self.requests += len(reqs)
+            self.batches += 1
+            self.pairs += len(index)
+            for r in reqs:
+                r.future.set_result([float(scores[index[pair]]) for pair in r.pairs])
+
+
+_BATCHERS: dict[str, RerankBatcher] = {}
+_BATCHERS_LOCK = threading.Lock()
+
+
+def get_rerank_batcher(model_name: str) -> RerankBatcher:
+    with _BATCHERS_LOCK:
+        b = _BATCHERS.get(model_name)
+        if b is None:
+            b = RerankBatcher(model_name)
+            _BATCHERS[model_name] = b
+        return b
+
+
+def preload_rerankers(model_names: Optional[Sequence[str]] = None) -> None:
+    """
+    서버 시작 시 모델 로드 + warm-up 1회 (첫 학생 요청의 cold start 제거)
+    - model_names 없으면 RERANK_PRELOAD_MODELS (콤마 구분)
+    - 실패해도 서버는 뜸 (해당 모델은 첫 요청 때 다시 로드 시도)
+    """
+    if model_names is None:
+        raw = str(getattr(config, "RERANK_PRELOAD_MODELS", "") or "")
+        model_names = [m.strip() for m in raw.split(",") if m.strip()]
+
+    for name in model_names:
+        t0 = time.perf_counter()
+        try:
+            get_rerank_batcher(name).score([("warm-up", "warm-up")])
+        except Exception as e:
+            log.warning("reranker preload failed (%s): %s", name, e)
+            continue
+        log.info("reranker preloaded: %s (%.1fs)", name, time.perf_counter() - t0)
+
+
+# ----------------------------
+# Score cache
+# ----------------------------
+ChunkKey = Tuple[int, int]  # (knowledge_id, chunk_id)
+_ScoreKey = Tuple[str, str, int, str]  # (model, 정규화 질문 hash, chunk_id, 내용 version)
+
+
+def _content_version(text: str) -> str:
+    return hashlib.blake2b((text or "").encode("utf-8"), digest_size=8).hexdigest()
+
+
+class RerankScoreCache:
+    """
+    (model, 정규화 질문, chunk_id, 내용 version) -> cross-encoder score (프로세스 전역 LRU)
+    - 내용 version = chunk_text hash -> 같은 chunk_id라도 텍스트가 바뀌면 miss
+    - 문서 재인제스트 시 invalidate_knowledge(knowledge_id)로 해당 문서 항목 제거
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = int(max_size if max_size is not None else getattr(config, "RERANK_SCORE_CACHE_SIZE", 50000))
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[_ScoreKey, Tuple[int, float]]" = OrderedDict()
+        self._by_knowledge: Dict[int, set] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get_many(self, keys: Sequence[Optional[_ScoreKey]]) -> List[Optional[float]]:
+        out: List[Optional[float]] = []
+        with self._lock:
+            for key in keys:
+                item = self._data.get(key) if key is not None else None
+                if item is None:
+                    out.append(None)
+                    if key is not None:
+                        self.misses += 1
+                    continue
+                self._data.move_to_end(key)
+                self.hits += 1
+                out.append(item[1])
+        return out
+
+    def put_many(self, items: Sequence[Tuple[_ScoreKey, int, float]]) -> None:
+        """(key, knowledge_id, score)"""
+        with self._lock:
+            for key, kid, score in items:
+                self._data[key] = (kid, float(score))
+                self._data.move_to_end(key)
+                self._by_knowledge.setdefault(kid, set()).add(key)
+            while len(self._data) > self.max_size:
+                key, (kid, _) = self._data.popitem(last=False)
+                self._forget(kid, key)
+
+    def _forget(self, kid: int, key: _ScoreKey) -> None:
+        keys = self._by_knowledge.get(kid)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_knowledge[kid]
+
+    def invalidate_knowledge(self, knowledge_id: int) -> int:
+        with self._lock:
+            keys = self._by_knowledge.pop(int(knowledge_id), set())
+            for key in keys:
+                self._data.pop(key, None)
+            return len(keys)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+_score_cache = RerankScoreCache()
+
+
+def get_rerank_score_cache() -> RerankScoreCache:
+    return _score_cache
+
+
+def invalidate_rerank_scores(knowledge_id: int) -> int:
+    """문서 청크를 다시 쓸 때 호출 (document_ingest). 반환: 제거된 항목 수"""
+    return _score_cache.invalidate_knowledge(knowledge_id)
+
+
+def _score(model_name: str, pairs: list[tuple[str, str]]) -> list[float]:
+    if getattr(config, "RERANK_MICRO_BATCH", True):
+        return get_rerank_batcher(model_name).score(pairs)
+    return score_pairs(model_name, pairs)
+
+
 # ----------------------------
 # Public API
 # ----------------------------
@@ -118,13 +403,17 @@ def rerank_pairs(
     *,
     model_name: str,
     top_n: int,
+    chunk_keys: Optional[Sequence[Optional[ChunkKey]]] = None,
 ) -> List[Tuple[int, float]]:
     """
     반환: [(원본 index, score)] score 내림차순 top_n
 
     model_name 규칙(자동 선택):
+    - RERANK_BACKEND=onnx -> ONNX Runtime CrossEncoder (CPU)
     - "BAAI/bge-reranker-v2-m3" 또는 "bge-reranker" 포함 -> BGE(FlagEmbedding)
     - 그 외 -> CrossEncoder(sentence-transformers)
+    RERANK_MICRO_BATCH면 모델별 RerankBatcher에 넣고 점수를 기다림
+    chunk_keys(passages와 같은 순서, (knowledge_id, chunk_id) 또는 None)가 있으면 score cache 사용
     """
     if not passages:
         return []
@@ -136,10 +425,27 @@ def rerank_pairs(
     top_n = max(1, min(int(top_n), len(passages)))
     pairs = [(query, (p or "")) for p in passages]
 
-    if _is_bge_reranker(model_name):
-        scores = _flag_scores(model_name, pairs)
-    else:
-        scores = _cross_scores(model_name, pairs)
+    cache = _score_cache
+    keys: List[Optional[_ScoreKey]] = [None] * len(pairs)
+    if chunk_keys is not None and cache.enabled:
+        from langchain_service.embedding.query_cache import embedding_text_hash  # lazy import
+
+        qhash = embedding_text_hash(query)
+        for i, ck in enumerate(chunk_keys):
+            if ck is not None and ck[1] is not None:
+                keys[i] = (model_name, qhash, int(ck[1]), _content_version(pairs[i][1]))
+
+    scores = cache.get_many(keys)  # key가 None인 항목은 항상 miss
+    miss = [i for i, sc in enumerate(scores) if sc is None]
+    if miss:
+        fresh = _score(model_name, [pairs[i] for i in miss])
+        to_cache: List[Tuple[_ScoreKey, int, float]] = []
+        for i, sc in zip(miss, fresh):
+            scores[i] = float(sc)
+            if keys[i] is not None:
+                to_cache.append((keys[i], int(chunk_keys[i][0] or 0), float(sc)))
+        if to_cache:
+            cache.put_many(to_cache)
 
     scored = [(i, float(scores[i])) for i in range(len(passages))]
     scored.sort(key=lambda x: x[1], reverse=True)
@@ -153,15 +459,24 @@ def rerank_items(
     get_text: Callable[[T], str],
     model_name: str,
     top_n: int,
+    get_chunk_key: Optional[Callable[[T], Optional[ChunkKey]]] = None,
 ) -> List[T]:
     if not items:
         return []
 
     texts = [(get_text(it) or "") for it in items]
-    ranked = rerank_pairs(query, texts, model_name=model_name, top_n=top_n)
+    chunk_keys = [get_chunk_key(it) for it in items] if get_chunk_key is not None else None
+    ranked = rerank_pairs(query, texts, model_name=model_name, top_n=top_n, chunk_keys=chunk_keys)
     return [items[i] for i, _ in ranked]
 
 
+def _chunk_key(c: Any) -> Optional[ChunkKey]:
+    chunk_id = getattr(c, "chunk_id", None) or getattr(c, "id", None)
+    if chunk_id is None:
+        return None
+    return (int(getattr(c, "knowledge_id", None) or 0), int(chunk_id))
+
+
 def rerank_chunks(
     query: str,
     chunks: Sequence[Any],
@@ -170,7 +485,7 @@ def rerank_chunks(
     top_n: int,
 ) -> List[Any]:
     """
-    DocumentChunk 리스트 rerank.
+    DocumentChunk 리스트 rerank. (knowledge_id, chunk_id)가 있으면 score cache 사용
     """
     return rerank_items(
         query,
@@ -183,4 +498,5 @@ def rerank_chunks(
         ),
         model_name=model_name,
         top_n=top_n,
+        get_chunk_key=_chunk_key,
     )
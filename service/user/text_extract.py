@@ -0,0 +1,475 @@
+# service/user/text_extract.py
+from __future__ import annotations
+
+import os
+import gzip
+import json
+import time
+import atexit
+import hashlib
+import logging
+import threading
+import multiprocessing
+import multiprocessing.connection
+from uuid import uuid4
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+
+from core import config
+
+log = logging.getLogger(__name__)
+
+_TEXT_EXTS = (".md", ".txt", ".csv")
+
+
+class ExtractionError(RuntimeError):
+    """추출 프로세스 실패 (timeout / 메모리 초과 / 비정상 종료)"""
+
+
+# =========================================================
+# 자식 프로세스에서 실행되는 함수 (pickle 가능해야 함 -> 모듈 최상위)
+# =========================================================
+def _init_worker(memory_mb: int) -> None:
+    # 주소 공간 상한 (Linux). 초과하면 자식 안에서 MemoryError
+    if memory_mb <= 0:
+        return
+    try:
+        import resource
+
+        limit = int(memory_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def _pdf_page_count(file_path: str) -> int:
+    import fitz  # PyMuPDF
+
+    with fitz.open(file_path) as pdf:
+        return int(pdf.page_count)
+
+
+def _pdf_pages(file_path: str, start: int, end: int) -> List[str]:
+    """PDF 페이지 [start, end) 텍스트 (PyMuPDFLoader와 동일하게 page.get_text())"""
+    import fitz  # PyMuPDF
+
+    with fitz.open(file_path) as pdf:
+        end = min(end, pdf.page_count)
+        return [pdf[i].get_text() or "" for i in range(start, end)]
+
+
+def _docx_text(file_path: str) -> str:
+    import docx2txt
+
+    return (docx2txt.process(file_path) or "").strip()
+
+
+def _worker_main(conn, memory_mb: int) -> None:
+    """추출 자식 프로세스 루프: (fn, args) 받아서 (ok, 결과 | 예외) 돌려줌, None이면 종료"""
+    _init_worker(memory_mb)
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            return
+        if msg is None:
+            return
+        fn, args = msg
+        try:
+            out = (True, fn(*args))
+        except BaseException as e:  # MemoryError 포함 -> 부모가 판단
+            out = (False, e)
+        try:
+            conn.send(out)
+        except Exception as e:  # 예외 객체가 pickle 안 되는 경우 등
+            conn.send((False, RuntimeError(repr(e))))
+
+
+# =========================================================
+# Pool
+# =========================================================
+@dataclass
+class _Worker:
+    proc: multiprocessing.process.BaseProcess
+    conn: multiprocessing.connection.Connection
+    tasks: int = 0
+
+    def kill(self) -> None:
+        try:
+            self.proc.kill()
+        except Exception:
+            pass
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+        self.proc.join(timeout=1.0)
+
+
+@dataclass
+class _Call:
+    worker: _Worker
+    started: float
+    file_path: str
+
+
+class TextExtractPool:
+    """
+    PDF/DOCX 파싱을 별도 프로세스에서 실행 (API/워커 프로세스의 GIL을 잡지 않음).
+    - 작업(페이지 batch / DOCX 1개)마다 자식 프로세스 1개를 전담으로 잡음
+    - timeout은 작업이 실제로 시작된 시점부터 (빈 프로세스 대기 / 호출자가 페이지 처리하는 시간 제외)
+      넘기면 그 작업을 돌리던 자식 프로세스만 kill (다른 파일의 추출은 영향 없음)
+    - 자식 프로세스 메모리 상한 (RLIMIT_AS)
+    - max_tasks_per_child 마다 자식 프로세스 교체 (파서 메모리 누수 방지)
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: Optional[int] = None,
+        timeout_s: Optional[float] = None,
+        memory_mb: Optional[int] = None,
+        page_batch: Optional[int] = None,
+        max_tasks_per_child: Optional[int] = None,
+    ):
+        self.workers = max(1, int(workers or getattr(config, "DOCUMENT_EXTRACT_WORKERS", 2)))
+        self.timeout_s = float(timeout_s or getattr(config, "DOCUMENT_EXTRACT_TIMEOUT_S", 300.0))
+        self.memory_mb = int(memory_mb if memory_mb is not None else getattr(config, "DOCUMENT_EXTRACT_MEMORY_MB", 1024))
+        self.page_batch = max(1, int(page_batch or getattr(config, "DOCUMENT_EXTRACT_PAGE_BATCH", 16)))
+        self.max_tasks_per_child = int(
+            max_tasks_per_child or getattr(config, "DOCUMENT_EXTRACT_MAX_TASKS_PER_CHILD", 50)
+        )
+
+        # forkserver: API 프로세스(__main__)를 다시 import 하지 않고 작은 서버에서 fork
+        methods = multiprocessing.get_all_start_methods()
+        self._ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._idle: List[_Worker] = []
+        self._busy: set = set()
+
+    # -----------------------------------------------------
+    # 자식 프로세스 관리
+    # -----------------------------------------------------
+    def _spawn(self) -> _Worker:
+        parent, child = self._ctx.Pipe()
+        proc = self._ctx.Process(target=_worker_main, args=(child, self.memory_mb), daemon=True)
+        proc.start()
+        child.close()
+        return _Worker(proc=proc, conn=parent)
+
+    def _acquire(self, *, blocking: bool = True) -> Optional[_Worker]:
+        if not self._slots.acquire(blocking=blocking):
+            return None
+        try:
+            with self._lock:
+                worker = self._idle.pop() if self._idle else None
+            if worker is None or not worker.proc.is_alive():
+                if worker is not None:
+                    worker.kill()
+                worker = self._spawn()
+            with self._lock:
+                self._busy.add(id(worker))
+            return worker
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, worker: _Worker, *, healthy: bool) -> None:
+        with self._lock:
+            self._busy.discard(id(worker))
+            reuse = healthy and (self.max_tasks_per_child <= 0 or worker.tasks < self.max_tasks_per_child)
+            if reuse:
+                self._idle.append(worker)
+        if not reuse:
+            worker.kill()
+        self._slots.release()
+
+    # -----------------------------------------------------
+    # 작업 실행
+    # -----------------------------------------------------
+    def _start(self, fn, args: tuple, file_path: str, *, blocking: bool = True) -> Optional[_Call]:
+        """빈 자식 프로세스에 작업 전송 (blocking=False면 빈 프로세스 없을 때 None)"""
+        worker = self._acquire(blocking=blocking)
+        if worker is None:
+            return None
+        try:
+            worker.conn.send((fn, args))
+        except Exception:
+            self._release(worker, healthy=False)
+            raise ExtractionError(
+                f"텍스트 추출 프로세스가 비정상 종료되었습니다: {os.path.basename(file_path)}"
+            ) from None
+        worker.tasks += 1
+        return _Call(worker=worker, started=time.monotonic(), file_path=file_path)
+
+    def _finish(self, call: _Call):
+        worker, name = call.worker, os.path.basename(call.file_path)
+        remaining = max(0.0, call.started + self.timeout_s - time.monotonic())
+        try:
+            ready = worker.conn.poll(remaining)
+            if not ready:
+                self._release(worker, healthy=False)  # 이 작업의 자식 프로세스만 kill
+                raise ExtractionError(f"텍스트 추출 시간 초과 ({self.timeout_s:.0f}s): {name}")
+            ok, value = worker.conn.recv()
+        except ExtractionError:
+            raise
+        except (EOFError, OSError):
+            self._release(worker, healthy=False)
+            raise ExtractionError(f"텍스트 추출 프로세스가 비정상 종료되었습니다: {name}") from None
+
+        if ok:
+            self._release(worker, healthy=True)
+            return value
+        if isinstance(value, MemoryError):
+            self._release(worker, healthy=False)
+            raise ExtractionError(f"텍스트 추출 메모리 초과 ({self.memory_mb}MB): {name}") from None
+        self._release(worker, healthy=True)  # 파서 예외: 프로세스는 정상
+        raise value
+
+    def _cancel(self, call: _Call) -> None:
+        """결과를 안 받을 작업 (generator 중단): 실행 중일 수 있어서 프로세스 교체"""
+        self._release(call.worker, healthy=False)
+
+    def _run(self, fn, args: tuple, file_path: str):
+        return self._finish(self._start(fn, args, file_path))
+
+    def page_count(self, file_path: str) -> int:
+        return self._run(_pdf_page_count, (file_path,), file_path)
+
+    def iter_pages(self, file_path: str) -> Iterator[str]:
+        """
+        페이지 단위 텍스트 generator
+        - PDF: page_batch 페이지씩 나눠 실행, 빈 자식 프로세스가 있으면 다음 batch 1개를 미리 실행 (순서 유지)
+          (미리 실행은 빈 프로세스를 기다리지 않음 -> 여러 파일이 서로 프로세스를 잡고 멈추는 일 없음)
+        - DOCX: 파일 전체 1페이지
+        - timeout은 작업(batch)마다, 작업 시작 시점부터
+        """
+        ext = os.path.splitext(file_path)[1].lower()
+
+        if ext == ".docx":
+            yield self._run(_docx_text, (file_path,), file_path)
+            return
+
+        total = self.page_count(file_path)
+        pending: Deque[_Call] = deque()
+        next_start = 0
+
+        def _submit(blocking: bool) -> bool:
+            nonlocal next_start
+            end = min(next_start + self.page_batch, total)
+            call = self._start(_pdf_pages, (file_path, next_start, end), file_path, blocking=blocking)
+            if call is None:
+                return False
+            pending.append(call)
+            next_start = end
+            return True
+
+        try:
+            while next_start < total or pending:
+                if not pending:
+                    _submit(blocking=True)
+                if next_start < total and len(pending) < 2:
+                    _submit(blocking=False)
+                pages = self._finish(pending.popleft())
+                for page in pages:
+                    yield page
+        finally:
+            while pending:
+                self._cancel(pending.popleft())
+
+    def shutdown(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            try:
+                worker.conn.send(None)
+            except Exception:
+                pass
+            worker.kill()
+
+
+_pool: Optional[TextExtractPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_extract_pool() -> TextExtractPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = TextExtractPool()
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+# =========================================================
+# entry
+# =========================================================
+def iter_file_pages(file_path: str) -> Iterator[str]:
+    """
+    파일 -> 페이지 텍스트 generator
+    - txt/md/csv: 현재 프로세스에서 바로 읽음 (파싱 없음)
+    - pdf/docx: TextExtractPool (DOCUMENT_EXTRACT_WORKERS=0 이면 현재 프로세스에서 실행)
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+
+    if ext in _TEXT_EXTS:
+        with open(file_path, "r", encoding="utf-8") as f:
+            yield f.read().strip()
+        return
+
+    if ext == ".doc":
+        raise ValueError(
+            ".doc (legacy Word) 형식은 지원하지 않습니다. .docx로 변환 후 업로드해주세요."
+        )
+
+    if int(getattr(config, "DOCUMENT_EXTRACT_WORKERS", 2)) <= 0:
+        if ext == ".docx":
+            yield _docx_text(file_path)
+            return
+        import fitz  # PyMuPDF
+
+        with fitz.open(file_path) as pdf:
+            for page in pdf:
+                yield page.get_text() or ""
+        return
+
+    yield from get_extract_pool().iter_pages(file_path)
+
+
+def count_file_pages(file_path: str) -> Optional[int]:
+    """progress 계산용 페이지 수 (PDF는 본문 로드 없이 메타만, 실패하면 None)"""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in _TEXT_EXTS or ext == ".docx":
+        return 1
+    try:
+        if int(getattr(config, "DOCUMENT_EXTRACT_WORKERS", 2)) <= 0:
+            return _pdf_page_count(file_path)
+        return get_extract_pool().page_count(file_path)
+    except Exception:
+        return None
+
+
+# =========================================================
+# 추출 텍스트 아티팩트 (파일 sha256 키, gzip)
+# - 프리뷰 / 재인덱스 / parent-child 재분할이 원본을 다시 파싱하지 않게
+# =========================================================
+_ARTIFACT_VERSION = 1  # 추출 방식이 바뀌면 올림 (이전 아티팩트 무시)
+
+
+def file_sha256(file_path: str) -> str:
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+@dataclass
+class ExtractedText:
+    """
+    페이지 텍스트를 "\n"으로 이은 원문 + 페이지별 offset
+    - raw_starts: [(raw offset, page_no)], 빈 페이지는 빠짐 (num_pages에는 포함)
+    - text / page_starts: 앞뒤 공백 제거본 기준 (extract_pages 반환값과 동일)
+    """
+
+    raw: str = ""
+    num_pages: int = 0
+    raw_starts: List[Tuple[int, int]] = field(default_factory=list)
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[str]) -> "ExtractedText":
+        builder = ExtractedTextBuilder()
+        for page in pages:
+            builder.add_page(page)
+        return builder.build()
+
+    @property
+    def text(self) -> str:
+        return self.raw.strip()
+
+    @property
+    def page_starts(self) -> List[Tuple[int, int]]:
+        lead = len(self.raw) - len(self.raw.lstrip())
+        return [(max(o - lead, 0), p) for o, p in self.raw_starts]
+
+    def iter_pages(self) -> Iterator[str]:
+        """원래 페이지 텍스트 복원 (빈 페이지 포함, num_pages개)"""
+        bounds = {p: o for o, p in self.raw_starts}
+        ends = {p: o - 1 for (o, _), (_, p) in zip(self.raw_starts[1:], self.raw_starts)}
+        for page_no in range(1, self.num_pages + 1):
+            if page_no not in bounds:
+                yield ""
+                continue
+            yield self.raw[bounds[page_no] : ends.get(page_no, len(self.raw))]
+
+
+class ExtractedTextBuilder:
+    """페이지를 하나씩 받아 ExtractedText 생성 (스트리밍 인제스트용)"""
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._pos = 0
+        self._starts: List[Tuple[int, int]] = []
+        self._num_pages = 0
+
+    def add_page(self, page: str) -> None:
+        self._num_pages += 1
+        if not page:
+            return
+        if self._parts:
+            self._pos += 1  # "\n"
+        self._starts.append((self._pos, self._num_pages))
+        self._parts.append(page)
+        self._pos += len(page)
+
+    def build(self) -> ExtractedText:
+        return ExtractedText(raw="\n".join(self._parts), num_pages=self._num_pages, raw_starts=list(self._starts))
+
+
+class ExtractedTextStore:
+    """<DOCUMENT_TEXT_ARTIFACT_DIR>/<sha[:2]>/<sha>.v<ver>.json.gz (같은 파일이면 문서가 달라도 공유)"""
+
+    def __init__(self, base_dir: Optional[str] = None):
+        self.base_dir = base_dir or getattr(config, "DOCUMENT_TEXT_ARTIFACT_DIR", "./extracted_text")
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.base_dir, sha256[:2], f"{sha256}.v{_ARTIFACT_VERSION}.json.gz")
+
+    def get(self, sha256: Optional[str]) -> Optional[ExtractedText]:
+        if not sha256:
+            return None
+        try:
+            with gzip.open(self._path(sha256), "rt", encoding="utf-8") as f:
+                d = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, EOFError):
+            log.warning("broken extracted-text artifact: %s", sha256)
+            return None
+        return ExtractedText(
+            raw=d.get("raw") or "",
+            num_pages=int(d.get("num_pages") or 0),
+            raw_starts=[(int(o), int(p)) for o, p in (d.get("raw_starts") or [])],
+        )
+
+    def put(self, sha256: str, extracted: ExtractedText) -> None:
+        path = self._path(sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid4().hex[:8]}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(
+                {
+                    "num_pages": extracted.num_pages,
+                    "raw_starts": [list(x) for x in extracted.raw_starts],
+                    "raw": extracted.raw,
+                },
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp, path)
+
+
+extracted_text_store = ExtractedTextStore()
@@ -2,16 +2,24 @@
 from __future__ import annotations
 
 import os
+import gzip
+import json
 import shutil
+import hashlib
 import logging
 from uuid import uuid4
-from typing import Optional, Tuple, Any, Dict
+from typing import Optional, Tuple, Any, Dict, Callable, List, Iterator
 from datetime import datetime, timezone
+from decimal import Decimal
+
+import numpy as np
 
 from fastapi import UploadFile
+from sqlalchemy import text as sa_text
 from sqlalchemy.orm import Session
 
 from core import config
+from database.session import SessionLocal
 from core.pricing import (
     tokens_for_texts,
     normalize_usage_embedding,
@@ -28,18 +36,55 @@ from schemas.user.document import (
 from crud.user import document as doc_crud
 import crud.supervisor.api_usage as cost
 
-from langchain_community.document_loaders import PyMuPDFLoader
+from service.user.text_extract import (
+    ExtractedText,
+    ExtractedTextBuilder,
+    count_file_pages,
+    extracted_text_store,
+    file_sha256,
+    iter_file_pages,
+)
 
-from service.user.document_ingest import ingest_document_text
+from service.user.document_ingest import (
+    ChunkPlan,
+    ChunkPlanner,
+    EmbedResult,
+    IngestResult,
+    StreamingChunkWriter,
+    load_chunk_settings,
+    plan_document_chunks,
+    embed_chunk_plan,
+    store_chunk_plan,
+    reset_document_chunks,
+)
 
 log = logging.getLogger("api_cost")
 
 # =========================================================
 # Constants (정합성 고정)
 # =========================================================
-_EMBEDDING_DIM_FIXED = 1536
+_EMBEDDING_DIM_FIXED = 1536  # 기본 차원 (축소 허용값은 config.EMBEDDING_DIMS_ALLOWED)
 _SCORE_TYPE_FIXED = "cosine_similarity"
 
+# 인제스트 단계 (순서 고정). job.stage = 마지막으로 완료된 단계
+INGEST_STAGES: Tuple[str, ...] = ("extract", "pages", "chunk", "embed", "store")
+
+# 단계 완료 시 progress
+_STAGE_PROGRESS: Dict[str, int] = {
+    "extract": 20,
+    "pages": 25,
+    "chunk": 40,
+    "embed": 85,
+    "store": 95,
+}
+
+
+class IngestSuperseded(RuntimeError):
+    """
+    on_stage / heartbeat 콜백이 던짐: 이 실행의 작업 lease를 잃음 (reindex로 재enqueue / lease 만료로 재큐잉).
+    현재 트랜잭션은 rollback하고 문서 상태는 건드리지 않음 (새 실행이 처리).
+    """
+
 
 # =========================================================
 # Helpers
@@ -77,17 +122,37 @@ def _validate_ingestion_payload(p: Dict[str, Any]) -> None:
     if int(p["max_chunks"]) < 1:
         raise ValueError("max_chunks must be >= 1")
 
-    if int(p.get("embedding_dim", _EMBEDDING_DIM_FIXED)) != _EMBEDDING_DIM_FIXED:
-        raise ValueError("embedding_dim must be 1536")
+    provider = p.get("embedding_provider") or "openai"
+    if provider not in ("openai", "local"):
+        raise ValueError("embedding_provider must be 'openai' or 'local'")
+
+    # 차원별 벡터 컬럼이 있는 값만
+    dim = int(p.get("embedding_dim") or _EMBEDDING_DIM_FIXED)
+    allowed = tuple(getattr(config, "EMBEDDING_DIMS_ALLOWED", (_EMBEDDING_DIM_FIXED,)))
+    if dim not in allowed:
+        raise ValueError(f"embedding_dim must be one of {allowed}")
+
+    if provider == "local":
+        # 로컬 모델은 서버에 배포된 것만 (임의 모델 다운로드 방지) + 출력 차원 == embedding_dim
+        local_model = getattr(config, "LOCAL_EMBEDDING_MODEL", "intfloat/multilingual-e5-base")
+        if p.get("embedding_model") != local_model:
+            raise ValueError("embedding_model must match LOCAL_EMBEDDING_MODEL for embedding_provider 'local'")
+        native = getattr(config, "EMBEDDING_MODEL_DIMS", {}).get(local_model)
+        if native is not None and int(native) != dim:
+            raise ValueError(f"embedding_dim must be {native} for {local_model}")
+        return
 
-    if p.get("embedding_provider") not in (None, "openai"):
-        raise ValueError("embedding_provider must be 'openai'")
     if p.get("embedding_model") not in (
         None,
         getattr(config, "DEFAULT_EMBEDDING_MODEL", "text-embedding-3-small"),
     ):
         raise ValueError("embedding_model must match DEFAULT_EMBEDDING_MODEL")
 
+    # 차원 축소(Matryoshka)는 dimensions 파라미터 지원 모델만
+    model = p.get("embedding_model") or getattr(config, "DEFAULT_EMBEDDING_MODEL", "text-embedding-3-small")
+    if dim != _EMBEDDING_DIM_FIXED and model not in getattr(config, "EMBEDDING_DIMENSIONS_MODELS", ()):
+        raise ValueError(f"embedding_dim {dim} requires a model with dimensions support")
+
 
 def _validate_search_payload(p: Dict[str, Any]) -> None:
     if int(p["top_k"]) < 1:
@@ -104,6 +169,123 @@ def _validate_search_payload(p: Dict[str, Any]) -> None:
         raise ValueError("reranker_top_n must be >= 1")
     if int(p["reranker_top_n"]) > int(p["top_k"]):
         raise ValueError("reranker_top_n must be <= top_k")
+    if p.get("search_mode", "vector") not in ("vector", "hybrid"):
+        raise ValueError("search_mode must be 'vector' or 'hybrid'")
+
+
+# =========================================================
+# Ingest checkpoint (단계별 산출물, 재시작용)
+# - DOCUMENT_INGEST_WORK_DIR/<knowledge_id>/ 아래에 저장
+# - extract: text.txt.gz + meta.json(num_pages, page_starts)
+# - chunk  : plan.json.gz
+# - embed  : vectors.npy + meta.json(embedding_tokens, cache_hits, cache_misses)
+# =========================================================
+class IngestCheckpoint:
+    def __init__(self, knowledge_id: int):
+        base = getattr(config, "DOCUMENT_INGEST_WORK_DIR", "./ingest_work")
+        self.dir = os.path.join(base, str(int(knowledge_id)))
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.dir, name)
+
+    def _write_atomic(self, name: str, writer: Callable[[str], None]) -> None:
+        os.makedirs(self.dir, exist_ok=True)
+        tmp = self._path(f".{name}.{uuid4().hex[:8]}.tmp")
+        writer(tmp)
+        os.replace(tmp, self._path(name))
+
+    # meta
+    def read_meta(self) -> Dict[str, Any]:
+        try:
+            with open(self._path("meta.json"), "r", encoding="utf-8") as f:
+                return json.load(f) or {}
+        except (OSError, ValueError):
+            return {}
+
+    def update_meta(self, **values: Any) -> None:
+        meta = {**self.read_meta(), **values}
+
+        def _w(tmp: str) -> None:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+        self._write_atomic("meta.json", _w)
+
+    # extract
+    def has_text(self) -> bool:
+        return os.path.exists(self._path("text.txt.gz")) and "num_pages" in self.read_meta()
+
+    def save_text(self, text: str, num_pages: int, page_starts: List[Tuple[int, int]]) -> None:
+        def _w(tmp: str) -> None:
+            with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                f.write(text or "")
+
+        self._write_atomic("text.txt.gz", _w)
+        self.update_meta(num_pages=int(num_pages), page_starts=[list(x) for x in page_starts])
+
+    def load_page_starts(self) -> List[Tuple[int, int]]:
+        return [(int(o), int(p)) for o, p in (self.read_meta().get("page_starts") or [])]
+
+    def load_text(self) -> Tuple[str, int]:
+        with gzip.open(self._path("text.txt.gz"), "rt", encoding="utf-8") as f:
+            text = f.read()
+        return text, int(self.read_meta().get("num_pages") or 0)
+
+    # chunk
+    def has_plan(self) -> bool:
+        return os.path.exists(self._path("plan.json.gz"))
+
+    def save_plan(self, plan: ChunkPlan) -> None:
+        def _w(tmp: str) -> None:
+            with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                json.dump(plan.to_dict(), f, ensure_ascii=False)
+
+        self._write_atomic("plan.json.gz", _w)
+
+    def load_plan(self) -> ChunkPlan:
+        with gzip.open(self._path("plan.json.gz"), "rt", encoding="utf-8") as f:
+            return ChunkPlan.from_dict(json.load(f))
+
+    # embed
+    def has_vectors(self) -> bool:
+        return os.path.exists(self._path("vectors.npy")) and "embedding_tokens" in self.read_meta()
+
+    def save_embed(self, emb: EmbedResult) -> None:
+        arr = np.asarray(emb.vectors, dtype=np.float32).reshape(len(emb.vectors), -1)
+
+        def _w(tmp: str) -> None:
+            with open(tmp, "wb") as f:
+                np.save(f, arr)
+
+        self._write_atomic("vectors.npy", _w)
+        self.update_meta(
+            embedding_tokens=int(emb.embedding_tokens),
+            cache_hits=int(emb.cache_hits),
+            cache_misses=int(emb.cache_misses),
+        )
+
+    def load_embed(self) -> EmbedResult:
+        arr = np.load(self._path("vectors.npy"))
+        meta = self.read_meta()
+        return EmbedResult(
+            vectors=arr.tolist(),
+            embedding_tokens=int(meta.get("embedding_tokens") or 0),
+            cache_hits=int(meta.get("cache_hits") or 0),
+            cache_misses=int(meta.get("cache_misses") or 0),
+        )
+
+    def has_stage_inputs(self, stage: str) -> bool:
+        """해당 단계를 실행하는 데 필요한 이전 단계 산출물이 있는지"""
+        if stage == "pages" or stage == "chunk":
+            return self.has_text()
+        if stage == "embed":
+            return self.has_plan()
+        if stage == "store":
+            return self.has_plan() and self.has_vectors()
+        return True
+
+    def clear(self) -> None:
+        shutil.rmtree(self.dir, ignore_errors=True)
 
 
 # =========================================================
@@ -119,10 +301,12 @@ class UploadPipeline:
       * 상태 업데이트 / 비용 집계
       * chunking/embedding/store_chunks 는 ingest service로 위임
 
-    - document_ingest.ingest_document_text
+    - document_ingest (plan_document_chunks / embed_chunk_plan / store_chunk_plan)
       * general / parent_child chunking
       * child embedding
       * chunk 저장 + chunk_count 갱신
+
+    - process_document는 document_jobs 워커에서 실행 (단계별 체크포인트 -> 재시작 가능)
     """
 
     def __init__(self, db: Session, user_id: int):
@@ -134,7 +318,8 @@ class UploadPipeline:
     # -----------------------------------------------------
     # File / Text
     # -----------------------------------------------------
-    def _save_file(self, file: UploadFile) -> tuple[str, str]:
+    def _save_file(self, file: UploadFile) -> tuple[str, str, str]:
+        """저장 경로, 파일명, sha256 (복사하면서 같이 계산)"""
         user_dir = os.path.join(self.base_dir, self.folder_rel)
         os.makedirs(user_dir, exist_ok=True)
 
@@ -142,39 +327,59 @@ class UploadPipeline:
         fname = f"{self.user_id}_{uuid4().hex[:8]}_{origin}"
         fpath = os.path.join(user_dir, fname)
 
+        h = hashlib.sha256()
         file.file.seek(0)
         with open(fpath, "wb") as f:
-            shutil.copyfileobj(file.file, f, length=1024 * 1024)
-
-        return fpath, fname
+            for block in iter(lambda: file.file.read(1024 * 1024), b""):
+                h.update(block)
+                f.write(block)
+
+        return fpath, fname, h.hexdigest()
+
+    def iter_pages(self, file_path: str) -> Iterator[str]:
+        """
+        페이지 단위 텍스트 generator
+        - PDF/DOCX 파싱은 추출 프로세스 풀에서 (timeout / 메모리 상한, GIL 분리)
+        - PDF는 페이지 batch 단위로 받아 순서대로 yield, 그 외는 파일 전체가 1페이지
+        """
+        return iter_file_pages(file_path)
+
+    def count_pages(self, file_path: str) -> Optional[int]:
+        """progress 계산용 페이지 수 (PDF는 본문 로드 없이 메타만)"""
+        return count_file_pages(file_path)
+
+    def extract_pages(self, file_path: str) -> Tuple[str, int, List[Tuple[int, int]]]:
+        """
+        전체 텍스트 + 페이지 수 + page_starts [(텍스트 offset, page_no)]
+        (빈 페이지는 텍스트에서 빠지고 페이지 수에는 포함)
+        """
+        ext = ExtractedText.from_pages(self.iter_pages(file_path))
+        return ext.text, ext.num_pages, ext.page_starts
 
     def extract_text(self, file_path: str) -> Tuple[str, int]:
-        ext = os.path.splitext(file_path)[1].lower()
-
-        if ext in (".md", ".txt"):
-            with open(file_path, "r", encoding="utf-8") as f:
-                text = f.read().strip()
-            return text, 1
-
-        if ext == ".csv":
-            with open(file_path, "r", encoding="utf-8") as f:
-                text = f.read().strip()
-            return text, 1
-
-        if ext == ".docx":
-            import docx2txt
-            text = docx2txt.process(file_path).strip()
-            return text, 1
-
-        if ext == ".doc":
-            raise ValueError(
-                ".doc (legacy Word) 형식은 지원하지 않습니다. .docx로 변환 후 업로드해주세요."
-            )
-
-        # PDF (default)
-        docs = PyMuPDFLoader(file_path).load()
-        text = "\n".join(d.page_content for d in docs if getattr(d, "page_content", "")).strip()
-        return text, len(docs)
+        text, num_pages, _ = self.extract_pages(file_path)
+        return text, num_pages
+
+    def file_hash(self, doc: Document, file_path: str) -> str:
+        """문서 파일 sha256 (예전 문서는 여기서 계산해서 채움, commit은 호출자)"""
+        if not doc.file_sha256:
+            doc.file_sha256 = file_sha256(file_path)
+            self.db.flush()
+        return doc.file_sha256
+
+    def load_extracted(self, doc: Document, file_path: str) -> ExtractedText:
+        """
+        추출 텍스트 아티팩트 (파일 hash 키)
+        - 있으면 원본 파싱 없이 반환 (프리뷰 / 재인덱스 / parent-child 재분할)
+        - 없으면 추출 후 저장
+        """
+        sha = self.file_hash(doc, file_path)
+        cached = extracted_text_store.get(sha)
+        if cached is not None:
+            return cached
+        ext = ExtractedText.from_pages(self.iter_pages(file_path))
+        extracted_text_store.put(sha, ext)
+        return ext
 
     # -----------------------------------------------------
     # Store
@@ -195,6 +400,14 @@ class UploadPipeline:
         if pages:
             doc_crud.document_page_crud.bulk_create(self.db, pages)
 
+    def page_ids(self, knowledge_id: int) -> Dict[int, int]:
+        """page_no -> page_id"""
+        return {
+            int(p.page_no): int(p.page_id)
+            for p in doc_crud.document_page_crud.list_by_document(self.db, knowledge_id)
+            if p.page_no is not None
+        }
+
     # -----------------------------------------------------
     # Init (sync)
     # -----------------------------------------------------
@@ -207,7 +420,7 @@ class UploadPipeline:
         rag_ui_mode: str = "simple",
         scope: str = "knowledge_base",
     ) -> Document:
-        fpath, fname = self._save_file(file)
+        fpath, fname, sha = self._save_file(file)
 
         doc = doc_crud.document_crud.create(
             self.db,
@@ -217,6 +430,7 @@ class UploadPipeline:
                 file_format=file.content_type or "application/octet-stream",
                 file_size_bytes=os.path.getsize(fpath),
                 folder_path=self.folder_rel,
+                file_sha256=sha,
                 status="uploading",
                 chunk_count=0,
                 progress=0,
@@ -230,13 +444,13 @@ class UploadPipeline:
         base_ing = dict(getattr(config, "DEFAULT_INGESTION"))
         base_sea = dict(getattr(config, "DEFAULT_SEARCH"))
 
-        base_ing["embedding_dim"] = _EMBEDDING_DIM_FIXED
+        base_ing["embedding_dim"] = int(base_ing.get("embedding_dim") or _EMBEDDING_DIM_FIXED)
         base_sea["score_type"] = _SCORE_TYPE_FIXED
 
         ing = _merge_defaults(base_ing, ingestion_override)
         sea = _merge_defaults(base_sea, search_override)
 
-        ing["embedding_dim"] = _EMBEDDING_DIM_FIXED
+        ing["embedding_dim"] = int(ing.get("embedding_dim") or _EMBEDDING_DIM_FIXED)
         sea["score_type"] = _SCORE_TYPE_FIXED
 
         _validate_ingestion_payload(ing)
@@ -253,9 +467,224 @@ class UploadPipeline:
         return doc
 
     # -----------------------------------------------------
-    # Process (background)
+    # Process (ingest worker)
     # -----------------------------------------------------
-    def process_document(self, knowledge_id: int) -> None:
+    def _ingest_staged(
+        self,
+        doc: Document,
+        file_path: str,
+        *,
+        ck: IngestCheckpoint,
+        start: int,
+        done: Callable[[str], None],
+    ) -> IngestResult:
+        """단계별 체크포인트 방식 (extract -> pages -> chunk -> embed -> store, store는 commit 안 함)"""
+        knowledge_id = doc.knowledge_id
+        stages = INGEST_STAGES[start:]
+        plan: Optional[ChunkPlan] = None
+        emb: Optional[EmbedResult] = None
+
+        # 1) 텍스트 추출
+        if "extract" in stages:
+            ext = self.load_extracted(doc, file_path)
+            ck.save_text(ext.text, ext.num_pages, ext.page_starts)
+            done("extract")
+
+        # 2) 페이지 저장
+        if "pages" in stages:
+            _, num_pages = ck.load_text()
+            self.store_pages(knowledge_id, num_pages)
+            done("pages")
+
+        # 3) chunking (DB 쓰기 없음)
+        if "chunk" in stages:
+            text, _ = ck.load_text()
+            plan = plan_document_chunks(
+                self.db,
+                document=doc,
+                full_text=text,
+                page_starts=ck.load_page_starts(),
+            )
+            ck.save_plan(plan)
+            done("chunk")
+
+        # 4) child embedding
+        if "embed" in stages:
+            plan = plan or ck.load_plan()
+            emb = embed_chunk_plan(self.db, plan)  # miss만 임베딩, 캐시 저장은 이 단계 commit에 포함
+            ck.save_embed(emb)
+            done("embed")
+
+        # 5) chunk 저장
+        plan = plan or ck.load_plan()
+        if emb is None:
+            emb = ck.load_embed() if plan.children else EmbedResult(vectors=[])
+
+        child_count = store_chunk_plan(
+            self.db,
+            document=doc,
+            plan=plan,
+            vectors=emb.vectors,
+            page_ids=self.page_ids(knowledge_id),
+        )
+        return IngestResult(
+            child_count=child_count,
+            embedding_tokens=emb.embedding_tokens,
+            cache_hits=emb.cache_hits,
+            cache_misses=emb.cache_misses,
+        )
+
+    def _report_progress(self, knowledge_id: int, progress: int) -> None:
+        """
+        진행률을 별도 세션으로 바로 commit (인제스트 트랜잭션은 끝까지 안 열고 진행)
+        - best-effort: documents row가 잠겨 있으면 기다리지 않고 건너뜀
+        """
+        side = SessionLocal()
+        try:
+            side.execute(sa_text("SET LOCAL lock_timeout = '1s'"))
+            doc_crud.document_crud.update(side, knowledge_id=knowledge_id, data=DocumentUpdate(progress=progress))
+            side.commit()
+        except Exception as e:
+            side.rollback()
+            log.debug("progress update skipped: knowledge_id=%s (%s)", knowledge_id, e)
+        finally:
+            side.close()
+
+    def _ingest_streaming(
+        self,
+        doc: Document,
+        file_path: str,
+        *,
+        heartbeat: Optional[Callable[[], None]] = None,
+    ) -> IngestResult:
+        """
+        페이지 스트리밍 방식
+        - 페이지 1장 추출 -> page row 저장 -> splitter에 공급 -> 확정된 청크는 임베딩 batch로
+        - 임베딩이 끝난 batch부터 insert
+        - 기존 page / chunk 삭제와 새 row 저장이 한 트랜잭션 (commit은 호출자, store 단계에서 한 번)
+          -> 진행 중에도 검색은 기존 청크를 봄, 실패하면 기존 청크 그대로
+        - progress (별도 세션): 추출한 페이지 비율 x 저장된 청크 비율 -> 페이지마다 + 임베딩/insert batch마다 갱신
+        - 페이지마다 heartbeat (작업 lease 연장, writer도 batch insert마다 호출)
+        - 실패 시 처음부터 다시 (이미 임베딩된 청크는 embedding_cache hit, 캐시는 writer가 별도 세션으로 commit)
+        - 추출 텍스트 아티팩트가 있으면 원본 대신 사용, 없으면 추출하면서 만들어 둠
+        """
+        knowledge_id = doc.knowledge_id
+        settings = load_chunk_settings(self.db, knowledge_id)
+        sha = self.file_hash(doc, file_path)
+        cached = extracted_text_store.get(sha)
+        builder = ExtractedTextBuilder() if cached is None else None
+
+        doc_crud.document_page_crud.delete_by_document(self.db, knowledge_id)
+
+        page_ids: Dict[int, int] = {}
+        pages_done = 0.0  # 추출한 페이지 비율 (페이지 수를 모르면 끝나고 1.0)
+        reported = 0
+
+        def report(written: int, planned: int) -> None:
+            # 추출이 끝나도 남은 임베딩/insert batch마다 90까지 진행
+            nonlocal reported
+            progress = 5 + int(85 * pages_done * (written / planned if planned else 1.0))
+            if progress > reported:
+                reported = progress
+                self._report_progress(knowledge_id, progress)
+
+        planner = ChunkPlanner(settings)
+        writer = StreamingChunkWriter(
+            self.db,
+            document=doc,
+            embed_model=settings.embed_model,
+            embed_dim=settings.embed_dim,
+            embed_provider=settings.embed_provider,
+            page_ids=page_ids,
+            heartbeat=heartbeat,
+            on_progress=report,
+        )
+        if cached is not None:
+            pages, total_pages = cached.iter_pages(), cached.num_pages
+        else:
+            pages, total_pages = self.iter_pages(file_path), self.count_pages(file_path)
+
+        try:
+            for page_no, page_text in enumerate(pages, start=1):
+                if builder is not None:
+                    builder.add_page(page_text)
+                page = doc_crud.document_page_crud.create(
+                    self.db,
+                    DocumentPageCreate(knowledge_id=knowledge_id, page_no=page_no),
+                )
+                page_ids[page_no] = int(page.page_id)
+
+                planner.feed(page_no, page_text)
+                writer.add(*planner.drain())
+                writer.drain_completed()
+
+                if heartbeat is not None:
+                    heartbeat()
+                if total_pages:
+                    pages_done = min(page_no, total_pages) / total_pages
+                    report(writer.result.child_count, writer.planned)
+
+            if builder is not None:
+                extracted_text_store.put(sha, builder.build())
+
+            pages_done = 1.0
+            planner.finish()
+            writer.add(*planner.drain())
+            return writer.finish()
+        except BaseException:
+            writer.close()
+            raise
+
+    def _find_dedup_source(self, doc: Document, file_path: str, fingerprint: str) -> Optional[Document]:
+        """
+        같은 파일 + 같은 설정으로 인제스트된 ready 문서 (소유자 무관, 데이터는 복제만 함)
+        - 원본의 ingest_fingerprint (청크가 실제로 만들어진 설정) 기준
+          -> 원본 설정이 인제스트 이후 바뀌었어도(재인덱스 전) 저장된 청크 기준으로 판정
+        """
+        sha = self.file_hash(doc, file_path)
+        found = doc_crud.document_crud.list_ready_by_hash(
+            self.db, sha, ingest_fingerprint=fingerprint, exclude_knowledge_id=doc.knowledge_id, limit=1
+        )
+        return found[0] if found else None
+
+    def _ingest_clone(self, doc: Document, src: Document) -> IngestResult:
+        """dedup: 원본 문서의 page / chunk / vector를 DB 안에서 복제 (추출, 임베딩 없음)"""
+        knowledge_id = doc.knowledge_id
+        reset_document_chunks(self.db, knowledge_id)
+        doc_crud.document_page_crud.delete_by_document(self.db, knowledge_id)
+
+        doc_crud.document_page_crud.clone_from_document(
+            self.db, src_knowledge_id=src.knowledge_id, dst_knowledge_id=knowledge_id
+        )
+        doc_crud.document_chunk_crud.clone_from_document(
+            self.db, src_knowledge_id=src.knowledge_id, dst_knowledge_id=knowledge_id
+        )
+        doc.chunk_count = int(src.chunk_count or 0)
+        self.db.flush()
+        log.info("document %s deduplicated from %s (%s chunks)", knowledge_id, src.knowledge_id, doc.chunk_count)
+        return IngestResult(child_count=doc.chunk_count, embedding_tokens=0, cache_hits=doc.chunk_count)
+
+    def process_document(
+        self,
+        knowledge_id: int,
+        *,
+        resume_after: Optional[str] = None,
+        on_stage: Optional[Callable[[str], None]] = None,
+        heartbeat: Optional[Callable[[], None]] = None,
+        mark_failed: bool = True,
+        streaming: Optional[bool] = None,
+    ) -> None:
+        """
+        streaming (기본, DOCUMENT_INGEST_STREAMING):
+          페이지 단위로 추출 -> chunk -> embed -> insert 파이프라인
+        staged:
+          extract -> pages -> chunk -> embed -> store 순서로 실행, 단계별 체크포인트
+          - resume_after: 마지막으로 완료된 단계 (체크포인트가 있으면 그 다음 단계부터)
+        공통:
+        - on_stage: 단계 완료 콜백 (job.stage 기록용, 같은 트랜잭션에서 commit)
+        - heartbeat: 스트리밍 중 페이지 / 임베딩 batch마다 호출 (작업 lease 연장, 자체 세션에서 commit)
+        - mark_failed: False면 실패해도 status는 embedding 유지 (재시도 예정)
+        """
         doc = doc_crud.document_crud.get(self.db, knowledge_id)
         if not doc:
             return
@@ -265,6 +694,42 @@ class UploadPipeline:
             doc.folder_path or self.folder_rel,
             doc.name,
         )
+        ck = IngestCheckpoint(knowledge_id)
+
+        # store까지 commit된 뒤 죽은 경우: 완료 처리만
+        if resume_after == INGEST_STAGES[-1]:
+            doc_crud.document_crud.update(
+                self.db,
+                knowledge_id=knowledge_id,
+                data=DocumentUpdate(
+                    status="ready",
+                    progress=100,
+                    ingest_fingerprint=load_chunk_settings(self.db, knowledge_id).fingerprint(),
+                ),
+            )
+            self.db.commit()
+            ck.clear()
+            return
+
+        if streaming is None:
+            streaming = bool(getattr(config, "DOCUMENT_INGEST_STREAMING", True))
+
+        # 재시작 지점 결정: 필요한 산출물이 없으면 한 단계씩 뒤로 (staged만)
+        start = 0
+        if not streaming:
+            start = INGEST_STAGES.index(resume_after) + 1 if resume_after in INGEST_STAGES else 0
+            while start > 0 and not ck.has_stage_inputs(INGEST_STAGES[start]):
+                start -= 1
+
+        def _done(stage: str) -> None:
+            doc_crud.document_crud.update(
+                self.db,
+                knowledge_id=knowledge_id,
+                data=DocumentUpdate(progress=_STAGE_PROGRESS[stage]),
+            )
+            if on_stage is not None:
+                on_stage(stage)
+            self.db.commit()
 
         try:
             ing = doc_crud.document_ingestion_setting_crud.get(self.db, knowledge_id)
@@ -275,35 +740,43 @@ class UploadPipeline:
                 config, "DEFAULT_EMBEDDING_MODEL", "text-embedding-3-small"
             )
 
-            # 1) 상태 업데이트
+            # 0) 상태 업데이트
+            #    - 재시작이면 progress는 이전 단계 값 유지
+            start_update: Dict[str, Any] = {"status": "embedding", "error_message": None}
+            if start == 0:
+                start_update["progress"] = 5
             doc_crud.document_crud.update(
                 self.db,
                 knowledge_id=knowledge_id,
-                data=DocumentUpdate(status="embedding", progress=5),
+                data=DocumentUpdate(**start_update),
             )
             self.db.commit()
 
-            # 2) 텍스트 추출 + 페이지 저장
-            text, num_pages = self.extract_text(file_path)
-            self.store_pages(knowledge_id, num_pages)
-            self.db.commit()
-
-            # 3) chunking/embedding/store_chunks 위임
-            #    - ingest_document_text는 child chunk들만 임베딩
-            #    - (child_count, total_tokens) 리턴을 기대 (2번 파일에서 맞출 거야)
-            child_count, total_tokens = ingest_document_text(
-                self.db,
-                document=doc,
-                full_text=text,
-            )
-            self.db.commit()
-
-            # 4) 비용 집계 (임베딩 토큰 기준)
-            usage = normalize_usage_embedding(int(total_tokens))
-            usd = estimate_embedding_cost_usd(
-                model=embed_model,
-                total_tokens=usage["embedding_tokens"],
-            )
+            # 이번 인제스트 설정 (완료 시 documents.ingest_fingerprint로 저장)
+            fingerprint = load_chunk_settings(self.db, knowledge_id).fingerprint()
+
+            # 같은 파일 + 같은 설정으로 이미 처리된 문서가 있으면 복제 (처음부터 시작할 때만)
+            src = self._find_dedup_source(doc, file_path, fingerprint) if start == 0 else None
+            self.db.commit()  # file_sha256 채운 경우 (스트리밍 트랜잭션이 documents row를 잡지 않게)
+
+            # 1~5) 추출 / 페이지 / chunk / embed / 저장
+            if src is not None:
+                result = self._ingest_clone(doc, src)
+            elif streaming:
+                result = self._ingest_streaming(doc, file_path, heartbeat=heartbeat)
+            else:
+                result = self._ingest_staged(doc, file_path, ck=ck, start=start, done=_done)
+
+            # 6) 비용 집계 (staged는 chunk 저장과 같은 트랜잭션 -> 재시도해도 중복 집계 없음)
+            #    캐시 hit은 과금 없음 -> miss 토큰만 집계
+            usage = normalize_usage_embedding(int(result.embedding_tokens))
+            if getattr(ing, "embedding_provider", None) == "local":
+                usd = Decimal("0")  # 로컬 CPU 임베딩 -> API 과금 없음 (토큰/캐시 통계만 기록)
+            else:
+                usd = estimate_embedding_cost_usd(
+                    model=embed_model,
+                    total_tokens=usage["embedding_tokens"],
+                )
             cost.add_event(
                 self.db,
                 ts_utc=datetime.now(timezone.utc),
@@ -313,22 +786,32 @@ class UploadPipeline:
                 embedding_tokens=usage["embedding_tokens"],
                 audio_seconds=0,
                 cost_usd=usd,
+                cache_hits=result.cache_hits,
+                cache_misses=result.cache_misses,
             )
+            _done("store")
 
-            # 5) 완료
+            # 7) 완료
             doc_crud.document_crud.update(
                 self.db,
                 knowledge_id=knowledge_id,
-                data=DocumentUpdate(status="ready", progress=100),
+                data=DocumentUpdate(status="ready", progress=100, ingest_fingerprint=fingerprint),
             )
             self.db.commit()
+            ck.clear()
 
+        except IngestSuperseded:
+            self.db.rollback()
+            raise
         except Exception as e:
             self.db.rollback()
             doc_crud.document_crud.update(
                 self.db,
                 knowledge_id=knowledge_id,
-                data=DocumentUpdate(status="failed", error_message=str(e)),
+                data=DocumentUpdate(
+                    status="failed" if mark_failed else "embedding",
+                    error_message=str(e),
+                ),
             )
             self.db.commit()
             raise
@@ -0,0 +1,288 @@
+# service/user/vector_cache.py
+from __future__ import annotations
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from core import config
+from crud.user.document import ChunkSearchHit, document_chunk_crud
+
+log = logging.getLogger(__name__)
+
+
+# =========================================================
+# 문서별 child 벡터 (정규화된 float32 행렬)
+# =========================================================
+@dataclass
+class _DocVectors:
+    owner_id: int
+    meta: List[Tuple[Any, ...]]  # (chunk_id, knowledge_id, page_id, parent_chunk_id, segment_index, chunk_index, chunk_text)
+    matrix: np.ndarray  # (n, dim) float32 C-contiguous, 행 L2 정규화
+    nbytes: int
+    loaded_at: float
+    epoch: int  # 적재 시점 listener 연결 번호
+
+
+def _normalized_rows(vectors: Sequence[Any]) -> np.ndarray:
+    m = np.ascontiguousarray(np.stack([np.asarray(v, dtype=np.float32) for v in vectors]))
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    m /= norms
+    return m
+
+
+class DocumentVectorCache:
+    """
+    작은 문서용 인메모리 벡터 인덱스 (프로세스 전역, exact cosine).
+    - 첫 검색 때 문서의 child 벡터를 한 번에 적재 -> 이후 검색은 행렬-벡터 곱 1번 (DB 왕복 없음)
+    - chunk_count > max_chunks 이거나 ready가 아닌 문서는 적재 안 함 -> SQL(pgvector) 검색
+    - 메모리 상한(max_bytes) LRU, ttl_s 지나면 다시 적재
+    - 무효화: 같은 프로세스의 청크 삭제(invalidate) + 모든 노드의 문서 상태 NOTIFY
+      (listener가 끊겨 있으면 이벤트를 놓칠 수 있으므로 캐시를 쓰지 않음)
+    """
+
+    def __init__(
+        self,
+        *,
+        max_bytes: Optional[int] = None,
+        max_chunks: Optional[int] = None,
+        ttl_s: Optional[float] = None,
+        listen: bool = True,
+    ):
+        mb = float(getattr(config, "VECTOR_CACHE_MAX_MB", 256))
+        self.max_bytes = int(max_bytes if max_bytes is not None else mb * 1024 * 1024)
+        self.max_chunks = int(max_chunks or getattr(config, "VECTOR_CACHE_MAX_CHUNKS", 200))
+        self.ttl_s = float(ttl_s if ttl_s is not None else getattr(config, "VECTOR_CACHE_TTL_S", 600.0))
+
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[int, _DocVectors]" = OrderedDict()
+        self._generation: Dict[int, int] = {}
+        self._skipped: Dict[int, Tuple[float, int]] = {}  # 적재 대상 아님(큰 문서/not ready) -> (시각, epoch)
+        self._bytes = 0
+
+        self._hub = None
+        if listen:
+            from service.user.document_events import document_status_hub
+
+            self._hub = document_status_hub
+            self._hub.add_listener(self._on_document_event)
+
+        self.hits = 0
+        self.loads = 0
+        self.sql_fallbacks = 0
+        self.evictions = 0
+
+    # -----------------------------------------------------
+    # invalidation
+    # -----------------------------------------------------
+    def _epoch(self) -> Optional[int]:
+        """listener 연결 번호 (연결 안 됐으면 None -> 캐시 사용 안 함)"""
+        if self._hub is None:
+            return 0
+        return self._hub.connects if self._hub.connected else None
+
+    def _on_document_event(self, event: Dict[str, Any]) -> None:
+        # 상태/진행률이 바뀌었다 = 재인덱스/삭제 중일 수 있음 -> 다음 검색 때 다시 적재
+        self.invalidate(int(event["knowledge_id"]))
+
+    def invalidate(self, knowledge_id: int) -> None:
+        kid = int(knowledge_id)
+        with self._lock:
+            self._generation[kid] = self._generation.get(kid, 0) + 1
+            self._skipped.pop(kid, None)
+            entry = self._data.pop(kid, None)
+            if entry is not None:
+                self._bytes -= entry.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            for kid in list(self._data):
+                self._generation[kid] = self._generation.get(kid, 0) + 1
+            self._data.clear()
+            self._skipped.clear()
+            self._bytes = 0
+
+    # -----------------------------------------------------
+    # load / lookup
+    # -----------------------------------------------------
+    def _get(self, kid: int, owner_id: int, epoch: int, dim: int) -> Optional[_DocVectors]:
+        entry = self._data.get(kid)
+        if entry is None:
+            return None
+        expired = self.ttl_s > 0 and time.monotonic() - entry.loaded_at > self.ttl_s
+        if expired or entry.epoch != epoch:
+            del self._data[kid]
+            self._bytes -= entry.nbytes
+            return None
+        if entry.owner_id != int(owner_id) or entry.matrix.shape[1] != dim:
+            return None
+        self._data.move_to_end(kid)
+        return entry
+
+    def _is_skipped(self, kid: int, epoch: int) -> bool:
+        item = self._skipped.get(kid)
+        if item is None:
+            return False
+        stored_at, skipped_epoch = item
+        if skipped_epoch != epoch or (self.ttl_s > 0 and time.monotonic() - stored_at > self.ttl_s):
+            del self._skipped[kid]
+            return False
+        return True
+
+    def _put(self, kid: int, entry: _DocVectors, generation: int) -> None:
+        if entry.nbytes > self.max_bytes:
+            return
+        if self._generation.get(kid, 0) != generation:
+            return  # 적재 중에 무효화됨 -> 옛 데이터일 수 있음
+        old = self._data.pop(kid, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        self._data[kid] = entry
+        self._bytes += entry.nbytes
+        while self._bytes > self.max_bytes and self._data:
+            _, evicted = self._data.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def _load(self, db: Session, kids: List[int], owner_id: int, epoch: int, dim: int) -> None:
+        with self._lock:
+            generations = {k: self._generation.get(k, 0) for k in kids}
+
+        rows = document_chunk_crud.list_child_vectors(
+            db, knowledge_ids=kids, owner_id=owner_id, max_chunks=self.max_chunks, dim=dim
+        )
+        grouped: Dict[int, List[Tuple[Any, ...]]] = {}
+        for row in rows:
+            grouped.setdefault(int(row[1]), []).append(tuple(row))
+
+        now = time.monotonic()
+        with self._lock:
+            for kid, doc_rows in grouped.items():
+                matrix = _normalized_rows([r[7] for r in doc_rows])
+                entry = _DocVectors(
+                    owner_id=int(owner_id),
+                    meta=[r[:7] for r in doc_rows],
+                    matrix=matrix,
+                    nbytes=int(matrix.nbytes),
+                    loaded_at=now,
+                    epoch=epoch,
+                )
+                self._put(kid, entry, generations[kid])
+            for kid in kids:
+                if kid not in grouped and self._generation.get(kid, 0) == generations[kid]:
+                    self._skipped[kid] = (now, epoch)
+            self.loads += len(grouped)
+
+    def search(
+        self,
+        db: Session,
+        *,
+        query_vector: Sequence[float],
+        knowledge_ids: Sequence[int],
+        owner_id: int,
+        top_k: int = 8,
+        min_score: Optional[float] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> List[ChunkSearchHit]:
+        """
+        search_by_vector_multi와 같은 계약 (전체 top_k, 점수 내림차순, 소유권 확인).
+        캐시된 문서는 메모리에서 exact cosine, 나머지(큰 문서/적재 실패)는 SQL로 검색해서 합침.
+        질문 벡터 차원의 컬럼만 적재 (임베딩 차원이 다른 문서는 SQL에서도 결과 없음).
+        """
+        kids = [int(k) for k in dict.fromkeys(knowledge_ids)]
+        if not kids or top_k <= 0:
+            return []
+        dim = len(query_vector)
+
+        epoch = self._epoch()
+        if epoch is None:
+            self.sql_fallbacks += 1
+            return document_chunk_crud.search_by_vector_multi(
+                db, query_vector=query_vector, knowledge_ids=kids, owner_id=owner_id,
+                top_k=top_k, min_score=min_score, ef_search=ef_search, probes=probes,
+            )
+
+        with self._lock:
+            cold = [
+                k for k in kids
+                if self._get(k, owner_id, epoch, dim) is None and not self._is_skipped(k, epoch)
+            ]
+        if cold:
+            try:
+                self._load(db, cold, owner_id, epoch, dim)
+            except Exception as e:
+                log.warning("vector cache load failed (kids=%s): %s", cold, e)
+
+        with self._lock:
+            entries = {k: e for k in kids if (e := self._get(k, owner_id, epoch, dim)) is not None}
+            if entries:
+                self.hits += 1
+
+        hits: List[ChunkSearchHit] = []
+        if entries:
+            q = np.asarray(query_vector, dtype=np.float32)
+            qn = float(np.linalg.norm(q))
+            if qn > 0:
+                q = q / qn
+            for entry in entries.values():
+                scores = entry.matrix @ q
+                idx = np.arange(len(scores))
+                if min_score is not None:
+                    idx = idx[scores >= float(min_score)]
+                if len(idx) > top_k:
+                    idx = idx[np.argpartition(-scores[idx], top_k - 1)[:top_k]]
+                hits.extend(ChunkSearchHit(*entry.meta[i], score=float(scores[i])) for i in idx)
+
+        rest = [k for k in kids if k not in entries]
+        if rest:
+            self.sql_fallbacks += 1
+            hits.extend(
+                document_chunk_crud.search_by_vector_multi(
+                    db, query_vector=query_vector, knowledge_ids=rest, owner_id=owner_id,
+                    top_k=top_k, min_score=min_score, ef_search=ef_search, probes=probes,
+                )
+            )
+
+        hits.sort(key=lambda h: h.score, reverse=True)
+        return hits[:top_k]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "documents": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "loads": self.loads,
+                "sql_fallbacks": self.sql_fallbacks,
+                "evictions": self.evictions,
+            }
+
+
+_cache: Optional[DocumentVectorCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_document_vector_cache() -> Optional[DocumentVectorCache]:
+    """VECTOR_CACHE_ENABLED=false면 None (항상 SQL)"""
+    global _cache
+    if not getattr(config, "VECTOR_CACHE_ENABLED", True):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = DocumentVectorCache()
+        return _cache
+
+
+def invalidate_document_vectors(knowledge_id: int) -> None:
+    """청크 재작성/삭제 시 (캐시가 아직 안 만들어졌으면 아무것도 안 함)"""
+    if _cache is not None:
+        _cache.invalidate(knowledge_id)